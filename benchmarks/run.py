@@ -0,0 +1,267 @@
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable
+
+from ntt_parser import Gramma, Parser, select_parser
+
+from .synthetic import SentenceGenerator, SyntheticGrammaSpec, generate_gramma
+
+BENCHMARK_DIR = Path(__file__).parent
+MATH_GRAMMA = BENCHMARK_DIR.parent / "grammar" / "math.bnf"
+MATH_PRECEDENCE_GRAMMA = BENCHMARK_DIR.parent / "grammar" / "math-precedence.bnf"
+# Left-recursive, hence not LL(1): exercises the Earley fallback.
+MATH_LEFT_RECURSIVE_GRAMMA = """
+/start-lexma
+
+number: /[0-9]+(\\.[0-9]+)?/
+identifier: /[A-Za-z_][A-Za-z0-9_]*/
+
+/end-lexma
+
+/start-gramma
+
+Expr: Expr "+" Term | Expr "-" Term | Term ;
+Term: Term "*" Factor | Term "/" Factor | Factor ;
+Factor: "(" Expr ")" | "-" Factor | number | identifier ;
+
+/end-gramma
+"""
+DEFAULT_BASELINE = BENCHMARK_DIR / "baseline.json"
+
+SYNTHETIC_WORKLOADS: dict[str, tuple[SyntheticGrammaSpec, int]] = {
+    "synthetic-small": (SyntheticGrammaSpec(non_terminals=20, seed=1), 2_000),
+    "synthetic-nullable": (
+        SyntheticGrammaSpec(non_terminals=60, nullable_density=0.6, seed=2),
+        10_000,
+    ),
+    "synthetic-deep": (
+        SyntheticGrammaSpec(non_terminals=100, branching=2, recursion_depth=25, seed=3),
+        10_000,
+    ),
+    "synthetic-wide": (
+        SyntheticGrammaSpec(non_terminals=300, branching=6, lexicals=24, seed=4),
+        20_000,
+    ),
+}
+
+
+def measure(function: Callable[[], Any], repeat: int) -> float:
+    """
+    Best wall time of ``repeat`` runs, in seconds.
+    """
+    best = float("inf")
+
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - started)
+
+    return best
+
+
+def bench_gramma(
+    name: str, gramma_str: str, sentence: str, repeat: int
+) -> dict[str, float]:
+    gramma = Gramma.parse(gramma_str)
+    parser = select_parser(gramma)
+    tokens = parser.Lexer.tokenize(sentence)
+    image = gramma.to_bytes()
+
+    def first() -> None:
+        gramma._first_set = {}
+        gramma._parse_first_set()
+
+    def follow() -> None:
+        gramma._follow_set = {}
+        gramma._parse_follow_set()
+
+    def table() -> None:
+        gramma._parsing_table = {}
+        gramma.parse_parsing_table()
+
+    return {
+        f"{name}/load": measure(lambda: Gramma.parse(gramma_str), repeat),
+        f"{name}/load_image": measure(lambda: Gramma.from_bytes(image), repeat),
+        f"{name}/compile_image": measure(
+            lambda: select_parser(Gramma.from_bytes(image)), repeat
+        ),
+        f"{name}/first": measure(first, repeat),
+        f"{name}/follow": measure(follow, repeat),
+        f"{name}/table": measure(table, repeat),
+        f"{name}/compile": measure(lambda: select_parser(gramma), repeat),
+        f"{name}/lex": measure(lambda: parser.Lexer.tokenize(sentence), repeat),
+        f"{name}/parse": measure(lambda: parser.parse_tokens(tokens), repeat),
+    }
+
+
+def random_expressions(count: int, seed: int = 0) -> list[str]:
+    generator = random.Random(seed)
+    operands = ["x", "y", "1", "2.5", "(x - 3)", "-y"]
+    operators = ["+", "-", "*", "/"]
+    expressions: list[str] = []
+
+    for _ in range(count):
+        parts = [generator.choice(operands)]
+        for _ in range(generator.randint(0, 3)):
+            parts.append(generator.choice(operators))
+            parts.append(generator.choice(operands))
+        expressions.append(" ".join(parts))
+
+    return expressions
+
+
+def bench_tiny_inputs(count: int, repeat: int) -> dict[str, float]:
+    """
+    Throughput on many tiny inputs against the math gramma, reported as the
+    time for ``count`` inputs.
+    """
+    parser = Parser(Gramma.parse(MATH_GRAMMA.read_text()))
+    expressions = random_expressions(count)
+
+    def single() -> None:
+        for expression in expressions:
+            parser.parse(expression)
+
+    def batch() -> None:
+        for _ in parser.parse_many(expressions):
+            pass
+
+    return {
+        f"math-tiny-{count}/parse": measure(single, repeat),
+        f"math-tiny-{count}/parse_many": measure(batch, repeat),
+    }
+
+
+def bench_reparse(name: str, count: int, repeat: int) -> dict[str, float]:
+    """
+    Latency of one-token edits in the middle of a long math document: one that
+    keeps the token count and one that inserts tokens.
+    """
+    parser = Parser(Gramma.parse(MATH_GRAMMA.read_text()))
+    source = " + ".join(random_expressions(count)) + " + 1"
+    tree = parser.parse(source)
+    middle = source.index(" + ", len(source) // 2) + 3
+
+    return {
+        f"{name}/reparse": measure(
+            lambda: parser.reparse(tree, middle, middle + 1, "7"), repeat
+        ),
+        f"{name}/reparse_insert": measure(
+            lambda: parser.reparse(tree, middle, middle, "7 * "), repeat
+        ),
+    }
+
+
+def run(quick: bool = False) -> dict[str, float]:
+    repeat = 1 if quick else 5
+    scale = 10 if quick else 1
+    results: dict[str, float] = {}
+
+    for name, (spec, target_tokens) in SYNTHETIC_WORKLOADS.items():
+        gramma_str = generate_gramma(spec)
+        sentence = SentenceGenerator(Gramma.parse(gramma_str), seed=spec.seed).generate(
+            target_tokens // scale
+        )
+        results.update(bench_gramma(name, gramma_str, sentence, repeat))
+
+    math_gramma = MATH_GRAMMA.read_text()
+    math_sentence = " + ".join(random_expressions(20_000 // scale))
+    results.update(bench_gramma("math-large", math_gramma, math_sentence, repeat))
+    results.update(
+        bench_gramma(
+            "math-precedence-large",
+            MATH_PRECEDENCE_GRAMMA.read_text(),
+            math_sentence,
+            repeat,
+        )
+    )
+    results.update(
+        bench_gramma(
+            "math-earley",
+            MATH_LEFT_RECURSIVE_GRAMMA,
+            " + ".join(random_expressions(2_000 // scale)),
+            repeat,
+        )
+    )
+    # A "-" chain fails the first alternative of ``Expr`` at every link.
+    results.update(
+        bench_gramma(
+            "math-earley-minus",
+            MATH_LEFT_RECURSIVE_GRAMMA,
+            " - ".join(random_expressions(2_000 // scale)),
+            repeat,
+        )
+    )
+    results.update(bench_tiny_inputs(50_000 // scale, repeat))
+    results.update(bench_reparse("math-large", 20_000 // scale, repeat))
+
+    return results
+
+
+def compare(
+    results: dict[str, float], baseline: dict[str, float], threshold: float
+) -> list[tuple[str, float, float]]:
+    """
+    Benchmarks slower than ``threshold`` times their baseline, as
+    ``(name, baseline, current)``.
+    """
+    return [
+        (name, baseline[name], current)
+        for name, current in results.items()
+        if name in baseline and current > baseline[name] * threshold
+    ]
+
+
+def main(argv: list[str] | None = None) -> int:
+    arg_parser = argparse.ArgumentParser(prog="python -m benchmarks.run")
+    arg_parser.add_argument("--quick", action="store_true")
+    arg_parser.add_argument("--output", type=Path)
+    arg_parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    arg_parser.add_argument("--threshold", type=float, default=1.25)
+    arg_parser.add_argument("--save-baseline", action="store_true")
+    args = arg_parser.parse_args(argv)
+
+    results = run(args.quick)
+    report = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "quick": args.quick,
+        "results": results,
+    }
+
+    for name, seconds in results.items():
+        print(f"{name:40} {seconds * 1000:12.3f} ms")
+
+    if args.output is not None:
+        args.output.write_text(json.dumps(report, indent=2) + "\n")
+
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(report, indent=2) + "\n")
+        return 0
+
+    if not args.baseline.exists():
+        print(f"No baseline at {args.baseline}; run with --save-baseline first")
+        return 0
+
+    baseline = json.loads(args.baseline.read_text())
+    if baseline.get("quick") != args.quick:
+        print("Baseline was recorded with a different --quick setting")
+        return 0
+
+    regressions = compare(results, baseline["results"], args.threshold)
+    for name, before, after in regressions:
+        print(
+            f"REGRESSION {name}: {before * 1000:.3f} ms -> {after * 1000:.3f} ms "
+            f"({after / before:.2f}x)"
+        )
+
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
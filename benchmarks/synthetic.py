@@ -0,0 +1,180 @@
+import random
+import re
+from dataclasses import dataclass
+
+from ntt_parser import Gramma
+
+EPSILON = '""'
+SYNTHETIC_LEXICAL = re.compile(r"/(_[0-9]+_)\[0-9\]\+/")
+
+
+@dataclass(frozen=True)
+class SyntheticGrammaSpec:
+    non_terminals: int = 20
+    branching: int = 3
+    nullable_density: float = 0.2
+    recursion_depth: int = 4
+    lexicals: int = 4
+    seed: int = 0
+
+
+def generate_gramma(spec: SyntheticGrammaSpec) -> str:
+    """
+    Generate the ``.bnf`` text of a random LL(1) gramma.
+
+    Non-terminals are spread over ``recursion_depth`` levels and only refer to
+    the next level, except for one back edge per non-terminal of the last
+    level, which makes the gramma recursive. Every production starts with its
+    own keyword and every non-terminal reference is followed by a lexical, so
+    FIRST sets only hold keywords and FOLLOW sets only hold lexicals: the
+    parsing table never has conflicts.
+    """
+    assert spec.non_terminals > 0, "Need at least one non-terminal"
+    assert spec.branching > 0, "Need at least one production per non-terminal"
+    assert spec.lexicals > 0, "Need at least one lexical"
+
+    generator = random.Random(spec.seed)
+    depth = max(1, min(spec.recursion_depth, spec.non_terminals))
+    levels: list[list[str]] = [[] for _ in range(depth)]
+    for index in range(spec.non_terminals):
+        levels[index * depth // spec.non_terminals].append(f"N{index}")
+
+    lexicals = [f"lex{index}" for index in range(spec.lexicals)]
+    lines = ["/start-lexma", ""]
+    for index, lexical in enumerate(lexicals):
+        lines.append(f"{lexical}: /_{index}_[0-9]+/")
+    lines += ["", "/end-lexma", "", "/start-gramma", ""]
+
+    for level, non_terminals in enumerate(levels):
+        for non_terminal in non_terminals:
+            if level + 1 < depth:
+                references = levels[level + 1]
+            else:
+                references = levels[0]
+
+            alternatives: list[str] = []
+            for branch in range(spec.branching):
+                parts = [f'"k{non_terminal[1:]}_{branch}"']
+
+                terminal_branch = branch == 0 and level + 1 == depth
+                if not terminal_branch:
+                    count = min(len(references), generator.randint(1, 2))
+                    for reference in generator.sample(references, count):
+                        parts.append(reference)
+                        parts.append(generator.choice(lexicals))
+
+                if generator.random() < 0.5:
+                    parts.append(generator.choice(lexicals))
+
+                alternatives.append(" ".join(parts))
+
+            if generator.random() < spec.nullable_density:
+                alternatives.append(EPSILON)
+
+            lines.append(
+                f"{non_terminal}: " + "\n    | ".join(alternatives) + "\n    ;"
+            )
+            lines.append("")
+
+    lines.append("/end-gramma")
+
+    return "\n".join(lines) + "\n"
+
+
+class SentenceGenerator:
+    """
+    Derives random sentences of roughly a target number of tokens from the
+    productions of a gramma, using precomputed shortest-derivation lengths to
+    never start a derivation that cannot finish within the budget.
+    """
+
+    def __init__(self, gramma: Gramma, seed: int = 0, growth: float = 0.7) -> None:
+        self._gramma = gramma
+        self._random = random.Random(seed)
+        self._growth = growth
+        self._alternatives: dict[str, list[list[str]]] = {}
+        for lhs, rhs, _ in gramma.Productions:
+            self._alternatives.setdefault(lhs, []).append(
+                [symbol for symbol in rhs if symbol != EPSILON]
+            )
+        self._shortest = self._shortest_lengths()
+
+    @property
+    def ShortestLengths(self) -> dict[str, int]:
+        return self._shortest
+
+    def _shortest_lengths(self) -> dict[str, int]:
+        infinity = float("inf")
+        shortest: dict[str, float] = {lhs: infinity for lhs in self._alternatives}
+
+        changed = True
+        while changed:
+            changed = False
+            for lhs, alternatives in self._alternatives.items():
+                for rhs in alternatives:
+                    length = sum(shortest.get(symbol, 1) for symbol in rhs)
+                    if length < shortest[lhs]:
+                        shortest[lhs] = length
+                        changed = True
+
+        for lhs, length in shortest.items():
+            assert length != infinity, f"Non-terminal '{lhs}' derives no sentence"
+
+        return {lhs: int(length) for lhs, length in shortest.items()}
+
+    def _branches(self, symbols: list[str]) -> int:
+        return sum(1 for symbol in symbols if symbol in self._alternatives)
+
+    def _length(self, symbols: list[str]) -> int:
+        return sum(self._shortest.get(symbol, 1) for symbol in symbols)
+
+    def _token(self, symbol: str) -> str:
+        if symbol.startswith('"'):
+            return symbol[1:-1]
+
+        # Only the synthetic ``/_<index>_[0-9]+/`` lexicals are supported.
+        pattern = self._gramma.Lexicals[symbol]
+        matched = SYNTHETIC_LEXICAL.fullmatch(pattern)
+        if matched is None:
+            raise ValueError(
+                f"Cannot generate text for lexical '{symbol}': {pattern} is not"
+                " a synthetic lexical"
+            )
+
+        return matched.group(1) + str(self._random.randint(0, 999))
+
+    def generate(self, target_tokens: int) -> str:
+        tokens: list[str] = []
+        start = self._gramma.StartNonTerminal
+        stack = [start]
+        pending = self._shortest[start]
+
+        while stack:
+            symbol = stack.pop()
+
+            if symbol not in self._alternatives:
+                tokens.append(self._token(symbol))
+                pending -= 1
+                continue
+
+            pending -= self._shortest[symbol]
+            slack = target_tokens - len(tokens) - pending
+            alternatives = self._alternatives[symbol]
+            affordable = [rhs for rhs in alternatives if self._length(rhs) <= slack]
+
+            if not affordable:
+                rhs = min(alternatives, key=self._length)
+            elif self._random.random() < self._growth:
+                # Prefer alternatives that open more derivations while the
+                # budget allows it, otherwise sentences stay tiny.
+                most = max(self._branches(rhs) for rhs in affordable)
+                rhs = self._random.choice(
+                    [rhs for rhs in affordable if self._branches(rhs) == most]
+                )
+            else:
+                rhs = self._random.choice(affordable)
+
+            pending += self._length(rhs)
+            stack.extend(reversed(rhs))
+
+        return " ".join(tokens)
@@ -1,6 +1,4 @@
-def main():
-    print("Hello from ntt-parser-cli!")
-
+from ntt_parser.cli import main
 
 if __name__ == "__main__":
     main()
@@ -1 +1,10 @@
+from .instrumentation import *
+from .location import *
 from .gramma import *
+from .lexer import *
+from .tree import *
+from .parser import *
+from .earley import *
+from .plan import *
+from .stream import *
+from .server import *
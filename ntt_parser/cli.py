@@ -0,0 +1,25 @@
+import argparse
+import asyncio
+
+from .server import DEFAULT_MAX_FRAME, ParseServer
+
+
+def main(argv: list[str] | None = None) -> None:
+    arg_parser = argparse.ArgumentParser(prog="ntt-parser")
+    commands = arg_parser.add_subparsers(dest="command", required=True)
+
+    serve = commands.add_parser(
+        "serve", help="Serve parse requests over a Unix domain socket"
+    )
+    serve.add_argument("--socket", default="/tmp/ntt-parser.sock")
+    serve.add_argument("--cache-size", type=int, default=32)
+    serve.add_argument("--max-frame", type=int, default=DEFAULT_MAX_FRAME)
+
+    args = arg_parser.parse_args(argv)
+
+    if args.command == "serve":
+        server = ParseServer(args.cache_size, args.max_frame)
+        try:
+            asyncio.run(server.serve(args.socket))
+        except KeyboardInterrupt:
+            pass
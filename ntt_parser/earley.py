@@ -0,0 +1,434 @@
+from bisect import bisect_left, bisect_right
+from typing import Iterable, Iterator
+
+from .gramma import Gramma
+from .instrumentation import Instrumentation
+from .lexer import Tokens
+from .parser import ParseError, Parser
+from .tree import NO_NODE, NO_PRODUCTION, SyntaxTree, TreeBuilder
+
+_COMPLETE = -1
+
+
+class EarleyParser(Parser):
+    """
+    General context-free parser for grammas whose LL(1) table has conflicts.
+    It runs an Earley recognizer directly on ``Gramma.Productions`` and then
+    reads one derivation back from the chart into the usual ``SyntaxTree``,
+    so ambiguous and left-recursive grammas work too, in ``O(n^3)`` time at
+    worst (``O(n)`` for most unambiguous ones).
+
+    Items are packed ``(dotted_rule, origin)`` integers. Nullable
+    non-terminals and the non-terminals each prediction pulls in are
+    precomputed, and nullable symbols are stepped over at prediction time
+    (Aycock-Horspool), so the chart is built in one pass per token. The chart
+    holds at most ``rules * (n + 1)`` items per token position; ``max_items``
+    bounds the whole chart and turns larger parses into a ``ParseError``.
+
+    Ambiguities resolve deterministically: the production written first
+    wins, and between splits of a right side later children take the
+    shortest span (so ``E "+" E`` nests to the left).
+    """
+
+    def __init__(
+        self,
+        gramma: Gramma,
+        instrumentation: Instrumentation | None = None,
+        max_items: int | None = None,
+    ) -> None:
+        super().__init__(gramma, instrumentation)
+        assert not self.HasPrecedence, "Precedence grammas need the LL(1) engine"
+
+        self._max_items = max_items
+        symbol_count = len(self._symbols)
+        productions = self._productions
+
+        # Dotted rules: production ``p`` with the dot before symbol ``d`` is
+        # rule ``self._rule_starts[p] + d``.
+        self._rule_starts: list[int] = []
+        self._rule_next: list[int] = []
+        self._rule_productions: list[int] = []
+        for index, rhs in enumerate(productions):
+            self._rule_starts.append(len(self._rule_next))
+            self._rule_next.extend(rhs)
+            self._rule_next.append(_COMPLETE)
+            self._rule_productions.extend([index] * (len(rhs) + 1))
+
+        self._alternatives: list[list[int]] = [[] for _ in range(symbol_count)]
+        for index, rhs in enumerate(productions):
+            self._alternatives[self._lhs(index)].append(index)
+
+        self._nullable = bytearray(symbol_count)
+        changed = True
+        while changed:
+            changed = False
+            for index, rhs in enumerate(productions):
+                lhs = self._lhs(index)
+                if not self._nullable[lhs] and all(
+                    self._nullable[symbol] for symbol in rhs
+                ):
+                    self._nullable[lhs] = 1
+                    changed = True
+
+        # Everything predicting a non-terminal brings into the same set: the
+        # non-terminals reachable through the left edge of its productions.
+        self._predictions: list[list[int]] = [[] for _ in range(symbol_count)]
+        for symbol in range(self._terminal_count, symbol_count):
+            predicted = [symbol]
+            seen = {symbol}
+            for current in predicted:
+                for production in self._alternatives[current]:
+                    for child in productions[production]:
+                        if child >= self._terminal_count and child not in seen:
+                            seen.add(child)
+                            predicted.append(child)
+                        if not self._nullable[child]:
+                            break
+            self._predictions[symbol] = predicted
+
+    def _lhs(self, production: int) -> int:
+        return self._symbol_ids[self._gramma.Productions[production][0]]
+
+    @property
+    def Engine(self) -> str:
+        return "earley"
+
+    def parse_tokens(self, tokens: Tokens) -> SyntaxTree:
+        instrumentation = self._instrumentation
+        if instrumentation is None:
+            return self._build(tokens, self._recognize(tokens))
+
+        with instrumentation.phase("parsing"):
+            completed = self._recognize(tokens)
+            tree = self._build(tokens, completed)
+        instrumentation.count("tokens", len(tokens) - 1)
+        return tree
+
+    def parse_many(
+        self, sources: Iterable[str], raise_errors: bool = True
+    ) -> Iterator[SyntaxTree | ValueError]:
+        return self._parse_each(sources, raise_errors)
+
+    def reparse(self, tree: SyntaxTree, start: int, end: int, text: str) -> SyntaxTree:
+        assert tree.Symbols == self._symbols, "Tree was built by another parser"
+
+        tokens, _, _, _ = self._relex(tree.Tokens, start, end, text)
+        return self.parse_tokens(tokens)
+
+    def _recognize(self, tokens: Tokens) -> list[dict[int, list[int]]]:
+        """
+        Build the Earley chart and return, for every token position ``i``,
+        the non-terminals completed from ``i`` with their sorted end
+        positions.
+        """
+        kinds = tokens.Kinds
+        token_count = len(kinds) - 1
+        width = token_count + 1
+        terminal_count = self._terminal_count
+        rule_next = self._rule_next
+        rule_starts = self._rule_starts
+        rule_productions = self._rule_productions
+        alternatives = self._alternatives
+        predictions = self._predictions
+        nullable = self._nullable
+        max_items = self._max_items
+        lhs_ids = [self._lhs(index) for index in range(len(self._productions))]
+
+        completed: list[dict[int, list[int]]] = [{} for _ in range(width)]
+        waiting_sets: list[dict[int, list[int]]] = []
+        items = [
+            rule_starts[production] * width
+            for symbol in predictions[self._start]
+            for production in alternatives[symbol]
+        ]
+        predicted_start = set(predictions[self._start])
+        item_total = 0
+
+        for position in range(width):
+            seen = set(items)
+            waiting: dict[int, list[int]] = {}
+            waiting_sets.append(waiting)
+            predicted = predicted_start if position == 0 else set()
+
+            cursor = 0
+            while cursor < len(items):
+                item = items[cursor]
+                cursor += 1
+                rule, origin = divmod(item, width)
+                symbol = rule_next[rule]
+
+                if symbol == _COMPLETE:
+                    lhs = lhs_ids[rule_productions[rule]]
+                    ends = completed[origin].setdefault(lhs, [])
+                    if ends and ends[-1] == position:
+                        continue
+                    ends.append(position)
+
+                    for parent in waiting_sets[origin].get(lhs, ()):
+                        advanced = parent + width
+                        if advanced not in seen:
+                            seen.add(advanced)
+                            items.append(advanced)
+                    continue
+
+                waiting.setdefault(symbol, []).append(item)
+                if symbol < terminal_count:
+                    continue
+
+                if symbol not in predicted:
+                    for child in predictions[symbol]:
+                        if child in predicted:
+                            continue
+                        predicted.add(child)
+                        for production in alternatives[child]:
+                            new_item = rule_starts[production] * width + position
+                            if new_item not in seen:
+                                seen.add(new_item)
+                                items.append(new_item)
+
+                if nullable[symbol]:
+                    advanced = item + width
+                    if advanced not in seen:
+                        seen.add(advanced)
+                        items.append(advanced)
+
+            item_total += len(items)
+            if max_items is not None and item_total > max_items:
+                raise ParseError(
+                    f"Earley chart exceeded {max_items} items at token {position}",
+                    position,
+                    tokens.start(position),
+                    tokens.Lines,
+                )
+
+            if position == token_count:
+                break
+
+            items = [item + width for item in waiting.get(kinds[position], ())]
+            if not items:
+                self._raise_unexpected(
+                    tokens, position, self._expected(waiting, terminal_count)
+                )
+
+        if self._instrumentation is not None:
+            self._instrumentation.count("earley_items", item_total)
+
+        ends = completed[0].get(self._start, [])
+        if not ends or ends[-1] != token_count:
+            expected = self._expected(waiting, terminal_count)
+            self._raise_unexpected(
+                tokens, token_count, expected or [self._end_of_input]
+            )
+
+        return completed
+
+    @staticmethod
+    def _expected(waiting: dict[int, list[int]], terminal_count: int) -> list[int]:
+        return sorted(symbol for symbol in waiting if symbol < terminal_count)
+
+    def _build(
+        self, tokens: Tokens, completed: list[dict[int, list[int]]]
+    ) -> SyntaxTree:
+        """
+        Read one derivation back from the chart, top-down and iteratively.
+        """
+        builder = TreeBuilder(self._symbols, tokens)
+        derivation = _Derivation(self, tokens, completed)
+        terminal_count = self._terminal_count
+        productions = self._productions
+        stack: list[tuple[int, int, int, int, frozenset[int]]] = [
+            (self._start, 0, len(tokens) - 1, NO_NODE, frozenset([self._start]))
+        ]
+
+        while stack:
+            symbol, start, end, parent, chain = stack.pop()
+
+            if symbol < terminal_count:
+                builder.close(builder.add(symbol, NO_PRODUCTION, start, parent), end)
+                continue
+
+            choice = derivation.take(symbol, start, end, chain)
+            assert choice is not None, "Chart has no derivation for a completed item"
+            production, spans = choice
+
+            node = builder.add(symbol, production, start, parent)
+            builder.close(node, end)
+
+            rhs = productions[production]
+            for index in range(len(rhs) - 1, -1, -1):
+                child = rhs[index]
+                child_start, child_end = spans[index]
+                if child_start == start and child_end == end:
+                    child_chain = chain | {child}
+                else:
+                    child_chain = frozenset([child])
+                stack.append((child, child_start, child_end, node, child_chain))
+
+        return builder.build()
+
+
+class _Derivation:
+    """
+    Chooses, for a non-terminal spanning ``[start, end)``, the production and
+    child spans of one derivation found in an Earley chart. ``chain`` holds
+    the ancestors spanning the same tokens, which a child with that span must
+    not repeat (no cyclic derivations).
+
+    Right sides are split from the last child backwards, looking up where
+    each child can start from the symbols completed at its end, so a failing
+    alternative of a left-recursive rule is rejected at its last children
+    instead of trying every end of its first one.
+    """
+
+    def __init__(
+        self,
+        parser: EarleyParser,
+        tokens: Tokens,
+        completed: list[dict[int, list[int]]],
+    ) -> None:
+        self._kinds = tokens.Kinds
+        self._completed = completed
+        # ``origins[end][symbol]``: the sorted positions ``symbol`` completes
+        # from at ``end``.
+        self._origins: list[dict[int, list[int]]] = [{} for _ in completed]
+        for origin, symbols in enumerate(completed):
+            for symbol, ends in symbols.items():
+                for end in ends:
+                    self._origins[end].setdefault(symbol, []).append(origin)
+        self._terminal_count = parser.TerminalCount
+        self._productions = parser.Productions
+        self._alternatives = parser._alternatives
+        # Choices already made while checking same-span children, keyed by
+        # ``(symbol, start, end, chain)``.
+        self._choices: dict[
+            tuple[int, int, int, frozenset[int]],
+            tuple[int, list[tuple[int, int]]] | None,
+        ] = {}
+
+    def take(
+        self, symbol: int, start: int, end: int, chain: frozenset[int]
+    ) -> tuple[int, list[tuple[int, int]]] | None:
+        key = (symbol, start, end, chain)
+        if key in self._choices:
+            return self._choices.pop(key)
+
+        return self._choose(symbol, start, end, chain)
+
+    def _choose(
+        self, symbol: int, start: int, end: int, chain: frozenset[int]
+    ) -> tuple[int, list[tuple[int, int]]] | None:
+        for production in self._alternatives[symbol]:
+            spans = self._split(production, start, end, chain)
+            if spans is not None:
+                return production, spans
+
+        return None
+
+    def _derivable(
+        self, symbol: int, start: int, end: int, chain: frozenset[int]
+    ) -> bool:
+        if symbol in chain:
+            return False
+
+        chain = chain | {symbol}
+        key = (symbol, start, end, chain)
+        if key not in self._choices:
+            self._choices[key] = self._choose(symbol, start, end, chain)
+
+        return self._choices[key] is not None
+
+    def _split(
+        self, production: int, start: int, end: int, chain: frozenset[int]
+    ) -> list[tuple[int, int]] | None:
+        """
+        Spans of the right side of ``production`` covering ``[start, end)``,
+        preferring shorter later children, or ``None``.
+        """
+        kinds = self._kinds
+        completed = self._completed
+        origins = self._origins
+        terminal_count = self._terminal_count
+        rhs = self._productions[production]
+        last = len(rhs) - 1
+
+        if last < 0:
+            return [] if start == end else None
+
+        if last == 0:
+            symbol = rhs[0]
+            if symbol < terminal_count:
+                matched = end == start + 1 and kinds[start] == symbol
+            else:
+                ends = completed[start].get(symbol, [])
+                upper = bisect_right(ends, end)
+                matched = (
+                    upper > 0
+                    and ends[upper - 1] == end
+                    and self._derivable(symbol, start, end, chain)
+                )
+            return [(start, end)] if matched else None
+
+        failed: set[tuple[int, int]] = set()
+        spans: list[tuple[int, int]] = []
+
+        def search(index: int, position: int) -> bool:
+            symbol = rhs[index]
+
+            candidates: Iterable[int]
+            if symbol < terminal_count:
+                if position <= start or kinds[position - 1] != symbol:
+                    return False
+                candidates = (position - 1,)
+            else:
+                starts = origins[position].get(symbol, [])
+                lower = bisect_left(starts, start)
+                if index == 0:
+                    candidates = (
+                        (start,)
+                        if lower < len(starts) and starts[lower] == start
+                        else ()
+                    )
+                else:
+                    candidates = (
+                        starts[k] for k in range(len(starts) - 1, lower - 1, -1)
+                    )
+
+            for child_start in candidates:
+                if index == 0 and child_start != start:
+                    continue
+                if (index - 1, child_start) in failed:
+                    continue
+                if (
+                    symbol >= terminal_count
+                    and child_start == start
+                    and position == end
+                    and not self._derivable(symbol, start, end, chain)
+                ):
+                    continue
+
+                spans.append((child_start, position))
+                if index == 0 or search(index - 1, child_start):
+                    return True
+                spans.pop()
+                failed.add((index - 1, child_start))
+
+            return False
+
+        if not search(last, end):
+            return None
+
+        spans.reverse()
+        return spans
+
+
+def select_parser(
+    gramma: Gramma, instrumentation: Instrumentation | None = None
+) -> Parser:
+    """
+    The runtime parser suited to ``gramma``: the table-driven LL(1) ``Parser``
+    when its parsing table has no conflicts, an ``EarleyParser`` otherwise.
+    """
+    if gramma.IsLL1 or gramma.Precedence:
+        return Parser(gramma, instrumentation)
+
+    return EarleyParser(gramma, instrumentation)
@@ -1,5 +1,15 @@
+import mmap
+from contextlib import nullcontext
 from dataclasses import dataclass
 from enum import Enum, auto
+from os import PathLike
+from typing import Any, ContextManager
+
+from .gramma_image import LAZY_GRAMMA_ATTRIBUTES, GrammaImage, encode_gramma
+from .instrumentation import Instrumentation
+from .location import LineIndex
+
+PRECEDENCE_ASSOCIATIVITIES = ("left", "right", "prefix")
 
 
 class GrammaToken(Enum):
@@ -14,45 +24,72 @@ class GrammaToken(Enum):
 class Token:
     type: GrammaToken
     value: str
+    offset: int = 0
 
 
 class Gramma:
     @staticmethod
-    def parse(gramma_str: str) -> "Gramma":
-        lexma_part = Gramma.parser_section(gramma_str, "lexma")
+    def parse(
+        gramma_str: str, instrumentation: Instrumentation | None = None
+    ) -> "Gramma":
+        with Gramma._phase(instrumentation, "section_split"):
+            lexma_part = Gramma.parser_section(gramma_str, "lexma")
+
+            if lexma_part is None:
+                lexicals: dict[str, str] = {}
+            else:
+                lexicals: dict[str, str] = Gramma.lexical_parse(lexma_part, gramma_str)
 
-        if lexma_part is None:
-            lexicals: dict[str, str] = {}
-        else:
-            lexicals: dict[str, str] = Gramma.lexical_parse(lexma_part)
+            macro_part = Gramma.parser_section(gramma_str, "macro")
+            if macro_part is None:
+                macros = {}
+            else:
+                macros = Gramma.macro_parse(macro_part, gramma_str)
 
-        macro_part = Gramma.parser_section(gramma_str, "macro")
-        if macro_part is None:
-            macros = {}
-        else:
-            macros = Gramma.macro_parse(macro_part)
+            precedence_part = Gramma.parser_section(gramma_str, "precedence")
+            if precedence_part is None:
+                precedence = {}
+            else:
+                precedence = Gramma.precedence_parse(precedence_part, gramma_str)
 
-        gramma_part = Gramma.parser_section(gramma_str, "gramma")
-        assert gramma_part is not None, "No /start-gramma ... /end-gramma section found"
+            gramma_part = Gramma.parser_section(gramma_str, "gramma")
+            assert (
+                gramma_part is not None
+            ), "No /start-gramma ... /end-gramma section found"
+
+        with Gramma._phase(instrumentation, "macro_expansion"):
+            for macro_name, macro_value in macros.items():
+                gramma_part = gramma_part.replace(macro_name, macro_value)
 
-        for macro_name, macro_value in macros.items():
-            gramma_part = gramma_part.replace(macro_name, macro_value)
+        return Gramma(gramma_part, lexicals, instrumentation, gramma_str, precedence)
+
+    @staticmethod
+    def _phase(
+        instrumentation: Instrumentation | None, name: str
+    ) -> ContextManager[None]:
+        if instrumentation is None:
+            return nullcontext()
 
-        return Gramma(gramma_part, lexicals)
+        return instrumentation.phase(name)
 
     @staticmethod
-    def lexical_parse(lexma_str: str) -> dict[str, str]:
+    def lexical_parse(lexma_str: str, source: str | None = None) -> dict[str, str]:
         lexma_str = lexma_str.strip()
         lexma_strs = lexma_str.split("\n")
         lexicals: dict[str, str] = {}
 
-        for line in lexma_strs:
+        for number, line in enumerate(lexma_strs):
             line = line.strip()
             if line == "":
                 continue
 
             if ":" not in line:
-                raise ValueError(f"Invalid lexical definition: {line}")
+                line_number, column = Gramma.section_location(
+                    source, "lexma", lexma_str, Gramma._line_offset(lexma_strs, number)
+                )
+                raise ValueError(
+                    f"Invalid lexical definition at line {line_number}, column {column}: {line}"
+                )
 
             lexical_name, lexical_value = line.split(":", 1)
             lexicals[lexical_name.strip()] = lexical_value.strip()
@@ -72,25 +109,116 @@ class Gramma:
             return None
 
     @staticmethod
-    def macro_parse(macro_str: str) -> dict[str, str]:
+    def macro_parse(macro_str: str, source: str | None = None) -> dict[str, str]:
         macro_str = macro_str.strip()
         macro_strs = macro_str.split("\n")
         macros: dict[str, str] = {}
 
-        for line in macro_strs:
+        for number, line in enumerate(macro_strs):
             line = line.strip()
             if line == "":
                 continue
 
             if ":" not in line:
-                raise ValueError(f"Invalid macro definition: {line}")
+                line_number, column = Gramma.section_location(
+                    source, "macro", macro_str, Gramma._line_offset(macro_strs, number)
+                )
+                raise ValueError(
+                    f"Invalid macro definition at line {line_number}, column {column}: {line}"
+                )
 
             macro_name, macro_value = line.split(":", 1)
             macros[macro_name.strip()] = macro_value.strip()
 
         return macros
 
-    def __init__(self, gramma_part: str, lexicals: dict[str, str]) -> None:
+    @staticmethod
+    def precedence_parse(
+        precedence_str: str, source: str | None = None
+    ) -> dict[str, list[tuple[str, str, int]]]:
+        """
+        Parse ``NonTerminal: associativity binding_power "op" ...`` lines into
+        ``{non_terminal: [(operator, associativity, binding_power), ...]}``.
+        Associativity is ``left`` or ``right`` for binary operators and
+        ``prefix`` for unary prefix operators; higher powers bind tighter.
+        """
+        precedence_str = precedence_str.strip()
+        precedence_strs = precedence_str.split("\n")
+        precedence: dict[str, list[tuple[str, str, int]]] = {}
+
+        for number, line in enumerate(precedence_strs):
+            line = line.strip()
+            if line == "":
+                continue
+
+            non_terminal, _, declaration = line.partition(":")
+            parts = declaration.split()
+
+            if (
+                not non_terminal.strip()
+                or len(parts) < 3
+                or parts[0] not in PRECEDENCE_ASSOCIATIVITIES
+                or not parts[1].isdigit()
+                or not all(
+                    len(part) > 2 and part.startswith('"') and part.endswith('"')
+                    for part in parts[2:]
+                )
+            ):
+                line_number, column = Gramma.section_location(
+                    source,
+                    "precedence",
+                    precedence_str,
+                    Gramma._line_offset(precedence_strs, number),
+                )
+                raise ValueError(
+                    f"Invalid precedence definition at line {line_number}, column {column}: {line}"
+                )
+
+            operators = precedence.setdefault(non_terminal.strip(), [])
+            for operator in parts[2:]:
+                operators.append((operator, parts[0], int(parts[1])))
+
+        return precedence
+
+    @staticmethod
+    def _line_offset(lines: list[str], number: int) -> int:
+        line = lines[number]
+        offset = sum(len(previous) + 1 for previous in lines[:number])
+        return offset + len(line) - len(line.lstrip())
+
+    @staticmethod
+    def section_location(
+        source: str | None, section_header: str, section: str, offset: int
+    ) -> tuple[int, int]:
+        """
+        1-based ``(line, column)`` of ``offset`` in the stripped content of a
+        section, relative to the whole ``source`` when it is given. Only used
+        to report errors, so nothing is indexed until something goes wrong.
+        Macros never span lines, so line numbers stay exact after expansion;
+        columns on a line using a macro count the expanded text.
+        """
+        line, column = LineIndex(section).location(offset)
+        if source is None:
+            return line, column
+
+        header = f"/start-{section_header}"
+        start = source.find(header) + len(header)
+        start += len(source[start:]) - len(source[start:].lstrip())
+        first_line, first_column = LineIndex(source).location(start)
+
+        if line == 1:
+            column += first_column - 1
+
+        return first_line + line - 1, column
+
+    def __init__(
+        self,
+        gramma_part: str,
+        lexicals: dict[str, str],
+        instrumentation: Instrumentation | None = None,
+        source: str | None = None,
+        precedence: dict[str, list[tuple[str, str, int]]] | None = None,
+    ) -> None:
         self._terminals: set[str] = set()
         self._non_terminals: set[str] = set()
         self._productions: list[tuple[str, list[str], str | None]] = []
@@ -98,12 +226,24 @@ class Gramma:
         self._first_set: dict[str, set[str]] = {}
         self._follow_set: dict[str, set[str]] = {}
         self._parsing_table: dict[str, dict[str, int | None]] = {}
+        self._conflicts: list[tuple[str, str, list[int]]] = []
         self._lexicals: dict[str, str] = lexicals
-
-        tokens = self._lexical_analysis(gramma_part)
-        self._parse_gramma_part(tokens)
-        self._parse_first_set()
-        self._parse_follow_set()
+        self._precedence: dict[str, list[tuple[str, str, int]]] = precedence or {}
+        self._operator_productions: list[tuple[str, list[str], str | None]] = []
+        self._instrumentation = instrumentation
+        self._gramma_part = gramma_part
+        self._source = source
+        self._image: GrammaImage | None = None
+
+        with Gramma._phase(instrumentation, "spec_lexing"):
+            tokens = self._lexical_analysis(gramma_part)
+        with Gramma._phase(instrumentation, "spec_parsing"):
+            self._parse_gramma_part(tokens)
+            self._parse_precedence()
+        with Gramma._phase(instrumentation, "first"):
+            self._parse_first_set()
+        with Gramma._phase(instrumentation, "follow"):
+            self._parse_follow_set()
         # self._parse_parsing_table()
 
     def _lexical_analysis(self, gramma_part: str) -> list[Token]:
@@ -119,9 +259,10 @@ class Gramma:
                     Token(
                         GrammaToken.LEFT_SIDE,
                         gramma_part[token_hold_cursor:cursor].strip(),
+                        token_hold_cursor,
                     )
                 )
-                tokens.append(Token(GrammaToken.COLON, ":"))
+                tokens.append(Token(GrammaToken.COLON, ":", cursor))
                 cursor += 1
                 token_hold_cursor = cursor
             elif current_char == "{":
@@ -130,9 +271,10 @@ class Gramma:
                     Token(
                         GrammaToken.RIGHT_SIDE,
                         gramma_part[token_hold_cursor:cursor].strip(),
+                        token_hold_cursor,
                     )
                 )
-                tokens.append(Token(GrammaToken.RETURN, return_part))
+                tokens.append(Token(GrammaToken.RETURN, return_part, cursor))
                 cursor = next_cursor
                 token_hold_cursor = cursor
             elif current_char == ";":
@@ -141,10 +283,11 @@ class Gramma:
                         Token(
                             GrammaToken.RIGHT_SIDE,
                             gramma_part[token_hold_cursor:cursor].strip(),
+                            token_hold_cursor,
                         )
                     )
 
-                tokens.append(Token(GrammaToken.SEMICOLON, ";"))
+                tokens.append(Token(GrammaToken.SEMICOLON, ";", cursor))
                 cursor += 1
                 token_hold_cursor = cursor
             elif current_char == "|":
@@ -153,6 +296,7 @@ class Gramma:
                         Token(
                             GrammaToken.RIGHT_SIDE,
                             gramma_part[token_hold_cursor:cursor].strip(),
+                            token_hold_cursor,
                         )
                     )
 
@@ -166,19 +310,21 @@ class Gramma:
         return tokens
 
     def _parse_gramma_part(self, tokens: list[Token]) -> None:
-        assert tokens[-1].type == GrammaToken.SEMICOLON, "Gramma must end with ';'"
+        assert (
+            tokens[-1].type == GrammaToken.SEMICOLON
+        ), f"Gramma must end with ';' at {self._token_location(tokens[-1])}"
         cursor = 0
         current_left_side = tokens[cursor]
         assert (
             current_left_side.type == GrammaToken.LEFT_SIDE
-        ), "Expected left side non-terminal"
+        ), f"Expected left side non-terminal at {self._token_location(current_left_side)}"
         self._start_non_terminal = current_left_side.value
 
         while True:
             current_left_side = tokens[cursor]
             assert (
                 current_left_side.type == GrammaToken.LEFT_SIDE
-            ), "Expected left side non-terminal"
+            ), f"Expected left side non-terminal at {self._token_location(current_left_side)}"
 
             next_semicolon_index = self._find_index(tokens, cursor, GrammaToken.COLON)
             assert next_semicolon_index != -1, "Expected ';' in gramma"
@@ -191,7 +337,7 @@ class Gramma:
                 current_production = tokens[current_production_index]
                 assert (
                     current_production.type == GrammaToken.RIGHT_SIDE
-                ), f"Expected right side production but found {current_production.type} at {current_production_index}"
+                ), f"Expected right side production but found {current_production.type} at {self._token_location(current_production)}"
 
                 production_parts = current_production.value.split(" ")
                 partion_parts: list[str] = []
@@ -226,6 +372,50 @@ class Gramma:
             if cursor >= len(tokens):
                 break
 
+    def _parse_precedence(self) -> None:
+        """
+        Operators of a precedence non-terminal are not part of its productions:
+        the runtime parser handles them with a precedence-climbing loop. For the
+        FIRST/FOLLOW analysis they still behave like ``A: "op" A`` (prefix) and
+        ``A: A "op" A`` (binary) productions.
+        """
+        for non_terminal, operators in self._precedence.items():
+            assert (
+                non_terminal in self._non_terminals
+            ), f"Precedence declared for undefined non-terminal '{non_terminal}'"
+
+            declared: set[tuple[str, bool]] = set()
+            for operator, associativity, _ in operators:
+                prefix = associativity == "prefix"
+                key = (operator, prefix)
+                assert (
+                    key not in declared
+                ), f"Operator {operator} of '{non_terminal}' is declared twice"
+                declared.add(key)
+
+                self._terminals.add(operator)
+                self._operator_productions.append(
+                    Gramma._operator_production(non_terminal, operator, prefix)
+                )
+
+    @staticmethod
+    def _operator_production(
+        non_terminal: str, operator: str, prefix: bool
+    ) -> tuple[str, list[str], str | None]:
+        if prefix:
+            return non_terminal, [operator, non_terminal], None
+
+        return non_terminal, [non_terminal, operator, non_terminal], None
+
+    def _token_location(self, token: Token) -> str:
+        offset = token.offset
+        rest = self._gramma_part[offset:]
+        offset += len(rest) - len(rest.lstrip())
+        line, column = Gramma.section_location(
+            self._source, "gramma", self._gramma_part, offset
+        )
+        return f"line {line}, column {column}"
+
     def _find_index(
         self,
         tokens: list[Token],
@@ -279,6 +469,18 @@ class Gramma:
     def Productions(self) -> list[tuple[str, list[str], str | None]]:
         return self._productions
 
+    @property
+    def Lexicals(self) -> dict[str, str]:
+        return self._lexicals
+
+    @property
+    def Precedence(self) -> dict[str, list[tuple[str, str, int]]]:
+        return self._precedence
+
+    @property
+    def Instrumentation(self) -> Instrumentation | None:
+        return self._instrumentation
+
     @property
     def StartNonTerminal(self) -> str:
         if not self._non_terminals:
@@ -299,12 +501,19 @@ class Gramma:
             self._parse_non_terminal_first_set(symbol)
 
     def _parse_non_terminal_first_set(self, non_terminal: str):
+        if self._instrumentation is not None:
+            self._instrumentation.count("first_iterations")
+
         if non_terminal not in self._first_set:
             self._first_set[non_terminal] = set()
         else:
             return
 
-        productions = [p for p in self._productions if p[0] == non_terminal]
+        productions = [
+            p
+            for p in self._productions + self._operator_productions
+            if p[0] == non_terminal
+        ]
 
         assert (
             len(productions) > 0
@@ -374,6 +583,9 @@ class Gramma:
         return first_set
 
     def _parse_non_terminal_follow_set(self, non_terminal: str) -> None:
+        if self._instrumentation is not None:
+            self._instrumentation.count("follow_iterations")
+
         if non_terminal not in self._follow_set:
             self._follow_set[non_terminal] = set()
         else:
@@ -383,7 +595,9 @@ class Gramma:
             self._follow_set[non_terminal].add("$")  # End of input marker
 
         contained_in_productions = [
-            p for p in self._productions if non_terminal in p[1]
+            p
+            for p in self._productions + self._operator_productions
+            if non_terminal in p[1]
         ]
 
         for production in contained_in_productions:
@@ -413,6 +627,11 @@ class Gramma:
         """
         |      terminal        |      lexical         |  $
         """
+        with Gramma._phase(self._instrumentation, "table"):
+            self._build_parsing_table()
+            self._find_conflicts()
+
+    def _build_parsing_table(self) -> None:
         for non_terminal in self._non_terminals:
             self._parsing_table[non_terminal] = {}
 
@@ -427,18 +646,20 @@ class Gramma:
                 else:
                     self._parsing_table[non_terminal][terminal] = None
 
-                if '""' in first_set:
-                    for terminal in follow_set:
-                        self._parsing_table[non_terminal][terminal] = (
-                            self._find_esp_production_index(non_terminal)
-                        )
-
             for lexical in self._lexicals:
                 self._parsing_table[non_terminal][lexical] = (
                     self._find_production_index(non_terminal, lexical)
                 )
                 # self._parsing_table[non_terminal][lexical] = None
 
+            # The epsilon entries go in last: the column loops above write None
+            # into every cell outside FIRST, which would hide a FOLLOW lexical.
+            if '""' in first_set:
+                for terminal in follow_set:
+                    self._parsing_table[non_terminal][terminal] = (
+                        self._find_esp_production_index(non_terminal)
+                    )
+
             if "$" not in self._parsing_table[non_terminal]:
                 self._parsing_table[non_terminal]["$"] = None
             # if "$" in follow_set:
@@ -451,6 +672,49 @@ class Gramma:
             if '""' in self._parsing_table[non_terminal]:
                 del self._parsing_table[non_terminal]['""']
 
+    def _find_conflicts(self) -> None:
+        """
+        Collect the cells of the parsing table that more than one production
+        could fill. The table itself keeps the first production whose FIRST
+        set holds the lookahead, except in FIRST/FOLLOW conflicts, where the
+        epsilon production written last by the FOLLOW pass wins. A gramma with
+        conflicts is not LL(1) and needs a general parsing engine. Operator
+        productions of the precedence section are left out, they are resolved
+        by binding power.
+        """
+        self._conflicts = []
+        non_terminals = list(dict.fromkeys(lhs for lhs, _, _ in self._productions))
+        columns = (
+            sorted(t for t in self._terminals if t != '""')
+            + list(self._lexicals)
+            + ["$"]
+        )
+
+        for non_terminal in non_terminals:
+            follow_set = self._follow_set.get(non_terminal, set())
+            candidates: dict[str, list[int]] = {}
+
+            for index, (lhs, rhs, _) in enumerate(self._productions):
+                if lhs != non_terminal:
+                    continue
+
+                lookaheads = self._get_first_set(rhs) - {'""'}
+                if self._is_nullable(rhs):
+                    lookaheads |= follow_set
+
+                for lookahead in lookaheads:
+                    candidates.setdefault(lookahead, []).append(index)
+
+            for column in columns:
+                if len(candidates.get(column, ())) > 1:
+                    self._conflicts.append((non_terminal, column, candidates[column]))
+
+    def _is_nullable(self, symbols: list[str]) -> bool:
+        return all(
+            symbol == '""' or '""' in self._first_set.get(symbol, ())
+            for symbol in symbols
+        )
+
     def _find_esp_production_index(self, non_terminal: str) -> int | None:
         for index, production in enumerate(self._productions):
             lhs = production[0]
@@ -478,3 +742,85 @@ class Gramma:
     @property
     def ParsingTable(self) -> dict[str, dict[str, int | None]]:
         return self._parsing_table
+
+    @property
+    def Conflicts(self) -> list[tuple[str, str, list[int]]]:
+        """
+        ``(non_terminal, lookahead, production_indices)`` for every ambiguous
+        cell of the parsing table.
+        """
+        if self._image is None and not self._parsing_table:
+            self.parse_parsing_table()
+
+        return self._conflicts
+
+    @property
+    def IsLL1(self) -> bool:
+        return not self.Conflicts
+
+    @property
+    def Image(self) -> GrammaImage | None:
+        """
+        The binary image this gramma was loaded from, if any.
+        """
+        return self._image
+
+    def to_bytes(self) -> bytes:
+        """
+        Serialize the analysed gramma (symbols, productions, precedence,
+        nullable/FIRST/FOLLOW bitsets, parsing table, conflicts and lexical
+        patterns) into the versioned image read by ``Gramma.from_bytes``.
+        """
+        return encode_gramma(self)
+
+    @staticmethod
+    def from_bytes(data: bytes | bytearray | memoryview | mmap.mmap) -> "Gramma":
+        """
+        Open a gramma image. Only the header and the symbol table are read
+        here; the other sections are decoded when first used.
+        """
+        image = GrammaImage(data)
+
+        gramma = Gramma.__new__(Gramma)
+        gramma._image = image
+        gramma._terminals = set(image.Terminals)
+        gramma._non_terminals = set(image.NonTerminals)
+        gramma._start_non_terminal = image.StartNonTerminal
+        gramma._lexicals = image.lexicals()
+        gramma._instrumentation = None
+        gramma._gramma_part = ""
+        gramma._source = None
+        return gramma
+
+    @staticmethod
+    def load(path: str | PathLike[str]) -> "Gramma":
+        """
+        Memory-map a gramma image written with ``to_bytes``.
+        """
+        with open(path, "rb") as file:
+            mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        return Gramma.from_bytes(mapped)
+
+    def __getattr__(self, name: str) -> Any:
+        # Only reached for attributes a gramma loaded from an image has not
+        # decoded yet.
+        image = self.__dict__.get("_image")
+        if image is None or (
+            name not in LAZY_GRAMMA_ATTRIBUTES and name != "_operator_productions"
+        ):
+            raise AttributeError(name)
+
+        if name == "_operator_productions":
+            value: Any = [
+                Gramma._operator_production(
+                    non_terminal, operator, associativity == "prefix"
+                )
+                for non_terminal, operators in self._precedence.items()
+                for operator, associativity, _ in operators
+            ]
+        else:
+            value = LAZY_GRAMMA_ATTRIBUTES[name](image)
+
+        setattr(self, name, value)
+        return value
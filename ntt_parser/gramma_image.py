@@ -0,0 +1,425 @@
+import struct
+from array import array
+from typing import TYPE_CHECKING, Any, Callable
+
+from .tree import _from_little_endian, _to_little_endian
+
+if TYPE_CHECKING:
+    from .gramma import Gramma
+
+_GRAMMA_MAGIC = b"NTTG"
+_GRAMMA_VERSION = 1
+_GRAMMA_HEADER = struct.Struct("<4sHHI")
+_SECTION_ENTRY = struct.Struct("<IIQQ")
+_META = struct.Struct("<IIII")
+
+EPSILON = '""'
+END_OF_INPUT = "$"
+NO_ENTRY = -1
+
+# Section ids of the gramma image.
+SECTION_META = 1
+SECTION_SYMBOLS = 2
+SECTION_LEXICALS = 3
+SECTION_PRODUCTIONS = 4
+SECTION_ACTIONS = 5
+SECTION_PRECEDENCE = 6
+SECTION_NULLABLE = 7
+SECTION_FIRST = 8
+SECTION_FOLLOW = 9
+SECTION_TABLE = 10
+SECTION_CONFLICTS = 11
+
+
+def _padded(data: bytes) -> bytes:
+    return data + b"\0" * (-len(data) % 8)
+
+
+def _pack_ints(values: list[int]) -> bytes:
+    return struct.pack("<I", len(values)) + _to_little_endian(array("i", values))
+
+
+def _pack_strings(values: list[str | None]) -> bytes:
+    """
+    ``count``, a presence bitset (``None`` entries are absent), ``count + 1``
+    offsets into the UTF-8 blob, then the blob.
+    """
+    encoded = [b"" if value is None else value.encode("utf-8") for value in values]
+    offsets = [0]
+    for value in encoded:
+        offsets.append(offsets[-1] + len(value))
+
+    present = _pack_bitset(
+        [index for index, value in enumerate(values) if value is not None], len(values)
+    )
+    return b"".join(
+        [
+            struct.pack("<I", len(values)),
+            present,
+            _to_little_endian(array("i", offsets)),
+            b"".join(encoded),
+        ]
+    )
+
+
+def _pack_bitset(indices: list[int], size: int) -> bytes:
+    bits = bytearray((size + 7) // 8)
+    for index in indices:
+        bits[index >> 3] |= 1 << (index & 7)
+    return bytes(bits)
+
+
+def _bitset_indices(bits: memoryview | bytes) -> list[int]:
+    value = int.from_bytes(bits, "little")
+    indices: list[int] = []
+
+    while value:
+        lowest = value & -value
+        indices.append(lowest.bit_length() - 1)
+        value ^= lowest
+
+    return indices
+
+
+def encode_gramma(gramma: "Gramma") -> bytes:
+    """
+    Serialize an analysed ``gramma`` into the sectioned little-endian image
+    read by ``GrammaImage``. Symbols get canonical ids (sorted terminals,
+    lexicals in declaration order, ``$``, non-terminals in order of first
+    definition) and every set becomes a bitset over them, so the same gramma
+    always gives the same bytes.
+    """
+    if not gramma.ParsingTable:
+        gramma.parse_parsing_table()
+
+    terminals = sorted(gramma.Terminals)
+    lexicals = list(gramma.Lexicals)
+    non_terminals = list(dict.fromkeys(lhs for lhs, _, _ in gramma.Productions))
+    symbols = terminals + lexicals + [END_OF_INPUT] + non_terminals
+    ids = {symbol: index for index, symbol in enumerate(symbols)}
+    columns = [ids[t] for t in terminals if t != EPSILON] + [
+        ids[symbol] for symbol in lexicals + [END_OF_INPUT]
+    ]
+
+    productions = gramma.Productions
+    rhs_offsets = [0]
+    rhs_symbols: list[int] = []
+    for _, rhs, _ in productions:
+        rhs_symbols.extend(ids[symbol] for symbol in rhs)
+        rhs_offsets.append(len(rhs_symbols))
+
+    associativities = ["left", "right", "prefix"]
+    precedence: list[int] = []
+    for non_terminal, operators in gramma.Precedence.items():
+        for operator, associativity, power in operators:
+            precedence.extend(
+                [
+                    ids[non_terminal],
+                    ids[operator],
+                    associativities.index(associativity),
+                    power,
+                ]
+            )
+
+    first_sets = dict(gramma.FirstSet)
+    follow_sets = dict(gramma.FollowSet)
+    nullable = [
+        row
+        for row, non_terminal in enumerate(non_terminals)
+        if EPSILON in first_sets.get(non_terminal, ())
+    ]
+    first_rows = [
+        _pack_bitset(
+            [ids[s] for s in first_sets.get(nt, ()) if s != EPSILON], len(symbols)
+        )
+        for nt in non_terminals
+    ]
+    follow_rows = [
+        _pack_bitset([ids[s] for s in follow_sets.get(nt, ())], len(symbols))
+        for nt in non_terminals
+    ]
+
+    # The table is stored sparse: per row, the filled columns (as positions
+    # in ``columns``) and their productions.
+    row_offsets = [0]
+    entry_columns: list[int] = []
+    entry_productions: list[int] = []
+    for non_terminal in non_terminals:
+        row = gramma.ParsingTable.get(non_terminal, {})
+        for position, column in enumerate(columns):
+            production = row.get(symbols[column])
+            if production is not None:
+                entry_columns.append(position)
+                entry_productions.append(production)
+        row_offsets.append(len(entry_columns))
+
+    conflicts: list[int] = []
+    for non_terminal, lookahead, candidates in gramma.Conflicts:
+        conflicts.extend([ids[non_terminal], ids[lookahead], len(candidates)])
+        conflicts.extend(candidates)
+
+    sections = {
+        SECTION_META: _META.pack(
+            len(terminals),
+            len(lexicals),
+            len(non_terminals),
+            ids[gramma.StartNonTerminal],
+        ),
+        SECTION_SYMBOLS: _pack_strings(list(symbols)),
+        SECTION_LEXICALS: _pack_strings([gramma.Lexicals[name] for name in lexicals]),
+        SECTION_PRODUCTIONS: b"".join(
+            [
+                _pack_ints([ids[lhs] for lhs, _, _ in productions]),
+                _pack_ints(rhs_offsets),
+                _pack_ints(rhs_symbols),
+            ]
+        ),
+        SECTION_ACTIONS: _pack_strings([action for _, _, action in productions]),
+        SECTION_PRECEDENCE: _pack_ints(precedence),
+        SECTION_NULLABLE: _pack_bitset(nullable, len(non_terminals)),
+        SECTION_FIRST: b"".join(first_rows),
+        SECTION_FOLLOW: b"".join(follow_rows),
+        SECTION_TABLE: b"".join(
+            [
+                _pack_ints(columns),
+                _pack_ints(row_offsets),
+                _pack_ints(entry_columns),
+                _pack_ints(entry_productions),
+            ]
+        ),
+        SECTION_CONFLICTS: _pack_ints(conflicts),
+    }
+
+    cursor = len(
+        _padded(bytes(_GRAMMA_HEADER.size + _SECTION_ENTRY.size * len(sections)))
+    )
+    entries: list[bytes] = []
+    bodies: list[bytes] = []
+    for section, body in sections.items():
+        entries.append(_SECTION_ENTRY.pack(section, 0, cursor, len(body)))
+        padded = _padded(body)
+        bodies.append(padded)
+        cursor += len(padded)
+
+    header = _GRAMMA_HEADER.pack(_GRAMMA_MAGIC, _GRAMMA_VERSION, 0, len(sections))
+    return b"".join([_padded(header + b"".join(entries))] + bodies)
+
+
+class GrammaImage:
+    """
+    Read side of the gramma image. Opening an image only checks the header
+    and reads the section table and symbols; every other section is decoded
+    the first time it is asked for, straight from the underlying buffer
+    (typically an ``mmap``).
+    """
+
+    def __init__(self, data: bytes | bytearray | memoryview | Any) -> None:
+        view = memoryview(data)
+        if len(view) < _GRAMMA_HEADER.size:
+            raise ValueError("Truncated gramma image")
+
+        magic, version, _, section_count = _GRAMMA_HEADER.unpack_from(view, 0)
+
+        if magic != _GRAMMA_MAGIC:
+            raise ValueError("Not a serialized gramma")
+        if version != _GRAMMA_VERSION:
+            raise ValueError(f"Unsupported gramma version: {version}")
+        if len(view) < _GRAMMA_HEADER.size + section_count * _SECTION_ENTRY.size:
+            raise ValueError("Truncated gramma image")
+
+        self._view = view
+        self._sections: dict[int, tuple[int, int]] = {}
+        for index in range(section_count):
+            section, _, offset, size = _SECTION_ENTRY.unpack_from(
+                view, _GRAMMA_HEADER.size + index * _SECTION_ENTRY.size
+            )
+            if offset + size > len(view):
+                raise ValueError("Truncated gramma image")
+            self._sections[section] = (offset, size)
+
+        meta = self._section(SECTION_META)
+        if len(meta) < _META.size:
+            raise ValueError("Truncated gramma image")
+
+        (
+            self._terminal_count,
+            self._lexical_count,
+            self._non_terminal_count,
+            self._start,
+        ) = _META.unpack_from(meta, 0)
+        self._symbols = self._strings(SECTION_SYMBOLS)
+
+    def _section(self, section: int) -> memoryview:
+        if section not in self._sections:
+            raise ValueError(f"Gramma image has no section {section}")
+
+        offset, size = self._sections[section]
+        return self._view[offset : offset + size]
+
+    def _strings(self, section: int) -> list[str | None]:
+        view = self._section(section)
+        (count,) = struct.unpack_from("<I", view, 0)
+        cursor = 4 + (count + 7) // 8
+        offsets, cursor = _from_little_endian(view, cursor, "i", count + 1)
+        blob = bytes(view[cursor : cursor + offsets[-1]])
+        present = view[4:]
+
+        return [
+            (
+                blob[offsets[index] : offsets[index + 1]].decode("utf-8")
+                if present[index >> 3] >> (index & 7) & 1
+                else None
+            )
+            for index in range(count)
+        ]
+
+    @staticmethod
+    def _ints(view: memoryview, cursor: int) -> tuple[array, int]:
+        (count,) = struct.unpack_from("<I", view, cursor)
+        return _from_little_endian(view, cursor + 4, "i", count)
+
+    @property
+    def Symbols(self) -> list[str]:
+        return self._symbols  # type: ignore
+
+    @property
+    def Terminals(self) -> list[str]:
+        return self.Symbols[: self._terminal_count]
+
+    @property
+    def NonTerminals(self) -> list[str]:
+        return self.Symbols[len(self.Symbols) - self._non_terminal_count :]
+
+    @property
+    def StartNonTerminal(self) -> str:
+        return self.Symbols[self._start]
+
+    def lexicals(self) -> dict[str, str]:
+        names = self.Symbols[
+            self._terminal_count : self._terminal_count + self._lexical_count
+        ]
+        return dict(zip(names, self._strings(SECTION_LEXICALS)))  # type: ignore
+
+    def productions(self) -> list[tuple[str, list[str], str | None]]:
+        view = self._section(SECTION_PRODUCTIONS)
+        lhs, cursor = self._ints(view, 0)
+        offsets, cursor = self._ints(view, cursor)
+        rhs, _ = self._ints(view, cursor)
+        actions = self._strings(SECTION_ACTIONS)
+        symbols = self.Symbols
+
+        return [
+            (
+                symbols[lhs[index]],
+                [
+                    symbols[symbol]
+                    for symbol in rhs[offsets[index] : offsets[index + 1]]
+                ],
+                actions[index],
+            )
+            for index in range(len(lhs))
+        ]
+
+    def precedence(self) -> dict[str, list[tuple[str, str, int]]]:
+        values, _ = self._ints(self._section(SECTION_PRECEDENCE), 0)
+        associativities = ["left", "right", "prefix"]
+        symbols = self.Symbols
+        precedence: dict[str, list[tuple[str, str, int]]] = {}
+
+        for index in range(0, len(values), 4):
+            non_terminal, operator, associativity, power = values[index : index + 4]
+            precedence.setdefault(symbols[non_terminal], []).append(
+                (symbols[operator], associativities[associativity], power)
+            )
+
+        return precedence
+
+    def _set_rows(self, section: int, epsilon: bool) -> dict[str, set[str]]:
+        view = self._section(section)
+        symbols = self.Symbols
+        row_size = (len(symbols) + 7) // 8
+        nullable = self._section(SECTION_NULLABLE)
+        rows: dict[str, set[str]] = {}
+
+        for row, non_terminal in enumerate(self.NonTerminals):
+            bits = view[row * row_size : (row + 1) * row_size]
+            values = {symbols[index] for index in _bitset_indices(bits)}
+            if epsilon and nullable[row >> 3] >> (row & 7) & 1:
+                values.add(EPSILON)
+            rows[non_terminal] = values  # type: ignore
+
+        return rows
+
+    def first_sets(self) -> dict[str, set[str]]:
+        return self._set_rows(SECTION_FIRST, True)
+
+    def follow_sets(self) -> dict[str, set[str]]:
+        return self._set_rows(SECTION_FOLLOW, False)
+
+    def nullable(self) -> list[str]:
+        nullable = self._section(SECTION_NULLABLE)
+        return [self.NonTerminals[row] for row in _bitset_indices(nullable)]
+
+    def _table_entries(self) -> tuple[array, array, array, array]:
+        view = self._section(SECTION_TABLE)
+        columns, cursor = self._ints(view, 0)
+        row_offsets, cursor = self._ints(view, cursor)
+        entry_columns, cursor = self._ints(view, cursor)
+        entry_productions, _ = self._ints(view, cursor)
+        return columns, row_offsets, entry_columns, entry_productions
+
+    def table(self) -> list[int]:
+        """
+        The flat ``non_terminal x column`` table of production indices
+        (``-1`` for no entry), columns being the terminals without ``""``,
+        the lexicals and ``$`` in symbol order.
+        """
+        columns, row_offsets, entry_columns, entry_productions = self._table_entries()
+        width = len(columns)
+        table = [NO_ENTRY] * (self._non_terminal_count * width)
+
+        for row in range(self._non_terminal_count):
+            base = row * width
+            for entry in range(row_offsets[row], row_offsets[row + 1]):
+                table[base + entry_columns[entry]] = entry_productions[entry]
+
+        return table
+
+    def parsing_table(self) -> dict[str, dict[str, int | None]]:
+        columns, row_offsets, entry_columns, entry_productions = self._table_entries()
+        symbols = self.Symbols
+        names = [symbols[column] for column in columns]
+        parsing_table: dict[str, dict[str, int | None]] = {}
+
+        for row, non_terminal in enumerate(self.NonTerminals):
+            cells: dict[str, int | None] = dict.fromkeys(names)
+            for entry in range(row_offsets[row], row_offsets[row + 1]):
+                cells[names[entry_columns[entry]]] = entry_productions[entry]
+            parsing_table[non_terminal] = cells
+
+        return parsing_table
+
+    def conflicts(self) -> list[tuple[str, str, list[int]]]:
+        values, _ = self._ints(self._section(SECTION_CONFLICTS), 0)
+        symbols = self.Symbols
+        conflicts: list[tuple[str, str, list[int]]] = []
+
+        index = 0
+        while index < len(values):
+            non_terminal, lookahead, count = values[index : index + 3]
+            candidates = list(values[index + 3 : index + 3 + count])
+            conflicts.append((symbols[non_terminal], symbols[lookahead], candidates))
+            index += 3 + count
+
+        return conflicts  # type: ignore
+
+
+# Gramma attributes decoded from an image on first access.
+LAZY_GRAMMA_ATTRIBUTES: dict[str, Callable[[GrammaImage], Any]] = {
+    "_productions": GrammaImage.productions,
+    "_precedence": GrammaImage.precedence,
+    "_first_set": GrammaImage.first_sets,
+    "_follow_set": GrammaImage.follow_sets,
+    "_parsing_table": GrammaImage.parsing_table,
+    "_conflicts": GrammaImage.conflicts,
+}
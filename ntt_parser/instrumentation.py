@@ -0,0 +1,84 @@
+import json
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator
+
+PhaseCallback = Callable[[str, dict[str, float]], None]
+
+
+class Instrumentation:
+    """
+    Opt-in phase timers and counters shared by ``Gramma`` and ``Parser``.
+    Components only touch it when one is passed in, so the disabled path costs
+    a ``None`` check per phase.
+
+    With ``trace_memory=True`` every phase also records its tracemalloc peak
+    (``peak_bytes``); ``callback`` is called with the phase name and its
+    record each time a phase ends.
+    """
+
+    def __init__(
+        self, trace_memory: bool = False, callback: PhaseCallback | None = None
+    ) -> None:
+        self._trace_memory = trace_memory
+        self._callback = callback
+        self._phases: dict[str, dict[str, float]] = {}
+        self._counters: dict[str, int] = {}
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        started_tracing = False
+        if self._trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                started_tracing = True
+            tracemalloc.reset_peak()
+
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - started
+            record: dict[str, float] = {"seconds": seconds}
+
+            phase = self._phases.setdefault(name, {"seconds": 0.0, "calls": 0})
+            phase["seconds"] += seconds
+            phase["calls"] += 1
+
+            if self._trace_memory:
+                _, peak = tracemalloc.get_traced_memory()
+                record["peak_bytes"] = peak
+                phase["peak_bytes"] = max(phase.get("peak_bytes", 0), peak)
+                if started_tracing:
+                    tracemalloc.stop()
+
+            if self._callback is not None:
+                self._callback(name, record)
+
+    def count(self, name: str, value: int = 1) -> None:
+        self._counters[name] = self._counters.get(name, 0) + value
+
+    def maximum(self, name: str, value: int) -> None:
+        self._counters[name] = max(self._counters.get(name, 0), value)
+
+    def reset(self) -> None:
+        self._phases = {}
+        self._counters = {}
+
+    @property
+    def Phases(self) -> dict[str, dict[str, float]]:
+        return self._phases
+
+    @property
+    def Counters(self) -> dict[str, int]:
+        return self._counters
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "phases": {name: dict(phase) for name, phase in self._phases.items()},
+            "counters": dict(self._counters),
+        }
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict())
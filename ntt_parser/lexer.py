@@ -0,0 +1,370 @@
+import re
+from array import array
+from bisect import bisect_left
+from typing import Iterator
+
+from .location import LineIndex, SourceError
+from .shifts import Shifts, copy_values
+
+
+class LexError(SourceError):
+    pass
+
+
+class Tokens:
+    """
+    Struct-of-arrays token stream: token i has kind ``Kinds[i]`` and covers
+    ``Source[Starts[i]:Ends[i]]``. The last token is always the end marker.
+
+    Tokens spliced by an incremental parse keep the offsets of the unchanged
+    tail as they were and owe the edit's delta through ``shifts``; ``start``
+    and ``end`` read single offsets without settling them, the ``Starts`` and
+    ``Ends`` columns settle them all first.
+    """
+
+    def __init__(
+        self,
+        source: str,
+        kinds: array,
+        starts: array,
+        ends: array,
+        shifts: Shifts | None = None,
+    ) -> None:
+        self._source = source
+        self._kinds = kinds
+        self._starts = starts
+        self._ends = ends
+        self._shifts = shifts if shifts is not None else Shifts()
+        self._lines: LineIndex | None = None
+
+    def __len__(self) -> int:
+        return len(self._kinds)
+
+    def start(self, index: int) -> int:
+        if self._shifts:
+            return self._starts[index] + self._shifts.at(index)
+
+        return self._starts[index]
+
+    def end(self, index: int) -> int:
+        if self._shifts:
+            return self._ends[index] + self._shifts.at(index)
+
+        return self._ends[index]
+
+    def text(self, index: int) -> str:
+        return self._source[self.start(index) : self.end(index)]
+
+    def bisect_start(self, offset: int, low: int = 0, high: int = -1) -> int:
+        """
+        Index of the first token in ``[low, high)`` starting at or after
+        ``offset``, as ``bisect_left`` over ``Starts``.
+        """
+        high = len(self._kinds) if high < 0 else high
+        if self._shifts:
+            return bisect_left(range(high), offset, low, high, key=self.start)
+
+        return bisect_left(self._starts, offset, low, high)
+
+    def bisect_end(self, offset: int) -> int:
+        """
+        Index of the first token ending at or after ``offset``.
+        """
+        if self._shifts:
+            return bisect_left(range(len(self._kinds)), offset, key=self.end)
+
+        return bisect_left(self._ends, offset)
+
+    def splice(
+        self,
+        source: str,
+        first: int,
+        tail: int,
+        tokens: tuple[array, array, array],
+        delta: int,
+    ) -> "Tokens":
+        """
+        Tokens of the edited ``source``: these up to ``first``, the relexed
+        ``tokens``, then these from ``tail`` on, ``delta`` characters later.
+        The tail is copied as it is and owes ``delta`` lazily.
+        """
+        kinds, starts, ends = tokens
+        new_kinds = self._kinds[:first]
+        new_starts = self._starts[:first]
+        new_ends = self._ends[:first]
+        self._shifts.apply(new_starts, 0, first)
+        self._shifts.apply(new_ends, 0, first)
+        new_kinds.extend(kinds)
+        new_starts.extend(starts)
+        new_ends.extend(ends)
+        shifts = Shifts()
+        shifts.copy(self._shifts, tail, len(self._kinds), len(new_kinds) - tail, delta)
+        copy_values(new_kinds, self._kinds, tail, len(self._kinds))
+        copy_values(new_starts, self._starts, tail, len(self._kinds))
+        copy_values(new_ends, self._ends, tail, len(self._kinds))
+        return Tokens(source, new_kinds, new_starts, new_ends, shifts)
+
+    def _settle(self) -> None:
+        if self._shifts:
+            self._shifts.apply(self._starts, 0, len(self._starts))
+            self._shifts.apply(self._ends, 0, len(self._ends))
+            self._shifts = Shifts()
+
+    @property
+    def Source(self) -> str:
+        return self._source
+
+    @property
+    def Kinds(self) -> array:
+        return self._kinds
+
+    @property
+    def Starts(self) -> array:
+        self._settle()
+        return self._starts
+
+    @property
+    def Ends(self) -> array:
+        self._settle()
+        return self._ends
+
+    @property
+    def Lines(self) -> LineIndex:
+        if self._lines is None:
+            self._lines = LineIndex(self._source)
+
+        return self._lines
+
+
+class Lexer:
+    """
+    Regex based lexer built from the terminals (``"..."`` literals) and the
+    lexicals (``name: /regex/``) of a gramma.
+
+    Lexicals are tried before literals; a lexical match whose text is exactly a
+    literal is reported as that literal, so keywords win over identifiers.
+    """
+
+    def __init__(
+        self,
+        literals: dict[str, int],
+        lexicals: dict[str, tuple[str, int]],
+        end_kind: int,
+    ) -> None:
+        self._end_kind = end_kind
+        self._literal_kinds: dict[str, int] = dict(literals)
+        self._group_kinds: dict[str, int] = {}
+
+        alternatives: list[str] = []
+
+        for index, (pattern, kind) in enumerate(lexicals.values()):
+            group = f"L{index}"
+            self._group_kinds[group] = kind
+            alternatives.append(f"(?P<{group}>{pattern})")
+
+        # All literals share one group, longest first; the matched text gives
+        # the kind, as it does for keywords matched by a lexical.
+        if self._literal_kinds:
+            literals_pattern = "|".join(
+                re.escape(literal)
+                for literal in sorted(self._literal_kinds, key=len, reverse=True)
+            )
+            alternatives.append(f"(?P<T>{literals_pattern})")
+
+        self._skip = re.compile(r"\s*")
+        self._pattern = re.compile("|".join(alternatives) if alternatives else "(?!)")
+
+    @staticmethod
+    def lexical_pattern(lexical_value: str) -> str:
+        if len(lexical_value) >= 2 and lexical_value[0] == lexical_value[-1] == "/":
+            return lexical_value[1:-1]
+
+        return re.escape(lexical_value)
+
+    @property
+    def EndKind(self) -> int:
+        return self._end_kind
+
+    def tokenize(self, source: str) -> Tokens:
+        kinds = array("i")
+        starts = array("q")
+        ends = array("q")
+        self.scan_into(source, kinds, starts, ends)
+
+        kinds.append(self._end_kind)
+        starts.append(len(source))
+        ends.append(len(source))
+
+        return Tokens(source, kinds, starts, ends)
+
+    def skip(self, source: str, cursor: int) -> int:
+        return self._skip.match(source, cursor).end()  # type: ignore
+
+    def match(self, source: str, cursor: int) -> tuple[int, int] | None:
+        """
+        Match a single token at ``cursor`` and return its kind and end offset.
+        """
+        matched = self._pattern.match(source, cursor)
+
+        if matched is None or matched.end() == cursor:
+            return None
+
+        group = matched.lastgroup
+        if group == "T":
+            kind = self._literal_kinds[matched.group()]
+        else:
+            kind = self._literal_kinds.get(
+                matched.group(), self._group_kinds[group]  # type: ignore
+            )
+
+        return kind, matched.end()
+
+    def scan(self, source: str, cursor: int) -> Iterator[tuple[int, int, int]]:
+        """
+        Lazily yield ``(kind, start, end)`` for the tokens of ``source`` from
+        ``cursor`` on. Every token boundary is a valid restart point, since the
+        lexer carries no state between tokens.
+        """
+        length = len(source)
+        cursor = self.skip(source, cursor)
+
+        while cursor < length:
+            matched = self.match(source, cursor)
+
+            if matched is None:
+                raise LexError(
+                    f"Unexpected character {source[cursor]!r}",
+                    cursor,
+                    LineIndex(source),
+                )
+
+            kind, end = matched
+            yield kind, cursor, end
+            cursor = self.skip(source, end)
+
+    def scan_into(
+        self,
+        source: str,
+        kinds: array | list[int],
+        starts: array | list[int],
+        ends: array | list[int],
+    ) -> None:
+        """
+        Append every token of ``source`` (without the end marker) to the given
+        buffers.
+        """
+        skip = self._skip.match
+        match = self._pattern.match
+        group_kinds = self._group_kinds
+        literal_kinds = self._literal_kinds
+        length = len(source)
+
+        cursor = skip(source, 0).end()  # type: ignore
+
+        while cursor < length:
+            matched = match(source, cursor)
+
+            if matched is None or matched.end() == cursor:
+                raise LexError(
+                    f"Unexpected character {source[cursor]!r}",
+                    cursor,
+                    LineIndex(source),
+                )
+
+            group = matched.lastgroup
+            if group == "T":
+                kind = literal_kinds[matched.group()]
+            else:
+                kind = literal_kinds.get(matched.group(), group_kinds[group])  # type: ignore
+
+            end = matched.end()
+            kinds.append(kind)
+            starts.append(cursor)
+            ends.append(end)
+            cursor = skip(source, end).end()  # type: ignore
+
+
+class StreamLexer:
+    """
+    Lexes input that arrives in chunks. A token is only emitted once the text
+    after it shows that it cannot grow any more, so the unfinished tail is all
+    that stays buffered. When the tail does not lex yet (``"12."`` waiting for
+    ``"5"``) the token before it is held back as well, since both may still
+    merge into one.
+    """
+
+    def __init__(self, lexer: Lexer, max_token_length: int = 4096) -> None:
+        self._lexer = lexer
+        self._max_token_length = max_token_length
+        self._buffer = ""
+        self._offset = 0
+        self._cursor = 0
+
+    @property
+    def Offset(self) -> int:
+        return self._offset + len(self._buffer)
+
+    def feed(
+        self, text: str, final: bool = False
+    ) -> Iterator[tuple[int, int, int, str]]:
+        """
+        Append ``text`` and lazily yield the completed tokens as
+        ``(kind, start, end, text)`` with offsets into the whole stream. Tokens
+        are lexed as they are consumed, so a large chunk is never lexed in one
+        go.
+        """
+        self._offset += self._cursor
+        self._buffer = self._buffer[self._cursor :] + text
+        self._cursor = 0
+
+        return self._scan(final)
+
+    def _scan(self, final: bool) -> Iterator[tuple[int, int, int, str]]:
+        lexer = self._lexer
+        buffer = self._buffer
+        length = len(buffer)
+        offset = self._offset
+        held: tuple[int, int, int] | None = None
+
+        cursor = lexer.skip(buffer, self._cursor)
+
+        while cursor < length:
+            matched = lexer.match(buffer, cursor)
+
+            if matched is None:
+                if final or not self._is_unfinished(buffer, cursor):
+                    raise LexError(
+                        f"Unexpected character {buffer[cursor]!r}", offset + cursor
+                    )
+                return
+
+            if held is not None:
+                kind, start, end = held
+                self._cursor = end
+                yield kind, offset + start, offset + end, buffer[start:end]
+
+            kind, end = matched
+            held = (kind, cursor, end)
+
+            if end == length and not final:
+                return
+
+            cursor = lexer.skip(buffer, end)
+
+        if held is not None:
+            kind, start, end = held
+            self._cursor = end
+            yield kind, offset + start, offset + end, buffer[start:end]
+
+    def _is_unfinished(self, buffer: str, cursor: int) -> bool:
+        """
+        Whether the text at ``cursor`` may still become a token once more text
+        arrives: it has to run up to the end of the buffer, without whitespace.
+        """
+        return (
+            len(buffer) - cursor <= self._max_token_length
+            and _WHITESPACE.search(buffer, cursor) is None
+        )
+
+
+_WHITESPACE = re.compile(r"\s")
@@ -0,0 +1,64 @@
+import re
+from array import array
+from bisect import bisect_right
+
+_NEWLINE = re.compile("\n")
+
+
+class LineIndex:
+    """
+    Sorted line-start offsets of a text, used to turn offsets into 1-based
+    ``(line, column)`` pairs by bisection. The offsets are only collected on
+    the first lookup, so creating an index that is never queried is free.
+    """
+
+    def __init__(self, text: str) -> None:
+        self._text = text
+        self._line_starts: array | None = None
+
+    @property
+    def LineStarts(self) -> array:
+        if self._line_starts is None:
+            line_starts = array("q", [0])
+            line_starts.extend(
+                matched.end() for matched in _NEWLINE.finditer(self._text)
+            )
+            self._line_starts = line_starts
+
+        return self._line_starts
+
+    def location(self, offset: int) -> tuple[int, int]:
+        line_starts = self.LineStarts
+        line = bisect_right(line_starts, offset)
+        return line, offset - line_starts[line - 1] + 1
+
+
+class SourceError(ValueError):
+    """
+    Error at an ``offset`` of some source text. When the error knows the
+    ``LineIndex`` of that text its message ends with the line and column,
+    resolved only when the location is asked for.
+    """
+
+    def __init__(
+        self, message: str, offset: int, lines: LineIndex | None = None
+    ) -> None:
+        super().__init__(message)
+        self.offset = offset
+        self.lines = lines
+
+    @property
+    def location(self) -> tuple[int, int] | None:
+        if self.lines is None:
+            return None
+
+        return self.lines.location(self.offset)
+
+    def __str__(self) -> str:
+        message = super().__str__()
+        location = self.location
+
+        if location is None:
+            return message
+
+        return f"{message} (line {location[0]}, column {location[1]})"
@@ -0,0 +1,1136 @@
+from array import array
+from typing import Iterable, Iterator
+
+from .gramma import Gramma
+from .instrumentation import Instrumentation
+from .lexer import Lexer, Tokens
+from .location import LineIndex, SourceError
+from .tree import (
+    ERROR_PRODUCTION,
+    NO_NODE,
+    NO_PRODUCTION,
+    SyntaxTree,
+    TreeBuilder,
+)
+
+EPSILON = '""'
+END_OF_INPUT = "$"
+NO_ENTRY = -1
+
+_CLOSE = -1
+_OPERAND = -2
+_OPERATOR = -3
+_EXPRESSION = -4
+
+_PREFIX = 0
+_BINARY = 1
+_LEAF = 2
+_NESTED = 3
+
+
+class ParseError(SourceError):
+    def __init__(
+        self,
+        message: str,
+        position: int,
+        offset: int,
+        lines: LineIndex | None = None,
+    ) -> None:
+        super().__init__(message, offset, lines)
+        self.position = position
+
+
+class Parser:
+    """
+    Runtime LL(1) parser compiled from a ``Gramma``: symbols are mapped to
+    integer ids (terminals and lexicals first, then ``$``, then non-terminals)
+    and the parsing table is flattened into a single list indexed by
+    ``(non_terminal_id - NonTerminalBase) * TerminalCount + terminal_id``.
+
+    ``instrumentation`` defaults to the one of ``gramma``; when set, ``parse``,
+    ``parse_tokens`` and ``parse_many`` report the ``lexing`` and ``parsing``
+    phases and the ``tokens``, ``table_lookups``, ``reductions`` and
+    ``stack_high_water`` counters. Every non-terminal node is a reduction, but
+    only the ones expanded through the table are lookups: operator nodes of
+    precedence expressions are nested by binding power. The counters are
+    derived from the finished tree, so the parse loop itself is the same with
+    and without instrumentation. ``reparse`` reports its phases plus the
+    relexed ``tokens``, ``table_lookups`` and ``reused_nodes``.
+    """
+
+    def __init__(
+        self, gramma: Gramma, instrumentation: Instrumentation | None = None
+    ) -> None:
+        if gramma.Image is None and not gramma.ParsingTable:
+            gramma.parse_parsing_table()
+
+        self._gramma = gramma
+        self._instrumentation = (
+            gramma.Instrumentation if instrumentation is None else instrumentation
+        )
+
+        terminals = sorted(t for t in gramma.Terminals if t != EPSILON)
+        lexicals = list(gramma.Lexicals)
+        non_terminals: list[str] = []
+        for lhs, _, _ in gramma.Productions:
+            if lhs not in non_terminals:
+                non_terminals.append(lhs)
+
+        self._symbols: list[str] = terminals + lexicals + [END_OF_INPUT] + non_terminals
+        self._symbol_ids: dict[str, int] = {
+            symbol: index for index, symbol in enumerate(self._symbols)
+        }
+        self._end_of_input = self._symbol_ids[END_OF_INPUT]
+        self._terminal_count = self._end_of_input + 1
+        self._start = self._symbol_ids[gramma.StartNonTerminal]
+
+        self._productions: list[tuple[int, ...]] = [
+            tuple(self._symbol_ids[symbol] for symbol in rhs if symbol != EPSILON)
+            for _, rhs, _ in gramma.Productions
+        ]
+
+        # Operators of precedence non-terminals get synthetic productions
+        # (``"op" A`` and ``A "op" A``) after the gramma ones.
+        self._operator_base = len(self._productions)
+        self._prefix_operators: dict[int, dict[int, tuple[int, int]]] = {}
+        self._binary_operators: dict[int, dict[int, tuple[int, bool, int]]] = {}
+        for non_terminal, operators in gramma.Precedence.items():
+            symbol = self._symbol_ids[non_terminal]
+            prefix_operators = self._prefix_operators.setdefault(symbol, {})
+            binary_operators = self._binary_operators.setdefault(symbol, {})
+
+            for operator, associativity, power in operators:
+                operator_id = self._symbol_ids[operator]
+                production = len(self._productions)
+
+                if associativity == "prefix":
+                    prefix_operators[operator_id] = (power, production)
+                    self._productions.append((operator_id, symbol))
+                else:
+                    right = associativity == "right"
+                    binary_operators[operator_id] = (power, right, production)
+                    self._productions.append((symbol, operator_id, symbol))
+
+        self._reversed_productions: list[tuple[int, ...]] = [
+            rhs[::-1] for rhs in self._productions
+        ]
+
+        # The driver pushes references to precedence non-terminals as
+        # ``_EXPRESSION - symbol`` markers, which start a precedence-climbing
+        # loop instead of a plain expansion.
+        self._driven_productions = self._reversed_productions
+        # Operands made of a single token are laid out with their run instead
+        # of being expanded on the stack.
+        self._leaf_productions: set[int] = set()
+        if self._binary_operators:
+            self._leaf_productions = {
+                production
+                for production, rhs in enumerate(self._productions)
+                if len(rhs) == 1 and rhs[0] < self._terminal_count
+            }
+            self._driven_productions = [
+                tuple(self._stack_symbol(symbol) for symbol in rhs)
+                for rhs in self._reversed_productions
+            ]
+
+        self._table: list[int] = [NO_ENTRY] * (
+            len(non_terminals) * self._terminal_count
+        )
+        # An image stores the table flat in this very symbol order.
+        image = gramma.Image
+        table_rows = {} if image is not None else gramma.ParsingTable
+        if image is not None:
+            self._table = image.table()
+        for non_terminal, row in table_rows.items():
+            base = (self._symbol_ids[non_terminal] - self._terminal_count) * (
+                self._terminal_count
+            )
+            for terminal, production in row.items():
+                if production is not None and terminal in self._symbol_ids:
+                    self._table[base + self._symbol_ids[terminal]] = production
+
+        # Panic-mode synchronization: an erroneous non-terminal is abandoned
+        # once the lookahead can follow it (or the input ends).
+        self._sync = bytearray(len(self._table))
+        for non_terminal, follow_set in gramma.FollowSet:
+            if non_terminal not in self._symbol_ids:
+                continue
+
+            base = (self._symbol_ids[non_terminal] - self._terminal_count) * (
+                self._terminal_count
+            )
+            self._sync[base + self._end_of_input] = 1
+            for terminal in follow_set:
+                if terminal in self._symbol_ids:
+                    self._sync[base + self._symbol_ids[terminal]] = 1
+
+        self._lexer = Lexer(
+            {terminal[1:-1]: self._symbol_ids[terminal] for terminal in terminals},
+            {
+                lexical: (
+                    Lexer.lexical_pattern(gramma.Lexicals[lexical]),
+                    self._symbol_ids[lexical],
+                )
+                for lexical in lexicals
+            },
+            self._end_of_input,
+        )
+
+    @property
+    def Gramma(self) -> Gramma:
+        return self._gramma
+
+    @property
+    def Instrumentation(self) -> Instrumentation | None:
+        return self._instrumentation
+
+    @property
+    def Symbols(self) -> list[str]:
+        return self._symbols
+
+    @property
+    def Lexer(self) -> Lexer:
+        return self._lexer
+
+    @property
+    def TerminalCount(self) -> int:
+        return self._terminal_count
+
+    @property
+    def NonTerminalBase(self) -> int:
+        return self._terminal_count
+
+    @property
+    def StartSymbol(self) -> int:
+        return self._start
+
+    @property
+    def EndOfInput(self) -> int:
+        return self._end_of_input
+
+    @property
+    def Table(self) -> list[int]:
+        return self._table
+
+    @property
+    def Productions(self) -> list[tuple[int, ...]]:
+        return self._productions
+
+    @property
+    def Engine(self) -> str:
+        return "ll1"
+
+    @property
+    def HasPrecedence(self) -> bool:
+        return bool(self._binary_operators)
+
+    def _stack_symbol(self, symbol: int) -> int:
+        if symbol in self._binary_operators:
+            return _EXPRESSION - symbol
+
+        return symbol
+
+    def symbol_id(self, symbol: str) -> int:
+        return self._symbol_ids[symbol]
+
+    def is_terminal(self, symbol_id: int) -> bool:
+        return symbol_id < self._terminal_count
+
+    def parse(self, source: str) -> SyntaxTree:
+        instrumentation = self._instrumentation
+        if instrumentation is None:
+            return self.parse_tokens(self._lexer.tokenize(source))
+
+        with instrumentation.phase("lexing"):
+            tokens = self._lexer.tokenize(source)
+        return self.parse_tokens(tokens)
+
+    def parse_many(
+        self, sources: Iterable[str], raise_errors: bool = True
+    ) -> Iterator[SyntaxTree | ValueError]:
+        """
+        Parse many (typically tiny) inputs in a row. The lexer, the parser
+        stacks and the token/node scratch buffers are set up once and reused
+        for every input; each result only pays for its final arrays. With
+        ``raise_errors=False`` an invalid input yields its ``ParseError`` or
+        ``LexError`` instead of stopping the batch. Grammars with precedence
+        declarations, and instrumented parsers, go through ``parse`` one input
+        at a time.
+        """
+        if self._binary_operators or self._instrumentation is not None:
+            yield from self._parse_each(sources, raise_errors)
+            return
+
+        scan_into = self._lexer.scan_into
+        symbols = self._symbols
+        table = self._table
+        reversed_productions = self._reversed_productions
+        terminal_count = self._terminal_count
+        start_symbol = self._start
+        end_of_input = self._end_of_input
+
+        token_kinds: list[int] = []
+        token_starts: list[int] = []
+        token_ends: list[int] = []
+        kinds: list[int] = []
+        productions: list[int] = []
+        starts: list[int] = []
+        ends: list[int] = []
+        first_children: list[int] = []
+        next_siblings: list[int] = []
+        parents: list[int] = []
+        last_children: list[int] = []
+        symbol_stack: list[int] = []
+        node_stack: list[int] = []
+        buffers = [
+            token_kinds,
+            token_starts,
+            token_ends,
+            kinds,
+            productions,
+            starts,
+            ends,
+            first_children,
+            next_siblings,
+            parents,
+            last_children,
+            symbol_stack,
+            node_stack,
+        ]
+
+        append_kind = kinds.append
+        append_production = productions.append
+        append_start = starts.append
+        append_end = ends.append
+        append_first_child = first_children.append
+        append_next_sibling = next_siblings.append
+        append_parent = parents.append
+        append_last_child = last_children.append
+        push_symbol = symbol_stack.append
+        push_symbols = symbol_stack.extend
+        pop_symbol = symbol_stack.pop
+        push_node = node_stack.append
+        push_nodes = node_stack.extend
+        pop_node = node_stack.pop
+
+        for source in sources:
+            for buffer in buffers:
+                buffer.clear()
+
+            try:
+                scan_into(source, token_kinds, token_starts, token_ends)
+                token_kinds.append(end_of_input)
+                token_starts.append(len(source))
+                token_ends.append(len(source))
+
+                symbol_stack.append(start_symbol)
+                node_stack.append(NO_NODE)
+                position = 0
+                lookahead = token_kinds[0]
+
+                while symbol_stack:
+                    symbol = pop_symbol()
+                    parent = pop_node()
+
+                    if symbol == _CLOSE:
+                        ends[parent] = position
+                        continue
+
+                    if symbol < terminal_count:
+                        if symbol != lookahead:
+                            raise self.syntax_error(
+                                lookahead,
+                                position,
+                                token_starts[position],
+                                [symbol],
+                                LineIndex(source),
+                            )
+                        production = NO_PRODUCTION
+                    else:
+                        production = table[
+                            (symbol - terminal_count) * terminal_count + lookahead
+                        ]
+                        if production == NO_ENTRY:
+                            raise self.syntax_error(
+                                lookahead,
+                                position,
+                                token_starts[position],
+                                self.expected_terminals(symbol),
+                                LineIndex(source),
+                            )
+
+                    index = len(kinds)
+                    append_kind(symbol)
+                    append_production(production)
+                    append_start(position)
+                    append_first_child(NO_NODE)
+                    append_next_sibling(NO_NODE)
+                    append_parent(parent)
+                    append_last_child(NO_NODE)
+
+                    if parent != NO_NODE:
+                        last_child = last_children[parent]
+                        if last_child == NO_NODE:
+                            first_children[parent] = index
+                        else:
+                            next_siblings[last_child] = index
+                        last_children[parent] = index
+
+                    if production == NO_PRODUCTION:
+                        position += 1
+                        append_end(position)
+                        lookahead = token_kinds[position]
+                    else:
+                        append_end(position)
+                        rhs = reversed_productions[production]
+                        push_symbol(_CLOSE)
+                        push_node(index)
+                        push_symbols(rhs)
+                        push_nodes([index] * len(rhs))
+
+                if lookahead != end_of_input:
+                    raise self.syntax_error(
+                        lookahead,
+                        position,
+                        token_starts[position],
+                        [end_of_input],
+                        LineIndex(source),
+                    )
+            except ValueError as error:
+                if raise_errors:
+                    raise
+                yield error
+                continue
+
+            yield SyntaxTree(
+                symbols,
+                Tokens(
+                    source,
+                    array("i", token_kinds),
+                    array("q", token_starts),
+                    array("q", token_ends),
+                ),
+                array("i", kinds),
+                array("i", productions),
+                array("i", starts),
+                array("i", ends),
+                array("i", first_children),
+                array("i", next_siblings),
+                array("i", parents),
+            )
+
+    def parse_tokens(self, tokens: Tokens) -> SyntaxTree:
+        builder = TreeBuilder(self._symbols, tokens)
+        instrumentation = self._instrumentation
+        start = self._stack_symbol(self._start)
+        if instrumentation is None:
+            return self._drive(tokens, builder, [start], [NO_NODE], 0, None)
+
+        with instrumentation.phase("parsing"):
+            tree = self._drive(tokens, builder, [start], [NO_NODE], 0, None)
+        self._count_parse(tree)
+        return tree
+
+    def _count_parse(self, tree: SyntaxTree) -> None:
+        """
+        Replay the stack sizes of the parse from the tree: a non-terminal
+        popped at stack size ``size`` leaves ``size + len(rhs)`` entries (its
+        close marker plus its right side), and its ``i``-th child is popped at
+        ``size + len(rhs) - i``.
+        """
+        productions = tree.Productions
+        first_children = tree.FirstChildren
+        next_siblings = tree.NextSiblings
+
+        operator_base = self._operator_base
+        sizes = [1] * len(tree)
+        reductions = 0
+        lookups = 0
+        high_water = 1
+
+        for index in range(len(tree)):
+            production = productions[index]
+            if production == NO_PRODUCTION:
+                continue
+
+            reductions += 1
+            if production < operator_base:
+                lookups += 1
+            size = sizes[index] + len(self._productions[production])
+            if size > high_water:
+                high_water = size
+
+            child = first_children[index]
+            while child != NO_NODE:
+                sizes[child] = size
+                size -= 1
+                child = next_siblings[child]
+
+        instrumentation = self._instrumentation
+        assert instrumentation is not None
+        instrumentation.count("tokens", len(tree.Tokens) - 1)
+        instrumentation.count("table_lookups", lookups)
+        instrumentation.count("reductions", reductions)
+        instrumentation.maximum("stack_high_water", high_water)
+
+    def reparse(self, tree: SyntaxTree, start: int, end: int, text: str) -> SyntaxTree:
+        """
+        Incrementally parse the source of ``tree`` with ``[start, end)``
+        replaced by ``text``. Only the damaged tokens are relexed; the parse
+        resumes from the last tree node before the damage and subtrees after it
+        are copied from ``tree`` whenever the same non-terminal is expanded at
+        the matching token.
+
+        The tokens and nodes after the edit are copied in blocks as they are:
+        the token offsets, spans and node links they now owe are kept as a few
+        lazily applied shifts (see ``Shifts``) and only settled when a whole
+        column is read. What remains is the relexed region, the reparsed nodes
+        and a walk up the ancestors of the edit, which is as deep as the
+        right-recursive lists around it, plus the block copies themselves.
+        """
+        assert tree.Symbols == self._symbols, "Tree was built by another parser"
+
+        instrumentation = self._instrumentation
+        if instrumentation is None:
+            relexed = self._relex(tree.Tokens, start, end, text)
+        else:
+            with instrumentation.phase("lexing"):
+                relexed = self._relex(tree.Tokens, start, end, text)
+        tokens, first, resync, token_shift = relexed
+
+        count = tree.bisect_start(first)
+        if count == 0 or count == len(tree) or self._binary_operators:
+            return self.parse_tokens(tokens)
+
+        reuse = _SubtreeReuse(tree, count, resync, token_shift)
+        if instrumentation is None:
+            return self._resume(tree, tokens, count, first, reuse)
+
+        with instrumentation.phase("parsing"):
+            reparsed = self._resume(tree, tokens, count, first, reuse)
+        self._count_reparse(reparsed, count, reuse, resync - first)
+        return reparsed
+
+    def _resume(
+        self,
+        tree: SyntaxTree,
+        tokens: Tokens,
+        count: int,
+        first: int,
+        reuse: "_SubtreeReuse",
+    ) -> SyntaxTree:
+        """
+        Rebuild the parse stack of ``tree`` as it was right before node
+        ``count``, i.e. token ``first``, and drive the parse on from there.
+        """
+        token_shift = reuse.TokenShift
+        next_sibling = tree.next_sibling
+        path = tree.ancestors(count)
+
+        # The outermost ancestors whose path child is already their last child
+        # only close, at the end of the input.
+        reopened = len(path)
+        while reopened > 1 and next_sibling(path[reopened - 2]) == NO_NODE:
+            reopened -= 1
+
+        builder = TreeBuilder.resume(tree, tokens, count, reopened)
+        if token_shift != 0:
+            end_of_input = len(tokens) - 1
+            for ancestor in path[reopened:]:
+                builder.close(ancestor, end_of_input)
+
+        symbol_stack: list[int] = []
+        node_stack: list[int] = []
+        child = count
+        for ancestor in path[:reopened]:
+            position = 0
+            sibling = tree.first_child(ancestor)
+            while sibling != child:
+                position += 1
+                sibling = next_sibling(sibling)
+
+            rhs = self._productions[tree.Productions[ancestor]]
+            remaining = rhs[position:] if child == count else rhs[position + 1 :]
+
+            symbol_stack.extend(remaining)
+            symbol_stack.append(_CLOSE)
+            node_stack.extend([ancestor] * (len(remaining) + 1))
+            child = ancestor
+
+        symbol_stack.reverse()
+        node_stack.reverse()
+
+        return self._drive(tokens, builder, symbol_stack, node_stack, first, reuse)
+
+    def _count_reparse(
+        self, tree: SyntaxTree, count: int, reuse: "_SubtreeReuse", relexed: int
+    ) -> None:
+        """
+        Count the work of an incremental parse: the nodes before ``count`` and
+        the copied subtrees are reused, every other non-terminal node took a
+        table lookup.
+        """
+        productions = tree.Productions
+        reused = count
+        lookups = len(tree) - count - productions[count:].count(NO_PRODUCTION)
+
+        for start, end in reuse.Copied:
+            reused += end - start
+            lookups -= end - start - productions[start:end].count(NO_PRODUCTION)
+
+        instrumentation = self._instrumentation
+        assert instrumentation is not None
+        instrumentation.count("tokens", relexed)
+        instrumentation.count("table_lookups", lookups)
+        instrumentation.count("reused_nodes", reused)
+
+    def _parse_each(
+        self, sources: Iterable[str], raise_errors: bool
+    ) -> Iterator[SyntaxTree | ValueError]:
+        for source in sources:
+            try:
+                yield self.parse(source)
+            except ValueError as error:
+                if raise_errors:
+                    raise
+                yield error
+
+    def _relex(
+        self, old_tokens: Tokens, start: int, end: int, text: str
+    ) -> tuple[Tokens, int, int, int]:
+        """
+        Relex the damaged region of ``old_tokens`` and splice the result in.
+        Returns the new tokens, the first relexed token, the first new token
+        that is reused from the old stream and the token index shift of the
+        reused tail.
+        """
+        old_source = old_tokens.Source
+        source = old_source[:start] + text + old_source[end:]
+        delta = len(text) - (end - start)
+        edit_end = start + len(text)
+
+        end_of_input = len(old_tokens) - 1
+        first = max(0, old_tokens.bisect_end(start) - 1)
+        kinds = array("i")
+        starts = array("q")
+        ends = array("q")
+
+        # From the start of the source when the edit may lie in the leading
+        # whitespace, which no token covers.
+        tail = end_of_input
+        for kind, token_start, token_end in self._lexer.scan(
+            source, old_tokens.start(first) if 0 < first < end_of_input else 0
+        ):
+            if token_start >= edit_end:
+                old_start = token_start - delta
+                index = old_tokens.bisect_start(old_start, first, end_of_input)
+                if index < end_of_input and old_tokens.start(index) == old_start:
+                    tail = index
+                    break
+
+            kinds.append(kind)
+            starts.append(token_start)
+            ends.append(token_end)
+
+        resync = first + len(kinds)
+        tokens = old_tokens.splice(source, first, tail, (kinds, starts, ends), delta)
+        return tokens, first, resync, resync - tail
+
+    def _drive(
+        self,
+        tokens: Tokens,
+        builder: TreeBuilder,
+        symbol_stack: list[int],
+        node_stack: list[int],
+        position: int,
+        reuse: "_SubtreeReuse | None",
+    ) -> SyntaxTree:
+        add = builder.add
+        close = builder.close
+
+        kinds = tokens.Kinds
+        table = self._table
+        reversed_productions = self._driven_productions
+        leaf_productions = self._leaf_productions
+        terminal_count = self._terminal_count
+        reuse_from = len(kinds) if reuse is None else reuse.From
+        expressions: list[_Expression] = []
+
+        lookahead = kinds[position]
+
+        while symbol_stack:
+            symbol = symbol_stack.pop()
+            node = node_stack.pop()
+
+            if symbol < 0:
+                if symbol == _CLOSE:
+                    close(node, position)
+                    continue
+
+                # Precedence climbing: an expression is read as a flat run of
+                # operands (expanded with the ordinary table) separated by
+                # binary operators, then nested by binding power. Operator
+                # and single-token operand nodes are only added at the end of
+                # the run, once their nesting is known.
+                if symbol == _OPERATOR:
+                    expression = expressions[node]
+                    operator = expression.Binary.get(lookahead)
+                    if operator is None:
+                        expressions.pop()
+                        self._regroup(tokens, builder, expression)
+                        continue
+
+                    expression.Items.append(
+                        (_BINARY, NO_PRODUCTION, operator, position, position + 1)
+                    )
+                    position += 1
+                    lookahead = kinds[position]
+                else:
+                    expression = _Expression(
+                        self, _EXPRESSION - symbol, node, len(builder)
+                    )
+                    expressions.append(expression)
+                    node = len(expressions) - 1
+
+                symbol_stack.append(_OPERATOR)
+                node_stack.append(node)
+
+                prefix_operators = expression.Prefix
+                while lookahead in prefix_operators:
+                    expression.Items.append(
+                        (
+                            _PREFIX,
+                            NO_PRODUCTION,
+                            prefix_operators[lookahead],
+                            position,
+                            position + 1,
+                        )
+                    )
+                    position += 1
+                    lookahead = kinds[position]
+
+                symbol = expression.Symbol
+                production = table[expression.Row + lookahead]
+                if production == NO_ENTRY:
+                    self._raise_unexpected(
+                        tokens, position, self.expected_terminals(symbol)
+                    )
+
+                if production in leaf_productions:
+                    expression.Items.append(
+                        (_LEAF, production, None, position, position + 1)
+                    )
+                    position += 1
+                    lookahead = kinds[position]
+                    continue
+
+                child = add(symbol, production, position, NO_NODE)
+                expression.Items.append((_OPERAND, child, None, position, position))
+                symbol_stack.append(_CLOSE)
+                node_stack.append(child)
+
+                rhs = reversed_productions[production]
+                symbol_stack.extend(rhs)
+                node_stack.extend([child] * len(rhs))
+            elif symbol < terminal_count:
+                if symbol != lookahead:
+                    self._raise_unexpected(tokens, position, [symbol])
+
+                close(add(symbol, NO_PRODUCTION, position, node), position + 1)
+                position += 1
+                lookahead = kinds[position]
+            else:
+                if position >= reuse_from:
+                    assert reuse is not None
+                    old_node = reuse.find(symbol, position)
+                    if old_node != NO_NODE:
+                        position = reuse.copy(builder, old_node, node)
+                        lookahead = kinds[position]
+                        continue
+
+                production = table[
+                    (symbol - terminal_count) * terminal_count + lookahead
+                ]
+                if production == NO_ENTRY:
+                    self._raise_unexpected(
+                        tokens, position, self.expected_terminals(symbol)
+                    )
+
+                child = add(symbol, production, position, node)
+                symbol_stack.append(_CLOSE)
+                node_stack.append(child)
+
+                rhs = reversed_productions[production]
+                symbol_stack.extend(rhs)
+                node_stack.extend([child] * len(rhs))
+
+        if lookahead != self._end_of_input:
+            self._raise_unexpected(tokens, position, [self._end_of_input])
+
+        return builder.build()
+
+    def parse_with_recovery(
+        self, source: str, max_errors: int = 100
+    ) -> tuple[SyntaxTree, list[ParseError]]:
+        """
+        Parse ``source`` in one pass, recovering from syntax errors in panic
+        mode instead of stopping at the first one:
+
+        - a missing terminal is reported and treated as inserted;
+        - a non-terminal without a table entry is reported, then tokens are
+          skipped until one can start it (FIRST) or follow it (FOLLOW); in the
+          latter case the non-terminal is abandoned and kept in the tree as a
+          childless ``ERROR_PRODUCTION`` node spanning the skipped tokens;
+        - input left over once the start symbol is complete is reported, the
+          offending token skipped and another start symbol parsed from the
+          next token that can start one, as a further child of the root.
+
+        At most one error is reported per token. Once ``max_errors`` errors are
+        reported the rest of the input is ignored and the tree is closed where
+        it stands.
+        """
+        assert max_errors > 0, "Error budget must be positive"
+        assert not self._binary_operators, "Recovery does not support precedence"
+        assert self.Engine == "ll1", "Recovery needs the LL(1) engine"
+
+        instrumentation = self._instrumentation
+        if instrumentation is None:
+            tokens = self._lexer.tokenize(source)
+            return self._drive_with_recovery(tokens, max_errors)
+
+        with instrumentation.phase("lexing"):
+            tokens = self._lexer.tokenize(source)
+        with instrumentation.phase("parsing"):
+            tree, errors = self._drive_with_recovery(tokens, max_errors)
+        instrumentation.count("syntax_errors", len(errors))
+        return tree, errors
+
+    def _drive_with_recovery(
+        self, tokens: Tokens, max_errors: int
+    ) -> tuple[SyntaxTree, list[ParseError]]:
+        builder = TreeBuilder(self._symbols, tokens)
+        add = builder.add
+        close = builder.close
+
+        kinds = tokens.Kinds
+        table = self._table
+        sync = self._sync
+        reversed_productions = self._reversed_productions
+        terminal_count = self._terminal_count
+        end_of_input = self._end_of_input
+        start = self._start
+        start_base = (start - terminal_count) * terminal_count
+
+        errors: list[ParseError] = []
+        symbol_stack = [start]
+        node_stack = [NO_NODE]
+        position = 0
+        lookahead = kinds[position]
+
+        while len(errors) < max_errors:
+            if not symbol_stack:
+                if lookahead == end_of_input:
+                    break
+
+                # Input left over after a complete parse: skip to a token that
+                # can start the gramma again and parse another start symbol
+                # under the root.
+                self._report(errors, tokens, position, [end_of_input])
+                position += 1
+                lookahead = kinds[position]
+                while (
+                    lookahead != end_of_input
+                    and table[start_base + lookahead] == NO_ENTRY
+                ):
+                    position += 1
+                    lookahead = kinds[position]
+
+                symbol_stack.append(_CLOSE)
+                node_stack.append(0)
+                if lookahead != end_of_input:
+                    symbol_stack.append(start)
+                    node_stack.append(0)
+                continue
+
+            symbol = symbol_stack.pop()
+            node = node_stack.pop()
+
+            if symbol == _CLOSE:
+                close(node, position)
+            elif symbol < terminal_count:
+                if symbol != lookahead:
+                    self._report(errors, tokens, position, [symbol])
+                    continue
+
+                close(add(symbol, NO_PRODUCTION, position, node), position + 1)
+                position += 1
+                lookahead = kinds[position]
+            else:
+                base = (symbol - terminal_count) * terminal_count
+                production = table[base + lookahead]
+
+                if production == NO_ENTRY:
+                    self._report(
+                        errors, tokens, position, self.expected_terminals(symbol)
+                    )
+
+                    # The root can only be followed by the end of the input.
+                    error_start = position
+                    while table[base + lookahead] == NO_ENTRY:
+                        if sync[base + lookahead] and (
+                            node != NO_NODE or lookahead == end_of_input
+                        ):
+                            break
+
+                        position += 1
+                        lookahead = kinds[position]
+
+                    production = table[base + lookahead]
+                    if production == NO_ENTRY:
+                        error = add(symbol, ERROR_PRODUCTION, error_start, node)
+                        close(error, position)
+                        continue
+
+                child = add(symbol, production, position, node)
+                symbol_stack.append(_CLOSE)
+                node_stack.append(child)
+
+                rhs = reversed_productions[production]
+                symbol_stack.extend(rhs)
+                node_stack.extend([child] * len(rhs))
+
+        while symbol_stack:
+            if symbol_stack.pop() == _CLOSE:
+                close(node_stack.pop(), position)
+            else:
+                node_stack.pop()
+
+        return builder.build(), errors
+
+    def _report(
+        self,
+        errors: list[ParseError],
+        tokens: Tokens,
+        position: int,
+        expected: list[int],
+    ) -> None:
+        """
+        Record a syntax error at token ``position``, unless one was already
+        reported there.
+        """
+        if errors and errors[-1].position == position:
+            return
+
+        errors.append(
+            self.syntax_error(
+                tokens.Kinds[position],
+                position,
+                tokens.start(position),
+                expected,
+                tokens.Lines,
+            )
+        )
+
+    def _regroup(
+        self, tokens: Tokens, builder: TreeBuilder, expression: "_Expression"
+    ) -> None:
+        """
+        Nest the flat run of an expression by binding power (shunting-yard):
+        an operator is reduced before a following binary operator when its
+        power is higher, or equal and the following operator is
+        left-associative. The nested nodes are then added in pre-order as a
+        child of the expression's parent; the already built compound operands
+        are moved behind their new ancestors.
+        """
+        items = expression.Items
+        if len(items) == 1 and items[0][0] == _OPERAND:
+            builder.adopt(items[0][1], expression.Parent)
+            return
+
+        span = builder.span
+        compound: list[int] = []
+        operands: list[tuple[int, int, tuple | None, int, int]] = []
+        operators: list[tuple[int, int, tuple, int, int]] = []
+        # A sentinel run end reduces everything that is left.
+        items.append((_BINARY, NO_PRODUCTION, (-1, False, NO_PRODUCTION), 0, 0))
+
+        for item in items:
+            role = item[0]
+            if role == _LEAF:
+                operands.append(item)
+                continue
+
+            if role == _OPERAND:
+                index = item[1]
+                compound.append(index)
+                operands.append((_OPERAND, index, None, *span(index)))
+                continue
+
+            if role == _PREFIX:
+                operators.append(item)
+                continue
+
+            power, right, _ = item[2]
+            reduced = power + 1 if right else power
+            while operators and operators[-1][2][0] >= reduced:
+                operator = operators.pop()
+                operand = operands.pop()
+                if operator[0] == _PREFIX:
+                    children = (operand, operator)
+                    start = operator[3]
+                else:
+                    left = operands.pop()
+                    children = (operand, operator, left)
+                    start = left[3]
+                operands.append((_NESTED, operator[2][-1], children, start, operand[4]))
+            operators.append(item)
+
+        bounds = dict(zip(compound, compound[1:] + [len(builder)]))
+        detached = builder.detach(expression.Start) if compound else None
+        token_kinds = tokens.Kinds
+        symbol = expression.Symbol
+        # The nodes are collected in pre-order and appended in bulk, up to
+        # each compound operand that is moved in between.
+        columns: tuple[list[int], ...] = ([], [], [], [], [])
+        kinds, productions, starts, ends, node_parents = columns
+        add_kind = kinds.append
+        add_production = productions.append
+        add_start = starts.append
+        add_end = ends.append
+        add_parent = node_parents.append
+        base = len(builder)
+        # Children are pushed last to first, so nodes come out in pre-order.
+        pending = [operands[0]]
+        parents = [expression.Parent]
+
+        while pending:
+            role, value, children, start, end = pending.pop()
+            parent = parents.pop()
+
+            if role == _OPERAND:
+                builder.extend(*columns)
+                builder.append_detached(detached, value, bounds[value], parent)
+                for column in columns:
+                    column.clear()
+                base = len(builder)
+                continue
+
+            if role != _BINARY and role != _PREFIX:
+                node = base + len(kinds)
+                add_kind(symbol)
+                add_production(value)
+                add_start(start)
+                add_end(end)
+                add_parent(parent)
+                parent = node
+
+            if role == _NESTED:
+                pending.extend(children)
+                parents.extend([parent] * len(children))
+            else:
+                add_kind(token_kinds[start])
+                add_production(NO_PRODUCTION)
+                add_start(start)
+                add_end(end)
+                add_parent(parent)
+
+        builder.extend(*columns)
+
+    def expected_terminals(self, symbol: int) -> list[int]:
+        if symbol < self._terminal_count:
+            return [symbol]
+
+        base = (symbol - self._terminal_count) * self._terminal_count
+        return sorted(
+            set(self._prefix_operators.get(symbol, ()))
+            | {
+                terminal
+                for terminal in range(self._terminal_count)
+                if self._table[base + terminal] != NO_ENTRY
+            }
+        )
+
+    def syntax_error(
+        self,
+        found: int,
+        position: int,
+        offset: int,
+        expected: list[int],
+        lines: LineIndex | None = None,
+    ) -> ParseError:
+        expected_symbols = ", ".join(self._symbols[symbol] for symbol in expected)
+        return ParseError(
+            f"Unexpected {self._symbols[found]} at token {position}, expected one of: {expected_symbols}",
+            position,
+            offset,
+            lines,
+        )
+
+    def _raise_unexpected(
+        self, tokens: Tokens, position: int, expected: list[int]
+    ) -> None:
+        raise self.syntax_error(
+            tokens.Kinds[position],
+            position,
+            tokens.start(position),
+            expected,
+            tokens.Lines,
+        )
+
+
+class _Expression:
+    """
+    Open precedence expression of ``_drive``: the flat run of items (role,
+    production or node index, operator info, token span), the parent of its
+    root and the first node built for the run (``Start``).
+    """
+
+    __slots__ = ("Symbol", "Row", "Prefix", "Binary", "Parent", "Start", "Items")
+
+    def __init__(self, parser: Parser, symbol: int, parent: int, start: int) -> None:
+        self.Symbol = symbol
+        self.Row = (symbol - parser.TerminalCount) * parser.TerminalCount
+        self.Prefix = parser._prefix_operators[symbol]
+        self.Binary = parser._binary_operators[symbol]
+        self.Parent = parent
+        self.Start = start
+        self.Items: list[tuple[int, int, tuple | None, int, int]] = []
+
+
+class _SubtreeReuse:
+    """
+    Finds subtrees of the previous tree that can be copied as-is: a node is
+    reusable when it expands the same non-terminal at the same (shifted) token
+    and all of its tokens, including the lookahead right after it, come from
+    the undamaged tail.
+    """
+
+    def __init__(
+        self, tree: SyntaxTree, cursor: int, resync: int, token_shift: int
+    ) -> None:
+        self._tree = tree
+        self._cursor = cursor
+        self.From = resync
+        self.TokenShift = token_shift
+        self.Copied: list[tuple[int, int]] = []
+
+    def find(self, symbol: int, position: int) -> int:
+        tree = self._tree
+        kinds = tree.Kinds
+        old_position = position - self.TokenShift
+
+        index = tree.bisect_start(old_position, self._cursor)
+        self._cursor = index
+
+        while index < len(kinds) and tree.start(index) == old_position:
+            if kinds[index] == symbol:
+                return index
+            index += 1
+
+        return NO_NODE
+
+    def copy(self, builder: TreeBuilder, index: int, parent: int) -> int:
+        new_index = builder.copy_subtree(self._tree, index, parent, self.TokenShift)
+        self.Copied.append((new_index, len(builder)))
+        self._cursor = index + len(builder) - new_index
+        return self._tree.end(index) + self.TokenShift
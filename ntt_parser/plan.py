@@ -0,0 +1,410 @@
+import ast
+import math
+import operator
+import re
+from typing import Any, Callable, Mapping
+
+from .parser import Parser
+from .tree import ERROR_PRODUCTION, NO_NODE, NO_PRODUCTION, SyntaxTree
+
+# Scalar reference implementation of every plan operation, keyed by the name
+# of the matching NumPy ufunc.
+PLAN_OPERATIONS: dict[str, Callable[..., float]] = {
+    "add": operator.add,
+    "subtract": operator.sub,
+    "multiply": operator.mul,
+    "true_divide": operator.truediv,
+    "remainder": operator.mod,
+    "power": operator.pow,
+    "negative": operator.neg,
+    "positive": operator.pos,
+    "absolute": abs,
+    "minimum": min,
+    "maximum": max,
+    "sqrt": math.sqrt,
+    "exp": math.exp,
+    "log": math.log,
+    "sin": math.sin,
+    "cos": math.cos,
+    "tan": math.tan,
+}
+
+PLAN_BINARY_OPERATORS = {
+    "+": "add",
+    "-": "subtract",
+    "*": "multiply",
+    "/": "true_divide",
+    "%": "remainder",
+    "^": "power",
+    "**": "power",
+}
+
+PLAN_PREFIX_OPERATORS = {"-": "negative", "+": "positive"}
+
+_UNARY_OPERATIONS = {
+    "negative",
+    "positive",
+    "absolute",
+    "sqrt",
+    "exp",
+    "log",
+    "sin",
+    "cos",
+    "tan",
+}
+
+PLAN_FUNCTIONS = {
+    "abs": "absolute",
+    "min": "minimum",
+    "max": "maximum",
+    "sqrt": "sqrt",
+    "exp": "exp",
+    "log": "log",
+    "sin": "sin",
+    "cos": "cos",
+    "tan": "tan",
+}
+
+_ACTION_OPERATORS: dict[type, str] = {
+    ast.Add: "add",
+    ast.Sub: "subtract",
+    ast.Mult: "multiply",
+    ast.Div: "true_divide",
+    ast.Mod: "remainder",
+    ast.Pow: "power",
+    ast.USub: "negative",
+    ast.UAdd: "positive",
+}
+
+_ACTION = re.compile(r"^\s*\$\$\s*=(.*?);?\s*$", re.DOTALL)
+_REFERENCE = re.compile(r"\$(\d+)")
+# Only decimal literals are constants: ``float`` alone would also turn
+# identifiers such as ``nan`` or ``inf`` into numbers.
+_NUMBER = re.compile(r"(\d+\.?\d*|\.\d+)([eE][+-]?\d+)?")
+
+PlanInstruction = tuple[Any, ...]
+
+
+class ExpressionPlan:
+    """
+    Straight-line program computing the RETURN actions of a parsed expression
+    over whole columns at once. Each instruction is ``("column", name)``,
+    ``("constant", value)`` or ``(ufunc_name, *operand_indices)``; equal
+    instructions are emitted once, so common subexpressions are shared, and
+    operations on constants only are folded at compile time.
+
+    Node values follow the yacc conventions of the gramma:
+
+    - a production with a ``{ $$ = ...; }`` action evaluates it, where ``$n``
+      is the value of the n-th symbol of the production and the expression
+      may use ``+ - * / % **``, numbers and ``abs``, ``min``, ``max``,
+      ``sqrt``, ``exp``, ``log``, ``sin``, ``cos``, ``tan``;
+    - a production without action is ``$$ = $1``;
+    - a lexical token is a constant when its text is a number and a column
+      reference otherwise; quoted terminals have no value;
+    - the operator productions of a precedence section apply their operator.
+    """
+
+    def __init__(self, instructions: list[PlanInstruction], result: int) -> None:
+        self._instructions = instructions
+        self._result = result
+
+        # Index of the last instruction reading each value, so evaluation can
+        # drop intermediate columns as soon as they are consumed.
+        self._last_uses: list[list[int]] = [[] for _ in instructions]
+        last_use: dict[int, int] = {}
+        for index, instruction in enumerate(instructions):
+            if instruction[0] not in ("column", "constant"):
+                for operand in instruction[1:]:
+                    last_use[operand] = index
+        for operand, index in last_use.items():
+            if operand != result:
+                self._last_uses[index].append(operand)
+
+    @property
+    def Instructions(self) -> list[PlanInstruction]:
+        return self._instructions
+
+    @property
+    def Result(self) -> int:
+        return self._result
+
+    @property
+    def Columns(self) -> list[str]:
+        return [
+            instruction[1]
+            for instruction in self._instructions
+            if instruction[0] == "column"
+        ]
+
+    @staticmethod
+    def compile(parser: Parser, source: str) -> "ExpressionPlan":
+        return ExpressionPlan.from_tree(parser, parser.parse(source))
+
+    @staticmethod
+    def from_tree(parser: Parser, tree: SyntaxTree) -> "ExpressionPlan":
+        return _PlanCompiler(parser).compile(tree)
+
+    def evaluate(self, columns: Mapping[str, Any]) -> Any:
+        """
+        Evaluate the plan with one NumPy call per instruction; ``columns``
+        maps every name of ``Columns`` to an array (or anything
+        ``numpy.asarray`` accepts). Constant plans return a scalar.
+        """
+        try:
+            import numpy
+        except ImportError as error:
+            raise ImportError("ExpressionPlan.evaluate requires numpy") from error
+
+        values: list[Any] = [None] * len(self._instructions)
+
+        for index, instruction in enumerate(self._instructions):
+            kind = instruction[0]
+            if kind == "column":
+                values[index] = numpy.asarray(columns[instruction[1]])
+            elif kind == "constant":
+                values[index] = instruction[1]
+            else:
+                values[index] = getattr(numpy, kind)(
+                    *[values[operand] for operand in instruction[1:]]
+                )
+
+            for operand in self._last_uses[index]:
+                values[operand] = None
+
+        return values[self._result]
+
+    def evaluate_row(self, row: Mapping[str, float]) -> float:
+        """
+        Scalar evaluation of the plan for a single row, without NumPy.
+        """
+        values: list[Any] = []
+
+        for instruction in self._instructions:
+            kind = instruction[0]
+            if kind == "column":
+                values.append(row[instruction[1]])
+            elif kind == "constant":
+                values.append(instruction[1])
+            else:
+                values.append(
+                    PLAN_OPERATIONS[kind](
+                        *[values[operand] for operand in instruction[1:]]
+                    )
+                )
+
+        return values[self._result]
+
+
+class _PlanCompiler:
+    def __init__(self, parser: Parser) -> None:
+        self._parser = parser
+        self._gramma_production_count = len(parser.Gramma.Productions)
+        self._actions: dict[int, Callable[[list[int | None]], int] | None] = {}
+        self._instructions: list[PlanInstruction] = []
+        self._emitted: dict[PlanInstruction, int] = {}
+
+    def compile(self, tree: SyntaxTree) -> ExpressionPlan:
+        assert tree.Symbols == self._parser.Symbols, "Tree was built by another parser"
+        assert len(tree) > 0, "Cannot compile an empty tree"
+
+        productions = tree.Productions
+        first_children = tree.FirstChildren
+        next_siblings = tree.NextSiblings
+        values: list[int | None] = [None] * len(tree)
+
+        # Children always come after their parent in pre-order, so a reverse
+        # sweep sees every child value before the node needs it.
+        for index in range(len(tree) - 1, -1, -1):
+            production = productions[index]
+            if production == NO_PRODUCTION:
+                values[index] = self._token_value(tree, index)
+                continue
+
+            if production == ERROR_PRODUCTION:
+                raise ValueError("Cannot compile a tree with syntax errors")
+
+            children: list[int | None] = []
+            child = first_children[index]
+            while child != NO_NODE:
+                children.append(values[child])
+                child = next_siblings[child]
+
+            if production >= self._gramma_production_count:
+                values[index] = self._operator_value(tree, index, children)
+                continue
+
+            action = self._action(production)
+            if action is None:
+                if not children or children[0] is None:
+                    raise ValueError(
+                        f"No value for {tree.node(index).Symbol} at {tree.node(index).Text!r}"
+                    )
+                values[index] = children[0]
+            else:
+                values[index] = action(children)
+
+        result = values[0]
+        if result is None:
+            raise ValueError("Expression has no value")
+
+        return self._pruned(result)
+
+    def _pruned(self, result: int) -> ExpressionPlan:
+        """
+        Drop the instructions the result does not depend on (constants whose
+        uses were folded away).
+        """
+        instructions = self._instructions
+        used = bytearray(len(instructions))
+        used[result] = 1
+        for index in range(result, -1, -1):
+            instruction = instructions[index]
+            if used[index] and instruction[0] not in ("column", "constant"):
+                for operand in instruction[1:]:
+                    used[operand] = 1
+
+        renumber: list[int] = [NO_NODE] * len(instructions)
+        kept: list[PlanInstruction] = []
+        for index, instruction in enumerate(instructions):
+            if not used[index]:
+                continue
+
+            renumber[index] = len(kept)
+            if instruction[0] in ("column", "constant"):
+                kept.append(instruction)
+            else:
+                kept.append(
+                    (
+                        instruction[0],
+                        *[renumber[operand] for operand in instruction[1:]],
+                    )
+                )
+
+        return ExpressionPlan(kept, renumber[result])
+
+    def _token_value(self, tree: SyntaxTree, index: int) -> int | None:
+        if tree.Symbols[tree.Kinds[index]].startswith('"'):
+            return None
+
+        text = tree.node(index).Text
+        if _NUMBER.fullmatch(text):
+            return self._emit(("constant", float(text)))
+
+        return self._emit(("column", text))
+
+    def _operator_value(
+        self, tree: SyntaxTree, index: int, children: list[int | None]
+    ) -> int:
+        if len(children) == 2:
+            operator_text = tree.node(tree.FirstChildren[index]).Text
+            operations = PLAN_PREFIX_OPERATORS
+            operands = [children[1]]
+        else:
+            operator_index = tree.NextSiblings[tree.FirstChildren[index]]
+            operator_text = tree.node(operator_index).Text
+            operations = PLAN_BINARY_OPERATORS
+            operands = [children[0], children[2]]
+
+        if operator_text not in operations:
+            raise ValueError(
+                f"Unsupported operator for {tree.node(index).Symbol}: {operator_text}"
+            )
+
+        return self._emit((operations[operator_text], *operands))
+
+    def _emit(self, instruction: PlanInstruction) -> int:
+        if instruction[0] not in ("column", "constant"):
+            instruction = self._folded(instruction)
+
+        index = self._emitted.get(instruction)
+        if index is None:
+            index = len(self._instructions)
+            self._instructions.append(instruction)
+            self._emitted[instruction] = index
+
+        return index
+
+    def _folded(self, instruction: PlanInstruction) -> PlanInstruction:
+        operands = [self._instructions[operand] for operand in instruction[1:]]
+        if any(operand[0] != "constant" for operand in operands):
+            return instruction
+
+        try:
+            value = PLAN_OPERATIONS[instruction[0]](
+                *[operand[1] for operand in operands]
+            )
+        except (ArithmeticError, TypeError, ValueError):
+            return instruction
+
+        return ("constant", float(value))
+
+    def _action(self, production: int) -> Callable[[list[int | None]], int] | None:
+        if production not in self._actions:
+            lhs, _, action = self._parser.Gramma.Productions[production]
+            self._actions[production] = (
+                None if action is None else self._compile_action(lhs, action)
+            )
+
+        return self._actions[production]
+
+    def _compile_action(
+        self, lhs: str, action: str
+    ) -> Callable[[list[int | None]], int]:
+        matched = _ACTION.match(action)
+        if matched is None:
+            raise ValueError(f"Unsupported action for {lhs}: {action.strip()}")
+
+        try:
+            expression = ast.parse(
+                _REFERENCE.sub(r"_\1", matched.group(1).strip()), mode="eval"
+            ).body
+        except SyntaxError as error:
+            raise ValueError(
+                f"Unsupported action for {lhs}: {action.strip()}"
+            ) from error
+
+        def emit(node: ast.expr, children: list[int | None]) -> int:
+            if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)):
+                return self._emit(("constant", float(node.value)))
+
+            if isinstance(node, ast.Name) and node.id[1:].isdigit():
+                position = int(node.id[1:]) - 1
+                if not 0 <= position < len(children) or children[position] is None:
+                    raise ValueError(f"${position + 1} has no value in {lhs} action")
+                return children[position]  # type: ignore
+
+            if isinstance(node, ast.BinOp) and type(node.op) in _ACTION_OPERATORS:
+                return self._emit(
+                    (
+                        _ACTION_OPERATORS[type(node.op)],
+                        emit(node.left, children),
+                        emit(node.right, children),
+                    )
+                )
+
+            if isinstance(node, ast.UnaryOp) and type(node.op) in _ACTION_OPERATORS:
+                return self._emit(
+                    (_ACTION_OPERATORS[type(node.op)], emit(node.operand, children))
+                )
+
+            if (
+                isinstance(node, ast.Call)
+                and isinstance(node.func, ast.Name)
+                and node.func.id in PLAN_FUNCTIONS
+                and not node.keywords
+                and len(node.args)
+                == (1 if PLAN_FUNCTIONS[node.func.id] in _UNARY_OPERATIONS else 2)
+            ):
+                return self._emit(
+                    (
+                        PLAN_FUNCTIONS[node.func.id],
+                        *[emit(argument, children) for argument in node.args],
+                    )
+                )
+
+            raise ValueError(
+                f"Unsupported action for {lhs}: {action.strip()} ({ast.unparse(node)})"
+            )
+
+        return lambda children: emit(expression, children)
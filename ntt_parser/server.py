@@ -0,0 +1,297 @@
+import asyncio
+import hashlib
+import json
+import socket
+import struct
+import time
+from collections import OrderedDict
+from typing import Any
+
+from .earley import select_parser
+from .gramma import Gramma
+from .parser import Parser
+from .tree import SyntaxTree
+
+_FRAME = struct.Struct(">I")
+DEFAULT_MAX_FRAME = 64 * 1024 * 1024
+
+
+def gramma_hash(gramma_str: str) -> str:
+    return hashlib.sha256(gramma_str.encode("utf-8")).hexdigest()
+
+
+class GrammaCache:
+    """
+    LRU of compiled parsers keyed by the sha256 of the gramma text.
+    """
+
+    def __init__(self, capacity: int = 32) -> None:
+        assert capacity > 0, "Gramma cache capacity must be positive"
+        self._capacity = capacity
+        self._parsers: OrderedDict[str, Parser] = OrderedDict()
+        self.Hits = 0
+        self.Misses = 0
+        self.Evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._parsers)
+
+    def get(self, key: str) -> Parser | None:
+        parser = self._parsers.get(key)
+
+        if parser is None:
+            self.Misses += 1
+            return None
+
+        self.Hits += 1
+        self._parsers.move_to_end(key)
+        return parser
+
+    def add(self, gramma_str: str) -> tuple[str, Parser]:
+        key = gramma_hash(gramma_str)
+        parser = self._parsers.get(key)
+
+        if parser is None:
+            self.Misses += 1
+            parser = select_parser(Gramma.parse(gramma_str))
+            self._parsers[key] = parser
+
+            if len(self._parsers) > self._capacity:
+                self._parsers.popitem(last=False)
+                self.Evictions += 1
+        else:
+            self.Hits += 1
+
+        self._parsers.move_to_end(key)
+        return key, parser
+
+
+class ParseServer:
+    """
+    Parse requests over a Unix domain socket against warm, cached grammars.
+
+    Every message is a 4-byte big-endian length followed by a JSON object.
+    A parse request carries ``input`` plus either ``gramma`` (the ``.bnf``
+    text) or ``hash`` (of a gramma sent before; unknown hashes are answered
+    with ``unknown_gramma``) and an optional ``format``:
+    ``"json"`` returns the tree arrays inside the response, ``"binary"``
+    sends ``SyntaxTree.to_bytes()`` as a second frame. ``{"command":
+    "stats"}`` returns the latency and cache metrics. A request that fails
+    for any reason, including a frame that is not a JSON object, is answered
+    with ``ok: false`` and an ``error`` and the connection stays open. A frame
+    longer than ``max_frame`` bytes is answered the same way without being
+    read, and the connection is closed.
+    """
+
+    def __init__(
+        self, cache_size: int = 32, max_frame: int = DEFAULT_MAX_FRAME
+    ) -> None:
+        assert max_frame > 0, "Maximum frame size must be positive"
+        self._cache = GrammaCache(cache_size)
+        self._max_frame = max_frame
+        self._requests = 0
+        self._errors = 0
+        self._total_latency_us = 0
+        self._max_latency_us = 0
+
+    @property
+    def Cache(self) -> GrammaCache:
+        return self._cache
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "requests": self._requests,
+            "errors": self._errors,
+            "total_latency_us": self._total_latency_us,
+            "max_latency_us": self._max_latency_us,
+            "mean_latency_us": (
+                self._total_latency_us // self._requests if self._requests else 0
+            ),
+            "cache_size": len(self._cache),
+            "cache_hits": self._cache.Hits,
+            "cache_misses": self._cache.Misses,
+            "cache_evictions": self._cache.Evictions,
+        }
+
+    def handle(self, request: dict[str, Any]) -> tuple[dict[str, Any], bytes | None]:
+        started = time.perf_counter_ns()
+
+        if request.get("command") == "stats":
+            return {"id": request.get("id"), "ok": True, "stats": self.stats()}, None
+
+        response: dict[str, Any] = {"id": request.get("id"), "ok": True}
+        payload: bytes | None = None
+
+        try:
+            if "gramma" in request:
+                key, parser = self._cache.add(request["gramma"])
+            else:
+                key = request.get("hash", "")
+                cached = self._cache.get(key)
+                if cached is None:
+                    response["unknown_gramma"] = True
+                    raise ValueError(f"Unknown gramma hash: {key}")
+                parser = cached
+
+            tree = parser.parse(request["input"])
+            response["hash"] = key
+            response["nodes"] = len(tree)
+
+            if request.get("format", "json") == "binary":
+                payload = tree.to_bytes()
+            else:
+                response["tree"] = _tree_to_json(tree)
+        except Exception as error:
+            self._errors += 1
+            response["ok"] = False
+            response["error"] = f"{type(error).__name__}: {error}"
+
+        latency_us = (time.perf_counter_ns() - started) // 1000
+        self._requests += 1
+        self._total_latency_us += latency_us
+        self._max_latency_us = max(self._max_latency_us, latency_us)
+        response["latency_us"] = latency_us
+        response["binary"] = payload is not None
+
+        return response, payload
+
+    def handle_frame(self, data: bytes) -> tuple[dict[str, Any], bytes | None]:
+        """
+        Decode one request frame and handle it. A frame that is not a JSON
+        object is answered with an error instead of closing the connection.
+        """
+        try:
+            request = json.loads(data)
+            if not isinstance(request, dict):
+                raise ValueError("Request must be a JSON object")
+        except ValueError as error:
+            return self._reject(error), None
+
+        return self.handle(request)
+
+    def _reject(self, error: ValueError) -> dict[str, Any]:
+        self._requests += 1
+        self._errors += 1
+        return {
+            "id": None,
+            "ok": False,
+            "error": f"{type(error).__name__}: {error}",
+            "binary": False,
+        }
+
+    async def serve(self, path: str) -> None:
+        server = await asyncio.start_unix_server(self._serve_client, path=path)
+
+        async with server:
+            await server.serve_forever()
+
+    async def _serve_client(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        try:
+            while True:
+                try:
+                    header = await reader.readexactly(_FRAME.size)
+                except asyncio.IncompleteReadError:
+                    break
+
+                (size,) = _FRAME.unpack(header)
+                if size > self._max_frame:
+                    error = ValueError(
+                        f"Frame of {size} bytes exceeds the {self._max_frame} "
+                        "byte limit"
+                    )
+                    writer.write(
+                        _frame(json.dumps(self._reject(error)).encode("utf-8"))
+                    )
+                    await writer.drain()
+                    break
+
+                response, payload = self.handle_frame(await reader.readexactly(size))
+
+                writer.write(_frame(json.dumps(response).encode("utf-8")))
+                if payload is not None:
+                    writer.write(_frame(payload))
+                await writer.drain()
+        finally:
+            writer.close()
+
+
+class ParseClient:
+    """
+    Blocking client for ``ParseServer``. Grammars are sent by hash and only
+    uploaded when the server does not know them yet.
+    """
+
+    def __init__(self, path: str) -> None:
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._socket.connect(path)
+        self._stream = self._socket.makefile("rb")
+
+    def __enter__(self) -> "ParseClient":
+        return self
+
+    def __exit__(self, *_: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._stream.close()
+        self._socket.close()
+
+    def request(self, request: dict[str, Any]) -> dict[str, Any]:
+        self._socket.sendall(_frame(json.dumps(request).encode("utf-8")))
+        response = json.loads(self._read_frame())
+
+        if response.get("binary"):
+            response["tree"] = SyntaxTree.from_bytes(self._read_frame())
+
+        return response
+
+    def parse(
+        self, gramma_str: str, input_str: str, format: str = "json"
+    ) -> dict[str, Any]:
+        request = {
+            "hash": gramma_hash(gramma_str),
+            "input": input_str,
+            "format": format,
+        }
+        response = self.request(request)
+
+        if response.get("unknown_gramma"):
+            request["gramma"] = gramma_str
+            response = self.request(request)
+
+        return response
+
+    def stats(self) -> dict[str, Any]:
+        return self.request({"command": "stats"})["stats"]
+
+    def _read_frame(self) -> bytes:
+        header = self._stream.read(_FRAME.size)
+        if len(header) < _FRAME.size:
+            raise ConnectionError("Parse server closed the connection")
+
+        (size,) = _FRAME.unpack(header)
+        return self._stream.read(size)
+
+
+def _frame(payload: bytes) -> bytes:
+    return _FRAME.pack(len(payload)) + payload
+
+
+def _tree_to_json(tree: SyntaxTree) -> dict[str, Any]:
+    return {
+        "symbols": tree.Symbols,
+        "tokens": {
+            "kinds": tree.Tokens.Kinds.tolist(),
+            "starts": tree.Tokens.Starts.tolist(),
+            "ends": tree.Tokens.Ends.tolist(),
+        },
+        "kinds": tree.Kinds.tolist(),
+        "productions": tree.Productions.tolist(),
+        "starts": tree.Starts.tolist(),
+        "ends": tree.Ends.tolist(),
+        "first_children": tree.FirstChildren.tolist(),
+        "next_siblings": tree.NextSiblings.tolist(),
+        "parents": tree.Parents.tolist(),
+    }
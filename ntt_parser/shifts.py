@@ -0,0 +1,102 @@
+from array import array
+from bisect import bisect_left, bisect_right
+
+
+class Shifts:
+    """
+    Offsets still owed to a column of integers, so an incremental parse can
+    copy the unchanged part of a column as it is instead of rewriting every
+    value. From index ``Firsts[k]`` up to the next first, the stored values
+    are ``Deltas[k]`` smaller than the real ones; the ``sentinel`` (``-1`` for
+    the tree links) always stands for itself.
+    """
+
+    def __init__(self) -> None:
+        self._firsts: list[int] = []
+        self._deltas: list[int] = []
+
+    def __bool__(self) -> bool:
+        return bool(self._firsts)
+
+    @property
+    def Firsts(self) -> list[int]:
+        return self._firsts
+
+    @property
+    def Deltas(self) -> list[int]:
+        return self._deltas
+
+    def at(self, index: int) -> int:
+        k = bisect_right(self._firsts, index)
+        return self._deltas[k - 1] if k else 0
+
+    def mark(self, first: int, delta: int) -> None:
+        """
+        Owes ``delta`` from index ``first`` onwards; ``first`` is never before
+        the last marked index.
+        """
+        firsts, deltas = self._firsts, self._deltas
+        if firsts and firsts[-1] == first:
+            firsts.pop()
+            deltas.pop()
+
+        if (deltas[-1] if deltas else 0) != delta:
+            firsts.append(first)
+            deltas.append(delta)
+
+    def copy(
+        self, other: "Shifts", low: int, high: int, index_shift: int, delta: int
+    ) -> None:
+        """
+        Marks what ``other`` owes over ``[low, high)``, moved by
+        ``index_shift`` indices and owing ``delta`` more, then owes nothing
+        again from the moved ``high``.
+        """
+        firsts, deltas = other._firsts, other._deltas
+        k = bisect_right(firsts, low)
+        self.mark(low + index_shift, (deltas[k - 1] if k else 0) + delta)
+        while k < len(firsts) and firsts[k] < high:
+            self.mark(firsts[k] + index_shift, deltas[k] + delta)
+            k += 1
+
+        self.mark(high + index_shift, 0)
+
+    def cut(self, index: int) -> None:
+        """
+        Owes nothing from ``index`` on, once those values have been settled.
+        """
+        k = bisect_left(self._firsts, index)
+        del self._firsts[k:]
+        del self._deltas[k:]
+        self.mark(index, 0)
+
+    def apply(
+        self, values: array, low: int, high: int, sentinel: int | None = None
+    ) -> None:
+        """
+        Adds what is owed over ``[low, high)`` to ``values``, whose indices are
+        those of the column.
+        """
+        firsts, deltas = self._firsts, self._deltas
+        for k, delta in enumerate(deltas):
+            begin = max(low, firsts[k])
+            end = min(high, firsts[k + 1] if k + 1 < len(firsts) else high)
+            if delta == 0 or begin >= end:
+                continue
+
+            if sentinel is None:
+                shifted = [value + delta for value in values[begin:end]]
+            else:
+                shifted = [
+                    value if value == sentinel else value + delta
+                    for value in values[begin:end]
+                ]
+            values[begin:end] = array(values.typecode, shifted)
+
+
+def copy_values(target: array, source: array, low: int, high: int) -> None:
+    """
+    Appends ``source[low:high]`` to ``target`` as one block copy.
+    """
+    size = source.itemsize
+    target.frombytes(memoryview(source).cast("B")[low * size : high * size])
@@ -0,0 +1,164 @@
+import asyncio
+import codecs
+from dataclasses import dataclass
+from enum import Enum, auto
+from typing import AsyncIterable, AsyncIterator
+
+from .lexer import StreamLexer
+from .parser import NO_ENTRY, Parser
+from .tree import NO_PRODUCTION
+
+
+class ParseEventType(Enum):
+    ENTER = auto()
+    TOKEN = auto()
+    EXIT = auto()
+
+
+@dataclass(frozen=True, slots=True)
+class ParseEvent:
+    type: ParseEventType
+    symbol: str
+    production: int
+    text: str
+    offset: int
+
+
+class PushParser:
+    """
+    LL(1) parser driven one token at a time. Instead of building a tree it
+    records ENTER/TOKEN/EXIT events, which callers drain with ``events()``.
+    """
+
+    def __init__(self, parser: Parser) -> None:
+        assert not parser.HasPrecedence, "Precedence grammars are not streamable"
+        assert parser.Engine == "ll1", "Only LL(1) grammas are streamable"
+
+        self._parser = parser
+        self._symbols = parser.Symbols
+        self._table = parser.Table
+        self._terminal_count = parser.TerminalCount
+        self._reversed_productions = [rhs[::-1] for rhs in parser.Productions]
+        self._stack: list[int] = [parser.StartSymbol]
+        self._events: list[ParseEvent] = []
+        self._position = 0
+
+    def events(self) -> list[ParseEvent]:
+        events = self._events
+        self._events = []
+        return events
+
+    def feed(self, kind: int, offset: int, text: str) -> None:
+        stack = self._stack
+        events = self._events
+        symbols = self._symbols
+        table = self._table
+        terminal_count = self._terminal_count
+
+        while True:
+            if not stack:
+                if kind == self._parser.EndOfInput:
+                    return
+
+                raise self._parser.syntax_error(
+                    kind, self._position, offset, [self._parser.EndOfInput]
+                )
+
+            symbol = stack.pop()
+
+            if symbol < 0:
+                events.append(
+                    ParseEvent(
+                        ParseEventType.EXIT, symbols[~symbol], NO_PRODUCTION, "", offset
+                    )
+                )
+            elif symbol < terminal_count:
+                if symbol != kind:
+                    raise self._parser.syntax_error(
+                        kind, self._position, offset, [symbol]
+                    )
+
+                events.append(
+                    ParseEvent(
+                        ParseEventType.TOKEN,
+                        symbols[symbol],
+                        NO_PRODUCTION,
+                        text,
+                        offset,
+                    )
+                )
+                self._position += 1
+                return
+            else:
+                production = table[(symbol - terminal_count) * terminal_count + kind]
+                if production == NO_ENTRY:
+                    raise self._parser.syntax_error(
+                        kind,
+                        self._position,
+                        offset,
+                        self._parser.expected_terminals(symbol),
+                    )
+
+                events.append(
+                    ParseEvent(
+                        ParseEventType.ENTER, symbols[symbol], production, "", offset
+                    )
+                )
+                stack.append(~symbol)
+                stack.extend(self._reversed_productions[production])
+
+    def finish(self, offset: int) -> None:
+        self.feed(self._parser.EndOfInput, offset, "")
+
+
+async def parse_stream(
+    parser: Parser,
+    source: asyncio.StreamReader | AsyncIterable[bytes | str],
+    chunk_size: int = 65536,
+    yield_every: int = 1024,
+    encoding: str = "utf-8",
+) -> AsyncIterator[ParseEvent]:
+    """
+    Parse input read from ``source`` as it arrives, yielding parse events.
+    Only the unfinished tail token is buffered, and control goes back to the
+    event loop every ``yield_every`` tokens so many streams can be parsed
+    concurrently.
+    """
+    lexer = StreamLexer(parser.Lexer)
+    push_parser = PushParser(parser)
+    decoder = codecs.getincrementaldecoder(encoding)()
+    pending = 0
+
+    async for chunk in _chunks(source, chunk_size):
+        text = decoder.decode(chunk) if isinstance(chunk, bytes) else chunk
+
+        for kind, start, _, token_text in lexer.feed(text):
+            push_parser.feed(kind, start, token_text)
+            for event in push_parser.events():
+                yield event
+
+            pending += 1
+            if pending >= yield_every:
+                pending = 0
+                await asyncio.sleep(0)
+
+    for kind, start, _, token_text in lexer.feed(decoder.decode(b"", True), True):
+        push_parser.feed(kind, start, token_text)
+
+    push_parser.finish(lexer.Offset)
+    for event in push_parser.events():
+        yield event
+
+
+async def _chunks(
+    source: asyncio.StreamReader | AsyncIterable[bytes | str], chunk_size: int
+) -> AsyncIterator[bytes | str]:
+    if isinstance(source, asyncio.StreamReader):
+        while True:
+            chunk = await source.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+    else:
+        async for chunk in source:
+            yield chunk
@@ -0,0 +1,702 @@
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+from typing import Iterator
+
+from .lexer import Tokens
+from .shifts import Shifts, copy_values
+
+NO_NODE = -1
+NO_PRODUCTION = -1
+ERROR_PRODUCTION = -2
+
+_TREE_MAGIC = b"NTTT"
+_TREE_VERSION = 1
+_TREE_HEADER = struct.Struct("<4sHHIII")
+
+
+class TreeNode:
+    """
+    Lightweight cursor over one node of a ``SyntaxTree``; nothing is stored
+    per node besides the tree reference and the node index.
+    """
+
+    __slots__ = ("_tree", "_index")
+
+    def __init__(self, tree: "SyntaxTree", index: int) -> None:
+        self._tree = tree
+        self._index = index
+
+    def __eq__(self, other: object) -> bool:
+        return (
+            isinstance(other, TreeNode)
+            and other._tree is self._tree
+            and other._index == self._index
+        )
+
+    def __hash__(self) -> int:
+        return hash((id(self._tree), self._index))
+
+    def __repr__(self) -> str:
+        return f"TreeNode({self.Symbol!r}, {self.Start}:{self.End})"
+
+    @property
+    def Index(self) -> int:
+        return self._index
+
+    @property
+    def Kind(self) -> int:
+        return self._tree._kinds[self._index]
+
+    @property
+    def Symbol(self) -> str:
+        return self._tree._symbols[self._tree._kinds[self._index]]
+
+    @property
+    def Production(self) -> int:
+        return self._tree._productions[self._index]
+
+    @property
+    def IsToken(self) -> bool:
+        return self._tree._productions[self._index] == NO_PRODUCTION
+
+    @property
+    def IsError(self) -> bool:
+        return self._tree._productions[self._index] == ERROR_PRODUCTION
+
+    @property
+    def Start(self) -> int:
+        return self._tree.start(self._index)
+
+    @property
+    def End(self) -> int:
+        return self._tree.end(self._index)
+
+    @property
+    def Text(self) -> str:
+        return self._tree.text(
+            self._tree.start(self._index), self._tree.end(self._index)
+        )
+
+    @property
+    def Location(self) -> tuple[int, int]:
+        """
+        1-based ``(line, column)`` of the first character of the node.
+        """
+        tokens = self._tree._tokens
+        return tokens.Lines.location(tokens.start(self._tree.start(self._index)))
+
+    @property
+    def Parent(self) -> "TreeNode | None":
+        return self._tree.node(self._tree.parent(self._index))
+
+    @property
+    def FirstChild(self) -> "TreeNode | None":
+        return self._tree.node(self._tree.first_child(self._index))
+
+    @property
+    def NextSibling(self) -> "TreeNode | None":
+        return self._tree.node(self._tree.next_sibling(self._index))
+
+    @property
+    def Children(self) -> list["TreeNode"]:
+        tree = self._tree
+        next_sibling = tree.next_sibling
+        children: list[TreeNode] = []
+        child = tree.first_child(self._index)
+
+        while child != NO_NODE:
+            children.append(TreeNode(tree, child))
+            child = next_sibling(child)
+
+        return children
+
+
+class SyntaxTree:
+    """
+    Concrete syntax tree stored struct-of-arrays style. Node ``i`` is described
+    by ``kinds[i]`` (symbol id), ``productions[i]`` (production index, or
+    ``NO_PRODUCTION`` for tokens, ``ERROR_PRODUCTION`` for non-terminals
+    abandoned by error recovery), the token span ``starts[i]:ends[i]`` and the
+    ``first_children``/``next_siblings``/``parents`` links. Nodes are stored in
+    pre-order, so every subtree occupies a contiguous index range.
+
+    A tree built by an incremental parse copies reused subtrees as they were
+    and owes their token and node index shifts through ``span_shifts`` and
+    ``link_shifts``. ``start``, ``end``, ``parent``, ``first_child`` and
+    ``next_sibling`` read single values without settling them, the column
+    properties settle the whole column first.
+    """
+
+    def __init__(
+        self,
+        symbols: list[str],
+        tokens: Tokens,
+        kinds: array,
+        productions: array,
+        starts: array,
+        ends: array,
+        first_children: array,
+        next_siblings: array,
+        parents: array,
+        span_shifts: Shifts | None = None,
+        link_shifts: Shifts | None = None,
+    ) -> None:
+        self._symbols = symbols
+        self._tokens = tokens
+        self._kinds = kinds
+        self._productions = productions
+        self._starts = starts
+        self._ends = ends
+        self._first_children = first_children
+        self._next_siblings = next_siblings
+        self._parents = parents
+        self._span_shifts = span_shifts if span_shifts is not None else Shifts()
+        self._link_shifts = link_shifts if link_shifts is not None else Shifts()
+
+    def __len__(self) -> int:
+        return len(self._kinds)
+
+    def start(self, index: int) -> int:
+        if self._span_shifts:
+            return self._starts[index] + self._span_shifts.at(index)
+
+        return self._starts[index]
+
+    def end(self, index: int) -> int:
+        if self._span_shifts:
+            return self._ends[index] + self._span_shifts.at(index)
+
+        return self._ends[index]
+
+    def parent(self, index: int) -> int:
+        return self._link(self._parents, index)
+
+    def first_child(self, index: int) -> int:
+        return self._link(self._first_children, index)
+
+    def next_sibling(self, index: int) -> int:
+        return self._link(self._next_siblings, index)
+
+    def bisect_start(self, token: int, low: int = 0) -> int:
+        """
+        Index of the first node from ``low`` on whose span starts at or after
+        ``token``, as ``bisect_left`` over ``Starts``.
+        """
+        if self._span_shifts:
+            return bisect_left(range(len(self._kinds)), token, low, key=self.start)
+
+        return bisect_left(self._starts, token, low)
+
+    def node(self, index: int) -> TreeNode | None:
+        if index == NO_NODE:
+            return None
+
+        return TreeNode(self, index)
+
+    def walk(self) -> Iterator[TreeNode]:
+        for index in range(len(self._kinds)):
+            yield TreeNode(self, index)
+
+    def text(self, start: int, end: int) -> str:
+        if start >= end:
+            return ""
+
+        return self._tokens.Source[
+            self._tokens.start(start) : self._tokens.end(end - 1)
+        ]
+
+    def subtree_end(self, index: int) -> int:
+        """
+        One past the last node index of the subtree rooted at ``index``.
+        """
+        next_siblings = self._next_siblings
+        parents = self._parents
+        at = self._link_shifts.at if self._link_shifts else None
+
+        while index != NO_NODE:
+            sibling = next_siblings[index]
+            if sibling != NO_NODE:
+                return sibling if at is None else sibling + at(index)
+
+            parent = parents[index]
+            if at is not None and parent != NO_NODE:
+                parent += at(index)
+            index = parent
+
+        return len(self._kinds)
+
+    def ancestors(self, index: int) -> list[int]:
+        """
+        Ancestors of node ``index``, innermost first.
+        """
+        parents = self._parents
+        at = self._link_shifts.at if self._link_shifts else None
+        ancestors: list[int] = []
+
+        parent = parents[index]
+        while parent != NO_NODE:
+            if at is not None:
+                parent += at(index)
+            ancestors.append(parent)
+            index = parent
+            parent = parents[index]
+
+        return ancestors
+
+    @property
+    def Root(self) -> TreeNode:
+        assert len(self._kinds) > 0, "Empty syntax tree"
+        return TreeNode(self, 0)
+
+    @property
+    def Symbols(self) -> list[str]:
+        return self._symbols
+
+    @property
+    def Tokens(self) -> Tokens:
+        return self._tokens
+
+    @property
+    def Kinds(self) -> array:
+        return self._kinds
+
+    @property
+    def Productions(self) -> array:
+        return self._productions
+
+    @property
+    def Starts(self) -> array:
+        self._settle()
+        return self._starts
+
+    @property
+    def Ends(self) -> array:
+        self._settle()
+        return self._ends
+
+    @property
+    def FirstChildren(self) -> array:
+        self._settle()
+        return self._first_children
+
+    @property
+    def NextSiblings(self) -> array:
+        self._settle()
+        return self._next_siblings
+
+    @property
+    def Parents(self) -> array:
+        self._settle()
+        return self._parents
+
+    def _link(self, values: array, index: int) -> int:
+        value = values[index]
+        if value == NO_NODE or not self._link_shifts:
+            return value
+
+        return value + self._link_shifts.at(index)
+
+    def _settle(self) -> None:
+        count = len(self._kinds)
+        if self._span_shifts:
+            self._span_shifts.apply(self._starts, 0, count)
+            self._span_shifts.apply(self._ends, 0, count)
+            self._span_shifts = Shifts()
+
+        if self._link_shifts:
+            for values in self._node_arrays()[4:]:
+                self._link_shifts.apply(values, 0, count, NO_NODE)
+            self._link_shifts = Shifts()
+
+    def _node_arrays(self) -> list[array]:
+        return [
+            self._kinds,
+            self._productions,
+            self._starts,
+            self._ends,
+            self._first_children,
+            self._next_siblings,
+            self._parents,
+        ]
+
+    def _token_arrays(self) -> list[array]:
+        return [self._tokens.Kinds, self._tokens.Starts, self._tokens.Ends]
+
+    def to_bytes(self) -> bytes:
+        """
+        Serialize the tree (symbols, tokens, source and node arrays) into a
+        little-endian byte string that ``SyntaxTree.from_bytes`` reads back.
+        """
+        self._settle()
+        symbols = "\n".join(self._symbols).encode("utf-8")
+        source = self._tokens.Source.encode("utf-8")
+        parts = [
+            _TREE_HEADER.pack(
+                _TREE_MAGIC,
+                _TREE_VERSION,
+                0,
+                len(self._kinds),
+                len(self._tokens),
+                len(self._symbols),
+            ),
+            struct.pack("<QQ", len(symbols), len(source)),
+            symbols,
+            source,
+        ]
+
+        for values in self._token_arrays() + self._node_arrays():
+            parts.append(_to_little_endian(values))
+
+        return b"".join(parts)
+
+    @staticmethod
+    def from_bytes(data: bytes | bytearray | memoryview) -> "SyntaxTree":
+        view = memoryview(data)
+        magic, version, _, node_count, token_count, _ = _TREE_HEADER.unpack_from(
+            view, 0
+        )
+
+        if magic != _TREE_MAGIC:
+            raise ValueError("Not a serialized syntax tree")
+        if version != _TREE_VERSION:
+            raise ValueError(f"Unsupported syntax tree version: {version}")
+
+        cursor = _TREE_HEADER.size
+        symbols_size, source_size = struct.unpack_from("<QQ", view, cursor)
+        cursor += 16
+
+        symbols = bytes(view[cursor : cursor + symbols_size]).decode("utf-8")
+        cursor += symbols_size
+        source = bytes(view[cursor : cursor + source_size]).decode("utf-8")
+        cursor += source_size
+
+        arrays: list[array] = []
+        for typecode, count in [
+            ("i", token_count),
+            ("q", token_count),
+            ("q", token_count),
+        ] + [("i", node_count)] * 7:
+            values, cursor = _from_little_endian(view, cursor, typecode, count)
+            arrays.append(values)
+
+        tokens = Tokens(source, arrays[0], arrays[1], arrays[2])
+
+        return SyntaxTree(symbols.split("\n"), tokens, *arrays[3:])
+
+
+class TreeBuilder:
+    """
+    Appends nodes in pre-order; the runtime parser drives it while expanding
+    productions.
+    """
+
+    def __init__(self, symbols: list[str], tokens: Tokens) -> None:
+        self._symbols = symbols
+        self._tokens = tokens
+        self._kinds = array("i")
+        self._productions = array("i")
+        self._starts = array("i")
+        self._ends = array("i")
+        self._first_children = array("i")
+        self._next_siblings = array("i")
+        self._parents = array("i")
+        self._last_children = array("i")
+        self._span_shifts = Shifts()
+        self._link_shifts = Shifts()
+
+    def __len__(self) -> int:
+        return len(self._kinds)
+
+    def add(self, kind: int, production: int, start: int, parent: int) -> int:
+        index = len(self._kinds)
+
+        self._kinds.append(kind)
+        self._productions.append(production)
+        self._starts.append(start)
+        self._ends.append(start)
+        self._first_children.append(NO_NODE)
+        self._next_siblings.append(NO_NODE)
+        self._parents.append(parent)
+        self._last_children.append(NO_NODE)
+
+        if parent != NO_NODE:
+            last_child = self._last_children[parent]
+            if last_child == NO_NODE:
+                self._first_children[parent] = index
+            else:
+                self._next_siblings[last_child] = index
+            self._last_children[parent] = index
+
+        return index
+
+    def close(self, index: int, end: int) -> None:
+        self._ends[index] = end
+
+    def extend(
+        self,
+        kinds: list[int],
+        productions: list[int],
+        starts: list[int],
+        ends: list[int],
+        parents: list[int],
+    ) -> None:
+        """
+        Append closed nodes given in pre-order, each one linked as the last
+        child of its parent.
+        """
+        base = len(self._kinds)
+        count = len(kinds)
+        unlinked = array("i", [NO_NODE]) * count
+
+        self._kinds.extend(kinds)
+        self._productions.extend(productions)
+        self._starts.extend(starts)
+        self._ends.extend(ends)
+        self._first_children.extend(unlinked)
+        self._next_siblings.extend(unlinked)
+        self._parents.extend(parents)
+        self._last_children.extend(unlinked)
+
+        first_children = self._first_children
+        next_siblings = self._next_siblings
+        last_children = self._last_children
+        for index, parent in enumerate(parents, base):
+            if parent != NO_NODE:
+                last_child = last_children[parent]
+                if last_child == NO_NODE:
+                    first_children[parent] = index
+                else:
+                    next_siblings[last_child] = index
+                last_children[parent] = index
+
+    @staticmethod
+    def resume(
+        tree: SyntaxTree, tokens: Tokens, count: int, reopened: int | None = None
+    ) -> "TreeBuilder":
+        """
+        Start a builder from the first ``count`` pre-order nodes of ``tree``.
+        Nodes still open at that point (the ancestors of node ``count``) are
+        reopened so the parser can keep appending children to them; with
+        ``reopened`` only that many of the innermost ones are, the others keep
+        their children as they are.
+        """
+        builder = TreeBuilder(tree.Symbols, tokens)
+        builder._kinds = tree._kinds[:count]
+        builder._productions = tree._productions[:count]
+        builder._starts = tree._starts[:count]
+        builder._ends = tree._ends[:count]
+        builder._first_children = tree._first_children[:count]
+        builder._next_siblings = tree._next_siblings[:count]
+        builder._parents = tree._parents[:count]
+        builder._last_children = array("i", [NO_NODE]) * count
+
+        # Only the kept prefix settles what the old tree still owes.
+        tree._span_shifts.apply(builder._starts, 0, count)
+        tree._span_shifts.apply(builder._ends, 0, count)
+        for values in builder._node_arrays()[4:]:
+            tree._link_shifts.apply(values, 0, count, NO_NODE)
+
+        if count == len(tree):
+            return builder
+
+        parent = tree.parent(count)
+        last_child = NO_NODE
+        sibling = tree.first_child(parent)
+        while sibling != count:
+            last_child = sibling
+            sibling = tree.next_sibling(sibling)
+
+        if last_child == NO_NODE:
+            builder._first_children[parent] = NO_NODE
+        else:
+            builder._next_siblings[last_child] = NO_NODE
+        builder._last_children[parent] = last_child
+
+        child = parent
+        parent = tree.parent(child)
+        depth = 1
+        while parent != NO_NODE and (reopened is None or depth < reopened):
+            builder._next_siblings[child] = NO_NODE
+            builder._last_children[parent] = child
+            child = parent
+            parent = tree.parent(child)
+            depth += 1
+
+        return builder
+
+    def copy_subtree(
+        self, tree: SyntaxTree, index: int, parent: int, token_shift: int
+    ) -> int:
+        """
+        Append a copy of the subtree rooted at ``tree`` node ``index`` as the
+        last child of ``parent``, shifting its token span by ``token_shift``.
+
+        The nodes are copied as they are in one block; the nodes under the
+        root owe their token and node index shifts instead of being rewritten.
+        """
+        end = tree.subtree_end(index)
+        new_index = len(self._kinds)
+        node_shift = new_index - index
+
+        for values, old_values in zip(self._node_arrays(), tree._node_arrays()):
+            copy_values(values, old_values, index, end)
+        self._last_children.extend(array("i", [NO_NODE]) * (end - index))
+
+        self._starts[new_index] = tree.start(index) + token_shift
+        self._ends[new_index] = tree.end(index) + token_shift
+        first_child = tree.first_child(index)
+        if first_child != NO_NODE:
+            self._first_children[new_index] = first_child + node_shift
+        self._span_shifts.copy(
+            tree._span_shifts, index + 1, end, node_shift, token_shift
+        )
+        self._link_shifts.copy(
+            tree._link_shifts, index + 1, end, node_shift, node_shift
+        )
+
+        self.adopt(new_index, parent)
+        return new_index
+
+    def span(self, index: int) -> tuple[int, int]:
+        shift = self._span_shifts.at(index)
+        return self._starts[index] + shift, self._ends[index] + shift
+
+    def adopt(self, index: int, parent: int) -> None:
+        """
+        Link the root ``index`` of a subtree as the last child of ``parent``.
+        """
+        self._next_siblings[index] = NO_NODE
+        self._parents[index] = parent
+
+        if parent != NO_NODE:
+            last_child = self._last_children[parent]
+            if last_child == NO_NODE:
+                self._first_children[parent] = index
+            else:
+                self._next_siblings[last_child] = index
+            self._last_children[parent] = index
+
+    def detach(self, start: int) -> tuple[int, list[array]]:
+        """
+        Remove the nodes from ``start`` on, returning them for
+        ``append_detached``.
+        """
+        count = len(self._kinds)
+        self._span_shifts.apply(self._starts, start, count)
+        self._span_shifts.apply(self._ends, start, count)
+        for values in self._node_arrays()[4:]:
+            self._link_shifts.apply(values, start, count, NO_NODE)
+        self._span_shifts.cut(start)
+        self._link_shifts.cut(start)
+
+        arrays = self._node_arrays()
+        detached = [values[start:] for values in arrays]
+        for values in arrays:
+            del values[start:]
+        del self._last_children[start:]
+
+        return start, detached
+
+    def append_detached(
+        self, detached: tuple[int, list[array]], index: int, end: int, parent: int
+    ) -> int:
+        """
+        Append the detached subtree that was rooted at ``index`` and ended
+        right before ``end`` as the last child of ``parent``.
+        """
+        start, arrays = detached
+        new_index = len(self._kinds)
+        self._extend(arrays, index - start, end - start, new_index - index, 0)
+
+        self.adopt(new_index, parent)
+        return new_index
+
+    def _extend(
+        self,
+        arrays: list[array],
+        low: int,
+        high: int,
+        node_shift: int,
+        token_shift: int,
+    ) -> None:
+        kinds, productions, starts, ends, first_children, next_siblings, parents = (
+            arrays
+        )
+
+        self._kinds.extend(kinds[low:high])
+        self._productions.extend(productions[low:high])
+        self._starts.extend(_shifted(starts[low:high], token_shift))
+        self._ends.extend(_shifted(ends[low:high], token_shift))
+        self._first_children.extend(
+            _shifted_links(first_children[low:high], node_shift)
+        )
+        self._next_siblings.extend(_shifted_links(next_siblings[low:high], node_shift))
+        self._parents.extend(_shifted(parents[low:high], node_shift))
+        self._last_children.extend(array("i", [NO_NODE]) * (high - low))
+
+    def _node_arrays(self) -> list[array]:
+        return [
+            self._kinds,
+            self._productions,
+            self._starts,
+            self._ends,
+            self._first_children,
+            self._next_siblings,
+            self._parents,
+        ]
+
+    def build(self) -> SyntaxTree:
+        return SyntaxTree(
+            self._symbols,
+            self._tokens,
+            self._kinds,
+            self._productions,
+            self._starts,
+            self._ends,
+            self._first_children,
+            self._next_siblings,
+            self._parents,
+            self._span_shifts,
+            self._link_shifts,
+        )
+
+
+def _shifted(values: array, shift: int) -> array:
+    if shift == 0:
+        return values
+
+    return array(values.typecode, [value + shift for value in values])
+
+
+def _shifted_links(values: array, shift: int) -> array:
+    if shift == 0:
+        return values
+
+    return array(
+        values.typecode,
+        [NO_NODE if value == NO_NODE else value + shift for value in values],
+    )
+
+
+def _to_little_endian(values: array) -> bytes:
+    if sys.byteorder == "little":
+        return values.tobytes()
+
+    swapped = array(values.typecode, values)
+    swapped.byteswap()
+    return swapped.tobytes()
+
+
+def _from_little_endian(
+    view: memoryview, cursor: int, typecode: str, count: int
+) -> tuple[array, int]:
+    values = array(typecode)
+    size = values.itemsize * count
+    values.frombytes(view[cursor : cursor + size])
+
+    if sys.byteorder != "little":
+        values.byteswap()
+
+    return values, cursor + size
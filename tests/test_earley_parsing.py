@@ -0,0 +1,166 @@
+import pytest  # type: ignore
+from ntt_parser import (
+    EarleyParser,
+    Gramma,
+    Instrumentation,
+    ParseError,
+    Parser,
+    SyntaxTree,
+    TreeNode,
+    select_parser,
+)
+from ntt_parser.stream import PushParser
+
+from .test_incremental_parsing import assert_same_tree
+from .test_syntax_tree import EXPRESSION_GRAMMA
+
+LEFT_RECURSIVE_GRAMMA = """
+/start-lexma
+
+number: /[0-9]+/
+
+/end-lexma
+
+/start-gramma
+
+E: E "+" T | T ;
+T: T "*" F | F ;
+F: "(" E ")" | number ;
+
+/end-gramma
+"""
+
+AMBIGUOUS_GRAMMA = """
+/start-lexma
+
+number: /[0-9]+/
+
+/end-lexma
+
+/start-gramma
+
+E: E "+" E | E "*" E | "(" E ")" | number ;
+
+/end-gramma
+"""
+
+NULLABLE_GRAMMA = """
+/start-gramma
+
+S: A "b" | "a" "c" | S S ;
+A: "a" | "" | A A ;
+
+/end-gramma
+"""
+
+
+def nesting(node: TreeNode) -> str:
+    children = node.Children
+    if not children:
+        return node.Text
+
+    text = " ".join(nesting(child) for child in children)
+    return f"({text})" if len(children) > 1 else text
+
+
+def assert_earley_machine(gramma_str: str, source: str, expected: str) -> SyntaxTree:
+    parser = select_parser(Gramma.parse(gramma_str))
+    assert isinstance(parser, EarleyParser)
+
+    tree = parser.parse(source)
+
+    assert nesting(tree.Root) == expected
+    assert tree.Root.Text == source.strip()
+    for index in range(1, len(tree)):
+        assert tree.Parents[index] < index
+    return tree
+
+
+def test_conflicts():
+    assert Gramma.parse(EXPRESSION_GRAMMA).IsLL1
+
+    gramma = Gramma.parse(LEFT_RECURSIVE_GRAMMA)
+    assert not gramma.IsLL1
+    assert gramma.Conflicts == [
+        ("E", '"("', [0, 1]),
+        ("E", "number", [0, 1]),
+        ("T", '"("', [2, 3]),
+        ("T", "number", [2, 3]),
+    ]
+
+    gramma = Gramma.parse(NULLABLE_GRAMMA)
+    assert ("S", '"a"', [0, 1, 2]) in gramma.Conflicts
+    assert ("A", '"a"', [3, 4, 5]) in gramma.Conflicts
+    assert ("A", '"b"', [4, 5]) in gramma.Conflicts
+    # The FOLLOW pass runs last, so the epsilon production takes the cell.
+    assert gramma.ParsingTable["A"]['"a"'] == 4
+
+
+def test_engine_selection():
+    assert select_parser(Gramma.parse(EXPRESSION_GRAMMA)).Engine == "ll1"
+    assert select_parser(Gramma.parse(LEFT_RECURSIVE_GRAMMA)).Engine == "earley"
+
+
+def test_left_recursion():
+    assert_earley_machine(LEFT_RECURSIVE_GRAMMA, "1+2*3", "(1 + (2 * 3))")
+    assert_earley_machine(LEFT_RECURSIVE_GRAMMA, "1+2+3", "((1 + 2) + 3)")
+    assert_earley_machine(LEFT_RECURSIVE_GRAMMA, "(1+2)*3", "((( (1 + 2) )) * 3)")
+    assert_earley_machine(
+        LEFT_RECURSIVE_GRAMMA.replace('E "+" T |', 'E "+" T | E "-" T |'),
+        "1-2+3-4",
+        "(((1 - 2) + 3) - 4)",
+    )
+
+
+def test_ambiguity_is_resolved_deterministically():
+    assert_earley_machine(AMBIGUOUS_GRAMMA, "1+2+3", "((1 + 2) + 3)")
+    assert_earley_machine(AMBIGUOUS_GRAMMA, "1*2+3", "((1 * 2) + 3)")
+    assert_earley_machine(AMBIGUOUS_GRAMMA, "1+2*3", "(1 + (2 * 3))")
+
+
+def test_nullable_and_cyclic_rules():
+    assert_earley_machine(NULLABLE_GRAMMA, "b", "( b)")
+    assert_earley_machine(NULLABLE_GRAMMA, "a b", "(a b)")
+    assert_earley_machine(NULLABLE_GRAMMA, "a c b", "((a c) ( b))")
+
+
+def test_syntax_errors():
+    parser = select_parser(Gramma.parse(LEFT_RECURSIVE_GRAMMA))
+
+    with pytest.raises(ParseError, match='expected one of: "\\(", number') as error:
+        parser.parse("1 + * 2")
+    assert error.value.position == 2
+    assert error.value.location == (1, 5)
+
+    with pytest.raises(ParseError, match='expected one of: "\\)", "\\*", "\\+"'):
+        parser.parse("(1 + 2")
+
+
+def test_item_budget():
+    parser = EarleyParser(Gramma.parse(AMBIGUOUS_GRAMMA), max_items=200)
+
+    parser.parse("1+2")
+    with pytest.raises(ParseError, match="exceeded 200 items"):
+        parser.parse("+".join(["1"] * 30))
+
+
+def test_shared_parser_api():
+    instrumentation = Instrumentation()
+    parser = EarleyParser(Gramma.parse(LEFT_RECURSIVE_GRAMMA), instrumentation)
+
+    tree = parser.parse("1+2*3")
+    assert instrumentation.Counters["tokens"] == 5
+    assert instrumentation.Counters["earley_items"] > 0
+
+    for result, source in zip(parser.parse_many(["1", "2*3"]), ["1", "2*3"]):
+        assert isinstance(result, SyntaxTree)
+        assert_same_tree(result, parser.parse(source))
+
+    assert_same_tree(parser.reparse(tree, 1, 2, "*"), parser.parse("1*2*3"))
+    assert_same_tree(SyntaxTree.from_bytes(tree.to_bytes()), tree)
+
+    with pytest.raises(AssertionError):
+        parser.parse_with_recovery("1+")
+    with pytest.raises(AssertionError):
+        PushParser(parser)
+    assert isinstance(parser, Parser)
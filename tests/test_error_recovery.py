@@ -0,0 +1,86 @@
+import pytest  # type: ignore
+from ntt_parser import ERROR_PRODUCTION, LexError, ParseError
+from .test_syntax_tree import create_parser
+
+
+def assert_recovery_machine(
+    source: str,
+    expected_positions: list[int],
+    expected_error_nodes: list[tuple[str, str]],
+) -> None:
+    tree, errors = create_parser().parse_with_recovery(source)
+
+    assert [error.position for error in errors] == expected_positions
+    assert all(isinstance(error, ParseError) for error in errors)
+    assert [(node.Symbol, node.Text) for node in tree.walk() if node.IsError] == (
+        expected_error_nodes
+    )
+    assert tree.Root.Symbol == "E"
+
+
+def test_valid_input_has_no_errors():
+    parser = create_parser()
+    tree, errors = parser.parse_with_recovery("1 + 2 * (3 + 4)")
+
+    assert errors == []
+    assert tree.to_bytes() == parser.parse("1 + 2 * (3 + 4)").to_bytes()
+
+
+def test_skip_until_first():
+    assert_recovery_machine("1 + * 2", [2], [])
+
+
+def test_insert_missing_terminal():
+    tree, errors = create_parser().parse_with_recovery("(1 + 2")
+
+    assert [error.position for error in errors] == [4]
+    assert 'expected one of: ")"' in str(errors[0])
+    assert tree.Root.Text == "(1 + 2"
+
+
+def test_abandon_on_follow():
+    assert_recovery_machine("1 + (2 * ) + 3 4", [5, 8], [("F", "")])
+
+
+def test_unparsable_input_keeps_root():
+    tree, errors = create_parser().parse_with_recovery("+ + +")
+
+    assert len(errors) == 1
+    assert tree.Root.IsError
+    assert tree.Root.Production == ERROR_PRODUCTION
+    assert tree.Root.Text == "+ + +"
+    assert tree.Root.Children == []
+
+
+def test_reports_every_error():
+    assert_recovery_machine("((+)) * (3 + * 4) + (5 6)", [2, 9, 15], [("E", "+")])
+
+
+def test_restart_after_complete_parse():
+    assert_recovery_machine("1 + 2 ) 3 + * 4", [3, 6], [])
+
+    tree, _ = create_parser().parse_with_recovery("1 + 2 ) 3 + * 4")
+    assert [node.Symbol for node in tree.Root.Children] == ["T", "E'", "E"]
+    assert tree.Root.Children[-1].Text == "3 + * 4"
+    assert tree.Root.Text == "1 + 2 ) 3 + * 4"
+
+
+def test_skip_before_root():
+    assert_recovery_machine(") 1 + 2", [0], [])
+    assert_recovery_machine(") ) 3", [0], [])
+
+
+def test_error_budget():
+    source = " + ".join(["1 *"] * 10) + " 1"
+    _, errors = create_parser().parse_with_recovery(source)
+    assert len(errors) == 9
+
+    tree, errors = create_parser().parse_with_recovery(source, max_errors=3)
+    assert len(errors) == 3
+    assert tree.Root.Symbol == "E"
+    assert tree.Root.End <= len(tree.Tokens)
+
+
+def test_lex_error_is_raised():
+    with pytest.raises(LexError):
+        create_parser().parse_with_recovery("1 + ?")
@@ -0,0 +1,126 @@
+import pytest  # type: ignore
+from ntt_parser import ExpressionPlan, Gramma, Parser
+
+ACTION_GRAMMA = """
+/start-lexma
+
+number: /[0-9]+(\\.[0-9]+)?/
+identifier: /[a-z]+/
+
+/end-lexma
+
+/start-precedence
+
+E: left 10 "+" "-"
+E: left 20 "*" "/"
+E: prefix 30 "-"
+
+/end-precedence
+
+/start-gramma
+
+E: "(" E ")" { $$ = $2; }
+    | "#" E { $$ = sqrt($2) * 2; }
+    | "[" E "," E "]" { $$ = max($2, $4 - 1); }
+    | number
+    | identifier
+    ;
+
+/end-gramma
+"""
+
+
+def create_plan_parser() -> Parser:
+    return Parser(Gramma.parse(ACTION_GRAMMA))
+
+
+def assert_plan_machine(
+    source: str, row: dict[str, float], expected: float, instruction_count: int
+) -> ExpressionPlan:
+    plan = ExpressionPlan.compile(create_plan_parser(), source)
+
+    assert plan.evaluate_row(row) == pytest.approx(expected)
+    assert len(plan.Instructions) == instruction_count
+    return plan
+
+
+def test_operator_productions():
+    plan = assert_plan_machine("x + y * 2 - -x", {"x": 3, "y": 4}, 14, 7)
+
+    assert plan.Columns == ["x", "y"]
+    assert plan.Instructions[plan.Result][0] == "subtract"
+
+
+def test_actions():
+    assert_plan_machine("(x + 1) * 2", {"x": 3}, 8, 5)
+    assert_plan_machine("#x", {"x": 16}, 8, 4)
+    assert_plan_machine("[x, y]", {"x": 2, "y": 5}, 4, 5)
+
+
+def test_common_subexpressions_are_shared():
+    plan = assert_plan_machine(
+        "(x * y + 1) / (x * y) + #(x * y)", {"x": 2, "y": 8}, 17 / 16 + 8, 10
+    )
+
+    assert (
+        sum(1 for instruction in plan.Instructions if instruction[0] == "multiply") == 2
+    )
+
+
+def test_constant_folding():
+    plan = assert_plan_machine("2 * 3 + #16", {}, 14, 1)
+    assert plan.Instructions == [("constant", 14.0)]
+
+    plan = ExpressionPlan.compile(create_plan_parser(), "x / (1 - 1) + 1 / 0")
+    assert sorted(instruction[0] for instruction in plan.Instructions) == [
+        "add",
+        "column",
+        "constant",
+        "constant",
+        "true_divide",
+        "true_divide",
+    ]
+    with pytest.raises(ZeroDivisionError):
+        plan.evaluate_row({"x": 1.0})
+
+
+def test_unsupported_actions():
+    parser = Parser(Gramma.parse(ACTION_GRAMMA.replace("sqrt($2) * 2", "print($2)")))
+    with pytest.raises(ValueError, match="Unsupported action for E"):
+        ExpressionPlan.compile(parser, "#x")
+
+    parser = Parser(Gramma.parse(ACTION_GRAMMA.replace("$$ = $2; }", "$$ = $1; }")))
+    with pytest.raises(ValueError, match="\\$1 has no value"):
+        ExpressionPlan.compile(parser, "(x)")
+
+
+def test_numeric_looking_identifiers_are_columns():
+    plan = assert_plan_machine("nan + inf * 2.5", {"nan": 1, "inf": 2}, 6, 5)
+
+    assert sorted(plan.Columns) == ["inf", "nan"]
+
+
+def test_unsupported_operators():
+    parser = Parser(Gramma.parse(ACTION_GRAMMA.replace('"*" "/"', '"*" "/" "@"')))
+    with pytest.raises(ValueError, match="Unsupported operator for E: @"):
+        ExpressionPlan.compile(parser, "x @ y")
+
+    parser = Parser(
+        Gramma.parse(ACTION_GRAMMA.replace('prefix 30 "-"', 'prefix 30 "!"'))
+    )
+    with pytest.raises(ValueError, match="Unsupported operator for E: !"):
+        ExpressionPlan.compile(parser, "!x")
+
+
+def test_numpy_evaluation():
+    numpy = pytest.importorskip("numpy")
+
+    plan = ExpressionPlan.compile(create_plan_parser(), "[x * y, #y] / -(x + 1)")
+    x = numpy.arange(1000, dtype=float)
+    y = numpy.linspace(1, 4, 1000)
+
+    result = plan.evaluate({"x": x, "y": y})
+
+    expected = numpy.maximum(x * y, numpy.sqrt(y) * 2 - 1) / -(x + 1)
+    assert numpy.allclose(result, expected)
+    assert result[10] == pytest.approx(plan.evaluate_row({"x": x[10], "y": y[10]}))
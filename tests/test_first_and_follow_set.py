@@ -249,3 +249,60 @@ def test_first_set_for_complex_case():
             "F": [None, None, 6, None, 7, None],
         },
     )
+
+
+def test_parsing_table_with_nullable_before_lexical():
+    gramma_str = """
+    /start-lexma
+
+    number: /[0-9]+/
+    identifier: /[a-z]+/
+
+    /end-lexma
+
+    /start-gramma
+
+    S: A number ;
+
+    A: "-"
+        | identifier
+        | ""
+        ;
+
+    /end-gramma
+"""
+
+    gramma = Gramma.parse(gramma_str)
+
+    assert_follow_set_machine(
+        gramma,
+        [
+            ("S", {"$"}),
+            ("A", {"number"}),
+        ],
+    )
+
+    gramma.parse_parsing_table()
+
+    assert_parsing_table_machine(
+        gramma,
+        ['"-"', "number", "identifier", "$"],
+        {
+            #   -  number identifier  $
+            "S": [0, 0, 0, None],
+            "A": [1, 3, 2, None],
+        },
+    )
+
+    gramma = Gramma.parse(gramma_str.replace('A: "-"\n        |', "A:"))
+    gramma.parse_parsing_table()
+
+    assert_parsing_table_machine(
+        gramma,
+        ["number", "identifier", "$"],
+        {
+            # number identifier  $
+            "S": [0, 0, None],
+            "A": [2, 1, None],
+        },
+    )
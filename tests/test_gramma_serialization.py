@@ -0,0 +1,86 @@
+import pytest  # type: ignore
+from ntt_parser import Gramma, select_parser
+
+from .test_earley_parsing import LEFT_RECURSIVE_GRAMMA
+from .test_expression_plan import ACTION_GRAMMA
+from .test_incremental_parsing import assert_same_tree
+from .test_precedence_parsing import PRECEDENCE_GRAMMA
+from .test_syntax_tree import EXPRESSION_GRAMMA
+
+GRAMMAS = [EXPRESSION_GRAMMA, LEFT_RECURSIVE_GRAMMA, PRECEDENCE_GRAMMA, ACTION_GRAMMA]
+
+
+def as_sets(rows: list[tuple[str, list[str]]]) -> dict[str, set[str]]:
+    return {non_terminal: set(symbols) for non_terminal, symbols in rows}
+
+
+def assert_round_trip_machine(gramma_str: str) -> Gramma:
+    gramma = Gramma.parse(gramma_str)
+    data = gramma.to_bytes()
+    loaded = Gramma.from_bytes(data)
+
+    assert loaded.Image is not None
+    assert sorted(loaded.Terminals) == sorted(gramma.Terminals)
+    assert sorted(loaded.NonTerminals) == sorted(gramma.NonTerminals)
+    assert loaded.StartNonTerminal == gramma.StartNonTerminal
+    assert loaded.Lexicals == gramma.Lexicals
+    assert loaded.Productions == gramma.Productions
+    assert loaded.Precedence == gramma.Precedence
+    assert as_sets(loaded.FirstSet) == as_sets(gramma.FirstSet)
+    assert as_sets(loaded.FollowSet) == as_sets(gramma.FollowSet)
+    assert loaded.ParsingTable == gramma.ParsingTable
+    assert loaded.Conflicts == gramma.Conflicts
+    assert loaded.to_bytes() == data
+    return loaded
+
+
+def test_round_trip():
+    for gramma_str in GRAMMAS:
+        assert_round_trip_machine(gramma_str)
+
+
+def test_same_bytes_for_same_gramma():
+    for gramma_str in GRAMMAS:
+        assert (
+            Gramma.parse(gramma_str).to_bytes() == Gramma.parse(gramma_str).to_bytes()
+        )
+
+
+def test_sections_are_decoded_lazily():
+    loaded = Gramma.from_bytes(Gramma.parse(EXPRESSION_GRAMMA).to_bytes())
+
+    assert "_productions" not in vars(loaded)
+    assert "_first_set" not in vars(loaded)
+
+    assert len(loaded.Productions) > 0
+    assert "_productions" in vars(loaded)
+    assert "_first_set" not in vars(loaded)
+
+
+def test_load_parser_from_mapped_image(tmp_path):
+    for gramma_str in GRAMMAS:
+        path = tmp_path / "gramma.nttg"
+        path.write_bytes(Gramma.parse(gramma_str).to_bytes())
+
+        expected = select_parser(Gramma.parse(gramma_str))
+        parser = select_parser(Gramma.load(path))
+
+        assert parser.Engine == expected.Engine
+        assert parser.Symbols == expected.Symbols
+        assert parser.Table == expected.Table
+        assert_same_tree(parser.parse("(1 + 2) * 3"), expected.parse("(1 + 2) * 3"))
+
+
+def test_invalid_images():
+    data = Gramma.parse(EXPRESSION_GRAMMA).to_bytes()
+
+    with pytest.raises(ValueError, match="Not a serialized gramma"):
+        Gramma.from_bytes(b"NTTT" + data[4:])
+    with pytest.raises(ValueError, match="Unsupported gramma version"):
+        Gramma.from_bytes(data[:4] + b"\x63\x00" + data[6:])
+    with pytest.raises(ValueError, match="Truncated gramma image"):
+        Gramma.from_bytes(data[: len(data) // 2])
+    with pytest.raises(ValueError, match="Truncated gramma image"):
+        Gramma.from_bytes(data[:6])
+    with pytest.raises(ValueError, match="Truncated gramma image"):
+        Gramma.from_bytes(data[:8] + (16).to_bytes(4, "little"))
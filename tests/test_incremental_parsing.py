@@ -0,0 +1,122 @@
+import pytest  # type: ignore
+from ntt_parser import ParseError, SyntaxTree
+
+from .test_syntax_tree import create_parser
+
+
+def assert_same_tree(value: SyntaxTree, expect: SyntaxTree) -> None:
+    assert value.Tokens.Source == expect.Tokens.Source
+    assert list(value.Tokens.Kinds) == list(expect.Tokens.Kinds)
+    assert list(value.Tokens.Starts) == list(expect.Tokens.Starts)
+    assert list(value.Tokens.Ends) == list(expect.Tokens.Ends)
+
+    for name in [
+        "Kinds",
+        "Productions",
+        "Starts",
+        "Ends",
+        "FirstChildren",
+        "NextSiblings",
+        "Parents",
+    ]:
+        assert list(getattr(value, name)) == list(
+            getattr(expect, name)
+        ), f"Mismatch in {name}"
+
+
+def assert_reparse_machine(source: str, start: int, end: int, text: str) -> None:
+    parser = create_parser()
+    tree = parser.parse(source)
+
+    reparsed = parser.reparse(tree, start, end, text)
+
+    assert_same_tree(reparsed, parser.parse(source[:start] + text + source[end:]))
+
+
+def test_replace_token_text():
+    assert_reparse_machine("1 + 2 * 3 + 4", 4, 5, "7")
+
+
+def test_extend_token():
+    assert_reparse_machine("1 + 2 * 3 + 4", 5, 5, "99")
+
+
+def test_merge_tokens():
+    assert_reparse_machine("12 + 34", 2, 5, "")
+
+
+def test_insert_subexpression():
+    assert_reparse_machine("1 + 2 * 3 + 4", 4, 5, "(5 + 6 * 7)")
+
+
+def test_delete_subexpression():
+    assert_reparse_machine("1 + (5 + 6 * 7) + 4", 2, 16, "")
+
+
+def test_edit_at_start_and_end():
+    assert_reparse_machine("1 + 2", 0, 0, "3 * ")
+    assert_reparse_machine("1 + 2", 5, 5, " * 3")
+    assert_reparse_machine("1 + 2   ", 8, 8, "+ 3")
+
+
+def test_edit_leading_whitespace():
+    assert_reparse_machine("  1 + 2", 0, 0, "3 * ")
+    assert_reparse_machine("  1 + 2", 1, 1, "(4) *")
+    assert_reparse_machine("  1 + 2", 0, 2, "")
+
+    parser = create_parser()
+    tree = parser.parse("  1 + 2")
+    with pytest.raises(ParseError):
+        parser.reparse(tree, 1, 1, "7")
+
+
+def test_chained_edits():
+    parser = create_parser()
+    source = " + ".join(["(1 * 2 + 3)"] * 50)
+    tree = parser.parse(source)
+
+    for offset in range(1, len(source), 37):
+        if source[offset].isdigit():
+            tree = parser.reparse(tree, offset, offset + 1, "42")
+            source = source[:offset] + "42" + source[offset + 1 :]
+
+    assert_same_tree(tree, parser.parse(source))
+
+
+def test_chained_edits_before_settling():
+    parser = create_parser()
+    source = " + ".join(["(1 * 2 + 3)"] * 20)
+    tree = parser.parse(source)
+
+    for offset in range(len(source) - 1, 0, -29):
+        if source[offset].isdigit():
+            tree = parser.reparse(tree, offset, offset, "4 * ")
+            source = source[:offset] + "4 * " + source[offset:]
+
+    expect = parser.parse(source)
+    for node in expect.walk():
+        value = tree.node(node.Index)
+        assert value is not None
+        assert (value.Start, value.End, value.Text) == (node.Start, node.End, node.Text)
+        assert [child.Index for child in value.Children] == [
+            child.Index for child in node.Children
+        ]
+        assert tree.subtree_end(node.Index) == expect.subtree_end(node.Index)
+
+    assert_same_tree(tree, expect)
+
+
+def test_edit_inside_long_list():
+    source = " + ".join(str(number) for number in range(200))
+    middle = source.index(" 100 ")
+
+    assert_reparse_machine(source, middle + 1, middle + 4, "(1 * 2)")
+    assert_reparse_machine(source, middle, middle + 6, "")
+
+
+def test_reparse_syntax_error():
+    parser = create_parser()
+    tree = parser.parse("1 + 2 * 3")
+
+    with pytest.raises(ParseError):
+        parser.reparse(tree, 4, 5, "+")
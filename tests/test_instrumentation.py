@@ -0,0 +1,136 @@
+import json
+
+from ntt_parser import Gramma, Instrumentation, Parser
+from .test_precedence_parsing import PRECEDENCE_GRAMMA
+from .test_syntax_tree import EXPRESSION_GRAMMA, create_parser
+
+GRAMMA_PHASES = [
+    "section_split",
+    "macro_expansion",
+    "spec_lexing",
+    "spec_parsing",
+    "first",
+    "follow",
+    "table",
+]
+
+
+def create_instrumented_parser(
+    instrumentation: Instrumentation,
+) -> Parser:
+    return Parser(Gramma.parse(EXPRESSION_GRAMMA, instrumentation))
+
+
+def test_gramma_phases():
+    instrumentation = Instrumentation()
+    create_instrumented_parser(instrumentation)
+
+    phases = instrumentation.Phases
+    assert list(phases) == GRAMMA_PHASES
+    for name in GRAMMA_PHASES:
+        assert phases[name]["calls"] == 1
+        assert phases[name]["seconds"] >= 0
+
+    assert instrumentation.Counters["first_iterations"] > 0
+    assert instrumentation.Counters["follow_iterations"] > 0
+
+
+def test_parser_counters():
+    instrumentation = Instrumentation()
+    parser = create_instrumented_parser(instrumentation)
+    instrumentation.reset()
+
+    parser.parse("1 + 2 * (3 + 4)")
+
+    assert list(instrumentation.Phases) == ["lexing", "parsing"]
+    assert instrumentation.Counters == {
+        "tokens": 9,
+        "table_lookups": 20,
+        "reductions": 20,
+        "stack_high_water": 15,
+    }
+
+    parser.parse("1")
+
+    assert instrumentation.Phases["parsing"]["calls"] == 2
+    assert instrumentation.Counters["tokens"] == 10
+    assert instrumentation.Counters["reductions"] == 25
+    assert instrumentation.Counters["stack_high_water"] == 15
+
+
+def test_parser_instrumentation_override():
+    instrumentation = Instrumentation()
+    parser = Parser(create_parser().Gramma, instrumentation)
+
+    parser.parse("((((1))))*2+3")
+
+    assert instrumentation.Counters["stack_high_water"] == 30
+    assert "first" not in instrumentation.Phases
+
+
+def test_disabled_by_default():
+    parser = create_parser()
+
+    assert parser.Gramma.Instrumentation is None
+    assert parser.Instrumentation is None
+    assert len(parser.parse("1 + 2")) > 0
+
+
+def test_callback_and_memory():
+    records: list[tuple[str, dict[str, float]]] = []
+    instrumentation = Instrumentation(
+        trace_memory=True, callback=lambda name, record: records.append((name, record))
+    )
+    parser = create_instrumented_parser(instrumentation)
+    parser.parse("1 + 2")
+
+    assert [name for name, _ in records] == GRAMMA_PHASES + ["lexing", "parsing"]
+    for _, record in records:
+        assert record["seconds"] >= 0
+        assert record["peak_bytes"] >= 0
+
+    assert instrumentation.Phases["table"]["peak_bytes"] > 0
+
+
+def test_export():
+    instrumentation = Instrumentation()
+    parser = create_instrumented_parser(instrumentation)
+    parser.parse("1 + 2")
+
+    exported = json.loads(instrumentation.to_json())
+    assert exported == instrumentation.to_dict()
+    assert set(exported) == {"phases", "counters"}
+    assert exported["counters"]["tokens"] == 3
+
+
+def test_precedence_counters():
+    instrumentation = Instrumentation()
+    parser = Parser(Gramma.parse(PRECEDENCE_GRAMMA), instrumentation)
+
+    parser.parse("1 + 2 * 3")
+
+    counters = instrumentation.Counters
+    assert counters["reductions"] == counters["table_lookups"] + 2
+
+
+def test_batch_and_incremental_counters():
+    instrumentation = Instrumentation()
+    parser = Parser(create_parser().Gramma, instrumentation)
+
+    list(parser.parse_many(["1 + 2", "3"]))
+
+    assert instrumentation.Phases["parsing"]["calls"] == 2
+    assert instrumentation.Counters["tokens"] == 4
+
+    source = " + ".join(["(1 * 2)"] * 10)
+    tree = parser.parse(source)
+    instrumentation.reset()
+
+    middle = source.index("1", len(source) // 2)
+    parser.reparse(tree, middle, middle + 1, "3")
+
+    assert list(instrumentation.Phases) == ["lexing", "parsing"]
+    counters = instrumentation.Counters
+    assert 0 < counters["tokens"] <= 3
+    assert 0 < counters["table_lookups"] < 10
+    assert counters["reused_nodes"] > len(tree) // 2
@@ -0,0 +1,47 @@
+import pytest  # type: ignore
+from ntt_parser import ParseError, SyntaxTree
+
+from .test_incremental_parsing import assert_same_tree
+from .test_syntax_tree import create_parser
+
+
+def test_parse_many_matches_parse():
+    parser = create_parser()
+    sources = ["1", "1 + 2 * 3", "(4 + 5) * 6", "  7  ", "((8))"]
+
+    results = list(parser.parse_many(sources))
+
+    assert len(results) == len(sources)
+    for result, source in zip(results, sources):
+        assert isinstance(result, SyntaxTree)
+        assert_same_tree(result, parser.parse(source))
+
+
+def test_parse_many_results_are_independent():
+    parser = create_parser()
+
+    first, second = parser.parse_many(["1 + 2", "3"])
+
+    assert isinstance(first, SyntaxTree) and isinstance(second, SyntaxTree)
+    assert first.Root.Text == "1 + 2"
+    assert second.Root.Text == "3"
+    assert len(first) > len(second)
+
+
+def test_parse_many_raises_by_default():
+    parser = create_parser()
+
+    with pytest.raises(ParseError):
+        list(parser.parse_many(["1", "1 +", "2"]))
+
+
+def test_parse_many_collects_errors():
+    parser = create_parser()
+
+    results = list(parser.parse_many(["1", "1 +", "a", "2"], raise_errors=False))
+
+    assert isinstance(results[0], SyntaxTree)
+    assert isinstance(results[1], ParseError)
+    assert isinstance(results[2], ValueError)
+    assert isinstance(results[3], SyntaxTree)
+    assert results[3].Root.Text == "2"
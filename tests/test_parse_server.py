@@ -0,0 +1,142 @@
+import asyncio
+import json
+import threading
+import time
+
+import pytest  # type: ignore
+from ntt_parser import ParseClient, ParseServer, SyntaxTree
+from ntt_parser.server import _FRAME, _frame
+
+from .test_syntax_tree import EXPRESSION_GRAMMA
+
+OTHER_GRAMMA = """
+    /start-gramma
+
+    S:
+        "a" S
+        | "b"
+        ;
+
+    /end-gramma
+"""
+
+
+@pytest.fixture
+def server_path(tmp_path):
+    path = tmp_path / "parser.sock"
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    serving = asyncio.run_coroutine_threadsafe(
+        ParseServer(cache_size=1, max_frame=1 << 16).serve(str(path)), loop
+    )
+
+    deadline = time.monotonic() + 5
+    while not path.exists() and time.monotonic() < deadline:
+        time.sleep(0.001)
+
+    yield str(path)
+
+    async def shutdown() -> None:
+        tasks = [
+            task for task in asyncio.all_tasks() if task is not asyncio.current_task()
+        ]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    serving.cancel()
+    asyncio.run_coroutine_threadsafe(shutdown(), loop).result(5)
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(5)
+    loop.close()
+
+
+def test_handle_parse_request():
+    server = ParseServer()
+
+    response, payload = server.handle(
+        {"id": 1, "gramma": EXPRESSION_GRAMMA, "input": "1 + 2"}
+    )
+
+    assert response["ok"] and response["id"] == 1
+    assert payload is None
+    assert response["tree"]["symbols"][response["tree"]["kinds"][0]] == "E"
+    assert response["nodes"] == len(response["tree"]["kinds"])
+    assert response["latency_us"] >= 0
+
+    response, _ = server.handle({"hash": response["hash"], "input": "3"})
+    assert response["ok"]
+    assert server.stats()["cache_hits"] == 1
+
+
+def test_handle_errors():
+    server = ParseServer()
+
+    response, _ = server.handle({"hash": "missing", "input": "1"})
+    assert not response["ok"] and response["unknown_gramma"]
+
+    response, _ = server.handle({"gramma": EXPRESSION_GRAMMA, "input": "1 +"})
+    assert not response["ok"] and "ParseError" in response["error"]
+
+    response, _ = server.handle({"gramma": "/start-gramma /end-gramma", "input": "a"})
+    assert not response["ok"] and "IndexError" in response["error"]
+
+    assert server.stats()["errors"] == 3
+
+
+def test_handle_invalid_frames():
+    server = ParseServer()
+
+    response, payload = server.handle_frame(b"{not json")
+    assert not response["ok"] and "JSONDecodeError" in response["error"]
+    assert payload is None
+
+    response, _ = server.handle_frame(b"[1, 2]")
+    assert not response["ok"] and "JSON object" in response["error"]
+
+    response, _ = server.handle_frame(b'{"command": "stats"}')
+    assert response["stats"]["errors"] == 2
+
+
+def test_client_round_trip(server_path: str):
+    with ParseClient(server_path) as client:
+        response = client.parse(EXPRESSION_GRAMMA, "1 + 2 * 3", format="binary")
+        assert response["ok"]
+        tree = response["tree"]
+        assert isinstance(tree, SyntaxTree)
+        assert tree.Root.Text == "1 + 2 * 3"
+
+        response = client.parse(EXPRESSION_GRAMMA, "(4)")
+        assert response["ok"] and response["nodes"] == len(response["tree"]["kinds"])
+
+        assert client.parse(OTHER_GRAMMA, "a a b")["ok"]
+        assert client.parse(EXPRESSION_GRAMMA, "5")["ok"]
+
+        stats = client.stats()
+        assert stats["requests"] >= 4
+        assert stats["cache_size"] == 1
+        assert stats["cache_evictions"] == 2
+
+
+def test_client_survives_invalid_frames(server_path: str):
+    with ParseClient(server_path) as client:
+        client._socket.sendall(_frame(b"{not json"))
+        assert not json.loads(client._read_frame())["ok"]
+
+        response = client.request({"gramma": "/start-gramma /end-gramma", "input": "a"})
+        assert not response["ok"]
+
+        assert client.parse(EXPRESSION_GRAMMA, "1 + 2")["ok"]
+
+
+def test_oversized_frame_closes_connection(server_path: str):
+    with ParseClient(server_path) as client:
+        client._socket.sendall(_FRAME.pack(1 << 30))
+        response = json.loads(client._read_frame())
+        assert not response["ok"]
+        assert "exceeds the 65536 byte limit" in response["error"]
+        assert client._stream.read() == b""
+
+    with ParseClient(server_path) as client:
+        assert client.parse(EXPRESSION_GRAMMA, "1 + 2")["ok"]
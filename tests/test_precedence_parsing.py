@@ -0,0 +1,163 @@
+import pytest  # type: ignore
+from ntt_parser import Gramma, ParseError, Parser, SyntaxTree, TreeNode
+from ntt_parser.stream import PushParser
+
+from .test_incremental_parsing import assert_same_tree
+
+PRECEDENCE_GRAMMA = """
+/start-lexma
+
+number: /[0-9]+/
+
+/end-lexma
+
+/start-precedence
+
+E: left 10 "+" "-"
+E: left 20 "*"
+E: prefix 25 "-"
+E: right 30 "^"
+
+/end-precedence
+
+/start-gramma
+
+E: "(" E ")"
+    | number
+    ;
+
+/end-gramma
+"""
+
+
+def create_precedence_parser() -> Parser:
+    return Parser(Gramma.parse(PRECEDENCE_GRAMMA))
+
+
+def nesting(node: TreeNode) -> str:
+    children = node.Children
+    if not children:
+        return node.Text
+
+    text = " ".join(nesting(child) for child in children)
+    if node.Symbol == "E" and len(children) > 1:
+        return f"({text})"
+    return text
+
+
+def assert_preorder(tree: SyntaxTree) -> None:
+    for index in range(len(tree)):
+        node = tree.node(index)
+        children = node.Children
+
+        assert node.Start <= node.End
+        if children:
+            assert children[0].Index == index + 1
+            assert children[0].Start == node.Start
+            assert children[-1].End == node.End
+        for child in children:
+            assert child.Parent is not None and child.Parent.Index == index
+
+    order: list[int] = []
+    pending = [0]
+    while pending:
+        index = pending.pop()
+        order.append(index)
+        pending.extend(child.Index for child in reversed(tree.node(index).Children))
+    assert order == list(range(len(tree)))
+
+
+def assert_nesting_machine(source: str, expected: str) -> None:
+    tree = create_precedence_parser().parse(source)
+
+    assert nesting(tree.Root) == expected
+    assert tree.Root.Text == source
+    assert_preorder(tree)
+
+
+def test_precedence_section():
+    gramma = Gramma.parse(PRECEDENCE_GRAMMA)
+
+    assert gramma.Precedence == {
+        "E": [
+            ('"+"', "left", 10),
+            ('"-"', "left", 10),
+            ('"*"', "left", 20),
+            ('"-"', "prefix", 25),
+            ('"^"', "right", 30),
+        ]
+    }
+    assert {'"+"', '"-"', '"*"', '"^"'} <= set(gramma.Terminals)
+    assert '"*"' in dict(gramma.FollowSet)["E"]
+
+
+def test_binding_power():
+    assert_nesting_machine("1+2*3", "(1 + (2 * 3))")
+    assert_nesting_machine("1*2+3", "((1 * 2) + 3)")
+    assert_nesting_machine("1", "1")
+
+
+def test_associativity():
+    assert_nesting_machine("1-2-3", "((1 - 2) - 3)")
+    assert_nesting_machine("2^3^4", "(2 ^ (3 ^ 4))")
+
+
+def test_prefix_operators():
+    assert_nesting_machine("-1*2", "((- 1) * 2)")
+    assert_nesting_machine("-2^2", "(- (2 ^ 2))")
+    assert_nesting_machine("1 - - 2", "(1 - (- 2))")
+
+
+def test_parenthesized_operands():
+    assert_nesting_machine("(1+2)*3", "((( (1 + 2) )) * 3)")
+    assert_nesting_machine("2*(3-(4))^5", "(2 * ((( (3 - (( 4 ))) )) ^ 5))")
+    assert_nesting_machine(
+        "(1)*-(2+3)-(4)^(5)",
+        "(((( 1 )) * (- (( (2 + 3) )))) - ((( 4 )) ^ (( 5 ))))",
+    )
+
+
+def test_syntax_errors():
+    parser = create_precedence_parser()
+
+    with pytest.raises(ParseError, match='expected one of: "\\(", "-", number'):
+        parser.parse("1 +")
+    with pytest.raises(ParseError, match="expected one of: \\$"):
+        parser.parse("1 2")
+    with pytest.raises(ParseError, match='expected one of: "\\)"'):
+        parser.parse("(1")
+
+
+def test_invalid_precedence_definition():
+    with pytest.raises(ValueError, match="line 2, column 1: E: up 10"):
+        Gramma.precedence_parse('E: left 10 "+"\nE: up 10 "*"')
+
+    with pytest.raises(AssertionError):
+        Gramma.parse(PRECEDENCE_GRAMMA.replace('E: left 20 "*"', 'X: left 20 "*"'))
+
+
+def test_batch_and_incremental_fallback():
+    parser = create_precedence_parser()
+    sources = ["1+2*3", "-(4)", "5^6^7"]
+
+    for result, source in zip(parser.parse_many(sources), sources):
+        assert isinstance(result, SyntaxTree)
+        assert_same_tree(result, parser.parse(source))
+
+    tree = parser.parse("1+2*3")
+    assert_same_tree(parser.reparse(tree, 1, 2, "^"), parser.parse("1^2*3"))
+
+
+def test_serialization_round_trip():
+    tree = create_precedence_parser().parse("1+2*-3^4")
+
+    assert_same_tree(SyntaxTree.from_bytes(tree.to_bytes()), tree)
+
+
+def test_unsupported_drivers():
+    parser = create_precedence_parser()
+
+    with pytest.raises(AssertionError):
+        parser.parse_with_recovery("1 +")
+    with pytest.raises(AssertionError):
+        PushParser(parser)
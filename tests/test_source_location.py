@@ -0,0 +1,91 @@
+import pytest  # type: ignore
+from ntt_parser import Gramma, LexError, LineIndex, ParseError
+from .test_syntax_tree import create_parser
+
+
+def test_line_index_is_lazy():
+    lines = LineIndex("ab\ncd\n\nef")
+    assert lines._line_starts is None
+
+    assert lines.location(0) == (1, 1)
+    assert lines.location(1) == (1, 2)
+    assert lines.location(2) == (1, 3)
+    assert lines.location(3) == (2, 1)
+    assert lines.location(6) == (3, 1)
+    assert lines.location(7) == (4, 1)
+    assert lines.location(9) == (4, 3)
+    assert lines.LineStarts.tolist() == [0, 3, 6, 7]
+
+
+def test_tokens_share_one_index():
+    tree = create_parser().parse("1 +\n 2 *\n  (3)")
+
+    assert tree.Tokens._lines is None
+    assert [node.Location for node in tree.walk() if node.IsToken] == [
+        (1, 1),
+        (1, 3),
+        (2, 2),
+        (2, 4),
+        (3, 3),
+        (3, 4),
+        (3, 5),
+    ]
+    assert tree.Tokens.Lines is tree.Tokens.Lines
+
+
+def test_parse_error_location():
+    with pytest.raises(ParseError) as error:
+        create_parser().parse("1 +\n 2 *\n  * 3")
+
+    assert error.value.offset == 11
+    assert error.value.location == (3, 3)
+    assert str(error.value).endswith("(line 3, column 3)")
+
+
+def test_recovered_errors_location():
+    _, errors = create_parser().parse_with_recovery("1 + *\n2 +\n\n* 3")
+
+    assert [error.location for error in errors] == [(1, 5), (4, 1)]
+
+
+def test_lex_error_location():
+    with pytest.raises(LexError) as error:
+        create_parser().parse("1 +\n  ?")
+
+    assert error.value.location == (2, 3)
+
+
+def test_spec_lexical_error_location():
+    spec = """
+/start-lexma
+number: /[0-9]+/
+    oops
+/end-lexma
+/start-gramma
+E: number ;
+/end-gramma
+"""
+    with pytest.raises(ValueError) as error:
+        Gramma.parse(spec)
+
+    assert "at line 4, column 5" in str(error.value)
+
+
+def test_spec_gramma_error_location():
+    spec = """
+/start-macro
+NUM: number
+/end-macro
+
+/start-gramma
+E: T ;
+T: NUM
+    | "(" E ")" ;
+
+    "x" ;
+/end-gramma
+"""
+    with pytest.raises(AssertionError) as error:
+        Gramma.parse(spec)
+
+    assert "at line 11, column 5" in str(error.value)
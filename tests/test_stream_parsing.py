@@ -0,0 +1,138 @@
+import asyncio
+
+import pytest  # type: ignore
+from ntt_parser import (
+    Gramma,
+    LexError,
+    ParseError,
+    ParseEvent,
+    ParseEventType,
+    Parser,
+    parse_stream,
+)
+from ntt_parser.lexer import StreamLexer
+
+from .test_syntax_tree import EXPRESSION_GRAMMA, create_parser
+
+
+async def _byte_chunks(source: str, size: int):
+    data = source.encode("utf-8")
+    for index in range(0, len(data), size):
+        yield data[index : index + size]
+
+
+async def _collect(parser: Parser, source, **kwargs) -> list[ParseEvent]:
+    return [event async for event in parse_stream(parser, source, **kwargs)]
+
+
+def assert_events_machine(parser: Parser, source: str, events: list[ParseEvent]):
+    tree = parser.parse(source)
+
+    entered = [
+        (event.symbol, event.text)
+        for event in events
+        if event.type != ParseEventType.EXIT
+    ]
+    expected = [
+        (node.Symbol, node.Text if node.IsToken else "") for node in tree.walk()
+    ]
+    assert entered == expected
+
+    depth = 0
+    for event in events:
+        if event.type == ParseEventType.ENTER:
+            depth += 1
+        elif event.type == ParseEventType.EXIT:
+            depth -= 1
+        assert depth >= 0
+    assert depth == 0
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 64])
+def test_parse_byte_chunks(chunk_size: int):
+    parser = create_parser()
+    source = "12 + (345 * 6) * 78"
+
+    events = asyncio.run(_collect(parser, _byte_chunks(source, chunk_size)))
+
+    assert_events_machine(parser, source, events)
+
+
+def test_parse_stream_reader():
+    parser = create_parser()
+    source = " + ".join(["(1 * 22)"] * 20)
+
+    async def run() -> list[ParseEvent]:
+        reader = asyncio.StreamReader()
+        reader.feed_data(source.encode("utf-8"))
+        reader.feed_eof()
+        return await _collect(parser, reader, chunk_size=5)
+
+    assert_events_machine(parser, source, asyncio.run(run()))
+
+
+def test_token_offsets():
+    parser = create_parser()
+
+    events = asyncio.run(_collect(parser, _byte_chunks("10 *  2", 2)))
+
+    tokens = [
+        (event.text, event.offset)
+        for event in events
+        if event.type == ParseEventType.TOKEN
+    ]
+    assert tokens == [("10", 0), ("*", 3), ("2", 6)]
+
+
+def test_stream_syntax_error():
+    parser = create_parser()
+
+    with pytest.raises(ParseError):
+        asyncio.run(_collect(parser, _byte_chunks("1 + + 2", 2)))
+
+    with pytest.raises(ParseError):
+        asyncio.run(_collect(parser, _byte_chunks("1 +", 2)))
+
+
+def test_streams_share_event_loop():
+    parser = create_parser()
+    order: list[str] = []
+
+    async def consume(name: str) -> None:
+        source = " + ".join(["1"] * 10)
+        async for event in parse_stream(
+            parser, _byte_chunks(source, 1024), yield_every=2
+        ):
+            if event.type == ParseEventType.TOKEN:
+                order.append(name)
+
+    async def run() -> None:
+        await asyncio.gather(consume("a"), consume("b"))
+
+    asyncio.run(run())
+
+    assert order.count("a") == order.count("b") == 19
+    assert order[: order.index("b")].count("a") < 19
+
+
+def test_token_split_across_chunks():
+    parser = Parser(
+        Gramma.parse(EXPRESSION_GRAMMA.replace("/[0-9]+/", "/[0-9]+(\\.[0-9]+)?/"))
+    )
+
+    async def chunks():
+        for chunk in ["1 + 12.", "5 * 3", ".", "25"]:
+            yield chunk
+
+    events = asyncio.run(_collect(parser, chunks()))
+
+    assert_events_machine(parser, "1 + 12.5 * 3.25", events)
+
+
+def test_stream_lex_error_is_raised_early():
+    parser = create_parser()
+    lexer = StreamLexer(parser.Lexer)
+
+    assert [token[3] for token in lexer.feed("1 + ")] == ["1", "+"]
+    with pytest.raises(LexError, match="Unexpected character '\\?'"):
+        list(lexer.feed("? 2"))
@@ -0,0 +1,148 @@
+import pytest  # type: ignore
+from ntt_parser import Gramma, NO_NODE, ParseError, Parser, SyntaxTree, TreeNode
+
+EXPRESSION_GRAMMA = """
+    /start-lexma
+
+    number: /[0-9]+/
+
+    /end-lexma
+
+    /start-gramma
+
+    E: T E';
+
+    E': "+" T E'
+        | ""
+        ;
+
+    T: F T';
+
+    T': "*" F T'
+        | ""
+        ;
+
+    F: "(" E ")"
+        | number
+        ;
+
+    /end-gramma
+"""
+
+
+def create_parser() -> Parser:
+    return Parser(Gramma.parse(EXPRESSION_GRAMMA))
+
+
+def assert_tree_machine(
+    node: TreeNode,
+    expected: tuple,
+) -> None:
+    symbol, text, children = expected
+    assert node.Symbol == symbol, f"Expected symbol {symbol} but found {node.Symbol}"
+    assert node.Text == text, f"Expected text {text!r} but found {node.Text!r}"
+    assert len(node.Children) == len(
+        children
+    ), f"Expected {len(children)} children of {symbol} but found {len(node.Children)}"
+
+    for child, expected_child in zip(node.Children, children):
+        assert child.Parent == node
+        assert_tree_machine(child, expected_child)
+
+
+def test_parse_tree_structure():
+    tree = create_parser().parse("1 + 2")
+
+    assert_tree_machine(
+        tree.Root,
+        (
+            "E",
+            "1 + 2",
+            [
+                ("T", "1", [("F", "1", [("number", "1", [])]), ("T'", "", [])]),
+                (
+                    "E'",
+                    "+ 2",
+                    [
+                        ('"+"', "+", []),
+                        (
+                            "T",
+                            "2",
+                            [("F", "2", [("number", "2", [])]), ("T'", "", [])],
+                        ),
+                        ("E'", "", []),
+                    ],
+                ),
+            ],
+        ),
+    )
+
+
+def test_tree_arrays_are_pre_order():
+    tree = create_parser().parse("(1 + 2) * 3")
+
+    assert tree.Parents[0] == NO_NODE
+    for index in range(1, len(tree)):
+        assert tree.Parents[index] < index
+        assert tree.Starts[tree.Parents[index]] <= tree.Starts[index]
+
+    for node in tree.walk():
+        end = tree.subtree_end(node.Index)
+        for index in range(node.Index + 1, end):
+            assert tree.Starts[index] >= node.Start
+            assert tree.Ends[index] <= node.End
+
+
+def test_token_nodes_and_productions():
+    parser = create_parser()
+    tree = parser.parse("4 * 5")
+
+    tokens = [node for node in tree.walk() if node.IsToken]
+    assert [node.Text for node in tokens] == ["4", "*", "5"]
+    assert [node.Symbol for node in tokens] == ["number", '"*"', "number"]
+
+    rules = [node for node in tree.walk() if not node.IsToken]
+    for node in rules:
+        lhs, rhs, _ = parser.Gramma.Productions[node.Production]
+        assert lhs == node.Symbol
+        assert [child.Symbol for child in node.Children] == [
+            symbol for symbol in rhs if symbol != '""'
+        ]
+
+
+def test_serialization_round_trip():
+    tree = create_parser().parse("1 + (2 * 3) + 4")
+
+    loaded = SyntaxTree.from_bytes(tree.to_bytes())
+
+    assert loaded.Symbols == tree.Symbols
+    assert loaded.Tokens.Source == tree.Tokens.Source
+    assert len(loaded) == len(tree)
+    for value, expect in zip(loaded.walk(), tree.walk()):
+        assert (value.Symbol, value.Start, value.End, value.Production) == (
+            expect.Symbol,
+            expect.Start,
+            expect.End,
+            expect.Production,
+        )
+        assert [child.Index for child in value.Children] == [
+            child.Index for child in expect.Children
+        ]
+
+
+def test_invalid_serialized_tree():
+    with pytest.raises(ValueError):
+        SyntaxTree.from_bytes(b"\x00" * 32)
+
+
+def test_syntax_error():
+    with pytest.raises(ParseError) as error:
+        create_parser().parse("1 + * 2")
+
+    assert error.value.position == 2
+    assert error.value.offset == 4
+
+
+def test_unexpected_character():
+    with pytest.raises(ValueError):
+        create_parser().parse("1 + a")
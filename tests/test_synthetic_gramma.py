@@ -0,0 +1,84 @@
+import pytest  # type: ignore
+from benchmarks.run import compare
+from benchmarks.synthetic import SentenceGenerator, SyntheticGrammaSpec, generate_gramma
+from ntt_parser import Gramma, Parser
+
+
+@pytest.mark.parametrize(
+    "spec",
+    [
+        SyntheticGrammaSpec(),
+        SyntheticGrammaSpec(non_terminals=50, branching=2, recursion_depth=10, seed=1),
+        SyntheticGrammaSpec(non_terminals=40, nullable_density=0.8, seed=2),
+        SyntheticGrammaSpec(non_terminals=30, branching=5, lexicals=15, seed=3),
+    ],
+)
+def test_generated_sentences_parse(spec: SyntheticGrammaSpec):
+    gramma = Gramma.parse(generate_gramma(spec))
+    parser = Parser(gramma)
+    generator = SentenceGenerator(gramma, seed=spec.seed)
+
+    assert len(gramma.NonTerminals) == spec.non_terminals
+
+    for target in [1, 10, 200, 2000]:
+        tree = parser.parse(generator.generate(target))
+        token_count = len(tree.Tokens) - 1
+        assert token_count >= min(target, generator.ShortestLengths["N0"])
+        assert token_count <= max(target, generator.ShortestLengths["N0"]) + 1
+
+
+def test_generated_gramma_is_deterministic():
+    spec = SyntheticGrammaSpec(non_terminals=10, seed=7)
+
+    assert generate_gramma(spec) == generate_gramma(spec)
+    assert generate_gramma(spec) != generate_gramma(
+        SyntheticGrammaSpec(non_terminals=10, seed=8)
+    )
+
+
+def test_shortest_derivation_lengths():
+    gramma = Gramma.parse("""
+    /start-gramma
+
+    S: A "x" B
+        | "y"
+        ;
+
+    A: "a" A
+        | ""
+        ;
+
+    B: "b" "b"
+        | A "c"
+        ;
+
+    /end-gramma
+""")
+
+    assert SentenceGenerator(gramma).ShortestLengths == {"S": 1, "A": 0, "B": 1}
+
+
+def test_only_synthetic_lexicals_are_generated():
+    gramma = Gramma.parse("""
+    /start-lexma
+
+    identifier: /[a-z]+/
+
+    /end-lexma
+
+    /start-gramma
+
+    S: identifier ;
+
+    /end-gramma
+""")
+
+    with pytest.raises(ValueError, match="lexical 'identifier'"):
+        SentenceGenerator(gramma).generate(1)
+
+
+def test_compare_against_baseline():
+    baseline = {"a/parse": 1.0, "b/parse": 1.0}
+    results = {"a/parse": 1.2, "b/parse": 1.5, "c/parse": 9.0}
+
+    assert compare(results, baseline, 1.25) == [("b/parse", 1.0, 1.5)]